@@ -42,17 +42,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.humanize',
     'records'
 ]
 
 MIDDLEWARE = [
+    'records.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'records.middleware.ReadYourWritesMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'records.middleware.ProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'medical_record_system.urls'
@@ -61,7 +65,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -69,9 +72,19 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
         },
     },
 ]
+# Outside development compile each template once per process instead of
+# re-reading and re-parsing it on every render.
+if not DEBUG:
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', TEMPLATES[0]['OPTIONS']['loaders']),
+    ]
 
 WSGI_APPLICATION = 'medical_record_system.wsgi.application'
 
@@ -86,6 +99,78 @@ DATABASES = {
     }
 }
 
+# Read replica for report, export and list pages (see records/routers.py).
+# DATABASE_REPLICA_NAME points at a replicated copy of the primary; without it
+# every query goes to 'default'. Tests mirror the replica onto the test database.
+DATABASE_REPLICAS = []
+if os.getenv('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DATABASE_REPLICA_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['records.routers.PrimaryReplicaRouter']
+# seconds a client keeps reading from the primary after it wrote something
+REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# CACHE_BACKEND selects locmem (default), file or redis (Django's built-in
+# Redis backend, needs redis-py). Reference data such as doctors and
+# departments is cached here and invalidated by model signals.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'medical-record-system',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND],
+    # used by the {% cache %} tag for rendered list fragments
+    'template_fragments': {**CACHE_BACKENDS[CACHE_BACKEND], 'KEY_PREFIX': 'fragments'},
+}
+REFERENCE_CACHE_ALIAS = 'default'
+REFERENCE_CACHE_TIMEOUT = 60 * 60
+
+# Sessions and authentication
+# SESSION_PROFILE 'cached' keeps sessions in the cache in front of the database
+# (cached_db) and caches the user lookup for USER_CACHE_TIMEOUT seconds, so an
+# authenticated request normally makes no session or auth_user query. 'db' is
+# Django's default. The cached profile needs a cache shared by all workers
+# (file or Redis): with locmem a logout in one worker would not reach the
+# others, so that is the default only when CACHE_BACKEND isn't locmem.
+# Compare both with manage.py benchmark_sessions.
+SESSION_PROFILES = {
+    'db': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'USER_CACHE_TIMEOUT': 0,
+    },
+    'cached': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+        'USER_CACHE_TIMEOUT': 60,
+    },
+}
+SESSION_PROFILE = os.getenv('SESSION_PROFILE') or ('db' if CACHE_BACKEND == 'locmem' else 'cached')
+SESSION_ENGINE = SESSION_PROFILES[SESSION_PROFILE]['SESSION_ENGINE']
+SESSION_CACHE_ALIAS = 'default'
+USER_CACHE_TIMEOUT = SESSION_PROFILES[SESSION_PROFILE]['USER_CACHE_TIMEOUT']
+USER_CACHE_ALIAS = 'default'
+AUTHENTICATION_BACKENDS = [
+    'records.backends.CachedModelBackend',
+    # still listed so sessions logged in before CachedModelBackend stay valid
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -127,8 +212,28 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Medical reports and prescriptions are served through an authenticated view.
+# In production let the web server stream them: 'nginx' (X-Accel-Redirect to an
+# `internal` location aliased to MEDIA_ROOT) or 'xsendfile' (Apache/lighttpd).
+PROTECTED_MEDIA_SERVER = os.getenv('PROTECTED_MEDIA_SERVER') or None
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
 # Note: for handling image uploads you'll need Pillow installed in the virtualenv: pip install Pillow
 
+# Patient photo derivatives, generated in the background after upload
+PATIENT_PHOTO_SIZES = {
+    'card': (160, 160),
+    'detail': (320, 320),
+}
+
+# Generated prescription PDFs: worker processes of manage.py render_prescriptions
+# (default: one per CPU)
+PRESCRIPTION_PDF_WORKERS = None
+
+# In-process background worker pool (set BACKGROUND_TASKS_ASYNC=False to run jobs inline)
+BACKGROUND_TASKS_ASYNC = os.getenv('BACKGROUND_TASKS_ASYNC', 'True') == 'True'
+BACKGROUND_TASKS_WORKERS = int(os.getenv('BACKGROUND_TASKS_WORKERS', '2'))
+
 # Development email: print emails to console. Configure SMTP in production.
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'no-reply@example.com'
@@ -138,7 +243,74 @@ DEFAULT_FROM_EMAIL = 'no-reply@example.com'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Billing: consultation fee per doctor specialization, used when invoicing
+# completed appointments (manage.py generate_invoices)
+DEFAULT_CONSULTATION_FEE = '50.00'
+CONSULTATION_FEES = {}
+
 # Twilio Configuration for SMS Notifications
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', 'your_account_sid_here')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', 'your_auth_token_here')
 TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER', 'your_twilio_phone_number')  # Format: +1234567890
+
+# Recurring appointments (records/services/recurrence.py)
+APPOINTMENT_SERIES_MAX_OCCURRENCES = 104
+
+# Cancelled slots are offered to the waitlist (records/services/waitlist.py),
+# unless they start within this many minutes
+WAITLIST_MIN_NOTICE_MINUTES = 60
+
+# Doctors' iCalendar feeds (records/services/ics.py): appointments from
+# ICS_FEED_PAST_DAYS ago to ICS_FEED_FUTURE_DAYS ahead. Patient names stay out
+# of the events unless ICS_FEED_PATIENT_NAMES is set, as feeds are stored by
+# third-party calendar services. Event UIDs end in ICS_FEED_UID_DOMAIN (the
+# request's host when empty), which must not change once feeds are subscribed.
+ICS_FEED_UID_DOMAIN = os.getenv('ICS_FEED_UID_DOMAIN', '')
+ICS_FEED_PAST_DAYS = 30
+ICS_FEED_FUTURE_DAYS = 365
+ICS_FEED_PATIENT_NAMES = False
+ICS_FEED_MAX_AGE = 300
+ICS_FEED_CACHE_ALIAS = 'default'
+ICS_FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Clinic dashboard: each widget is cached for its own number of seconds, then
+# served stale for DASHBOARD_STALE_SECONDS more while it is refreshed. Widgets
+# that aren't cached are computed in parallel; the page waits at most
+# DASHBOARD_BUDGET_MS for them.
+DASHBOARD_BUDGET_MS = 300
+DASHBOARD_STALE_SECONDS = 10 * 60
+DASHBOARD_WORKERS = 4
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_WIDGET_TIMEOUTS = {
+    'patient_count': 10 * 60,
+    'doctor_count': 60 * 60,
+    'today_appointments': 60,
+    'upcoming_appointments': 60,
+    'unpaid_bills': 5 * 60,
+    'upcoming_vaccinations': 30 * 60,
+    'unread_messages': 60,
+}
+
+# Archival of historical rows (manage.py archive_old_data, e.g. nightly from cron)
+ARCHIVE_APPOINTMENTS_AFTER_DAYS = 730
+ARCHIVE_MESSAGES_AFTER_DAYS = 730
+TIMESLOT_RETENTION_DAYS = 1
+ARCHIVE_BATCH_SIZE = 1000
+
+# Prometheus metrics at /metrics (records/services/metrics.py). Scrapers
+# authenticate with METRICS_TOKEN as a bearer token or come from
+# METRICS_ALLOWED_IPS; staff users can always look. Under a prefork server set
+# METRICS_MULTIPROCESS_DIR to a directory shared by all workers.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_MULTIPROCESS_DIR = os.getenv('METRICS_MULTIPROCESS_DIR') or None
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Staff request profiling (?_profile=1 or an X-Profile header, see
+# records/services/profiling.py); the last profiles are listed at /admin/profiles/
+PROFILER_BUFFER_SIZE = 50
+PROFILER_TTL = 60 * 60 * 24
+PROFILER_CACHE_ALIAS = 'default'
+
+# Import-time budget for django.setup() plus URL resolution (manage.py benchmark_startup)
+STARTUP_IMPORT_BUDGET_MS = 1000
@@ -19,7 +19,12 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from records.views import profiling
+
 urlpatterns = [
+    # staff request profiles, shown inside the admin (before admin.site.urls, which would 404 them)
+    path('admin/profiles/', admin.site.admin_view(profiling.profile_list), name='request_profiles'),
+    path('admin/profiles/<str:profile_id>/', admin.site.admin_view(profiling.profile_detail), name='request_profile'),
     path('admin/', admin.site.urls),
     path('', include('records.urls')),
 ]
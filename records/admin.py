@@ -1,14 +1,330 @@
-from django.contrib import admin
-from .models import Patient, Doctor, Appointment, MedicalRecord
-
-from .models import Vaccination, Medication, Billing, Message, DoctorAvailability
-
-admin.site.register(Patient)
-admin.site.register(Doctor)
-admin.site.register(Appointment)
-admin.site.register(MedicalRecord)
-admin.site.register(Vaccination)
-admin.site.register(Medication)
-admin.site.register(Billing)
-admin.site.register(Message)
-admin.site.register(DoctorAvailability)
+from django.contrib import admin, messages
+from django.urls import reverse
+from django.utils.html import format_html
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Patient, Doctor, Appointment, MedicalRecord, Department, Prescription, TreatmentPlan
+from .models import Vaccination, Medication, Billing, Message, DoctorAvailability, TimeSlot
+from .models import Invoice, InvoiceLineItem, Payment, ArchivedAppointment, ArchivedMessage, AppointmentSeries
+from .models import WaitlistEntry
+from .services import billing, ics, metrics, waitlist
+
+
+class FastChangeListMixin:
+    """Shared changelist settings for the big tables.
+
+    show_full_result_count=False skips the extra unfiltered COUNT(*) on every
+    filtered/searched page; list_select_related avoids a query per row when
+    __str__ or list_display follows a foreign key.
+    """
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
+@admin.register(Patient)
+class PatientAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('name', 'dob', 'phone', 'email', 'last_visit')
+    # '=' does exact phone/email lookups
+    search_fields = ('name', '=phone', '=email')
+    list_filter = ('gender',)
+    raw_id_fields = ('user',)
+    exclude = ('photo_hash',)
+    ordering = ('name', 'id')
+
+
+@admin.register(Doctor)
+class DoctorAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('name', 'specialization', 'department', 'experience_years')
+    list_select_related = ('department',)
+    search_fields = ('name', 'specialization')
+    list_filter = ('department',)
+    raw_id_fields = ('user',)
+    ordering = ('name', 'id')
+    readonly_fields = ('calendar_feed',)
+    actions = ('reset_calendar_token',)
+
+    @admin.display(description='Calendar feed')
+    def calendar_feed(self, obj):
+        if not obj.pk or not obj.calendar_token:
+            return 'None yet, use the "Create new calendar feed link" action'
+        url = reverse('doctor_calendar_feed', args=[obj.pk, obj.calendar_token])
+        return format_html('<a href="{}">{}</a>', url, url)
+
+    @admin.action(description='Create new calendar feed link (the old one stops working)')
+    def reset_calendar_token(self, request, queryset):
+        for doctor in queryset:
+            doctor.calendar_token = ics.new_token()
+            doctor.save(update_fields=['calendar_token', 'updated_at'])
+        self.message_user(request, f'{len(queryset)} calendar feed links created.', messages.SUCCESS)
+
+
+@admin.register(Appointment)
+class AppointmentAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('date', 'patient', 'doctor', 'status', 'duration_minutes')
+    list_select_related = ('patient', 'doctor')
+    list_filter = ('status',)
+    search_fields = ('patient__name', 'doctor__name')
+    autocomplete_fields = ('patient', 'doctor')
+    raw_id_fields = ('series',)
+    ordering = ('-date',)
+    actions = ('mark_completed', 'mark_cancelled')
+
+    @admin.action(description='Mark selected appointments as completed')
+    def mark_completed(self, request, queryset):
+        updated = queryset.update(status='completed', updated_at=timezone.now())
+        metrics.APPOINTMENT_STATUS_UPDATES.inc(updated, status='completed', source='admin')
+        self.message_user(request, f'{updated} appointments marked as completed.', messages.SUCCESS)
+
+    @admin.action(description='Mark selected appointments as cancelled')
+    def mark_cancelled(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        updated = queryset.model.objects.filter(pk__in=ids).update(status='cancelled', updated_at=timezone.now())
+        waitlist.slot_freed(ids)
+        metrics.APPOINTMENT_STATUS_UPDATES.inc(updated, status='cancelled', source='admin')
+        self.message_user(request, f'{updated} appointments cancelled.', messages.SUCCESS)
+
+
+@admin.register(AppointmentSeries)
+class AppointmentSeriesAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'start', 'frequency', 'interval', 'count', 'until')
+    list_select_related = ('patient', 'doctor')
+    list_filter = ('frequency',)
+    search_fields = ('patient__name', 'doctor__name')
+    autocomplete_fields = ('patient', 'doctor')
+    ordering = ('-start',)
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'specialization', 'earliest', 'latest', 'priority', 'status')
+    list_select_related = ('patient', 'doctor')
+    list_filter = ('status',)
+    search_fields = ('patient__name', 'doctor__name', 'specialization')
+    autocomplete_fields = ('patient', 'doctor')
+    raw_id_fields = ('appointment',)
+    ordering = ('-priority', 'created_at')
+
+
+@admin.register(MedicalRecord)
+class MedicalRecordAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'diagnosis', 'date_recorded')
+    list_select_related = ('patient',)
+    search_fields = ('patient__name', 'diagnosis')
+    autocomplete_fields = ('patient',)
+
+
+@admin.register(Prescription)
+class PrescriptionAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'medication', 'date_prescribed')
+    list_select_related = ('patient', 'doctor')
+    search_fields = ('patient__name', 'medication')
+    autocomplete_fields = ('patient', 'doctor')
+
+
+@admin.register(TreatmentPlan)
+class TreatmentPlanAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'doctor', 'start_date', 'end_date')
+    list_select_related = ('patient', 'doctor')
+    search_fields = ('patient__name',)
+    autocomplete_fields = ('patient', 'doctor')
+
+
+@admin.register(Vaccination)
+class VaccinationAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'vaccine_name', 'date_given')
+    list_select_related = ('patient',)
+    search_fields = ('patient__name', 'vaccine_name')
+    autocomplete_fields = ('patient',)
+
+
+@admin.register(Medication)
+class MedicationAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('patient', 'name', 'start_date', 'end_date')
+    list_select_related = ('patient',)
+    search_fields = ('patient__name', 'name')
+    autocomplete_fields = ('patient',)
+
+
+@admin.register(Billing)
+class BillingAdmin(FastChangeListMixin, admin.ModelAdmin):
+    """Legacy bills, kept for reference: invoices are the ledger now."""
+    list_display = ('patient', 'amount', 'description', 'created_at', 'paid')
+    list_select_related = ('patient',)
+    list_filter = ('paid',)
+    search_fields = ('patient__name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Message)
+class MessageAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('timestamp', 'sender_patient', 'sender_doctor', 'doctor', 'content', 'read_at')
+    list_select_related = ('sender_patient', 'sender_doctor', 'doctor')
+    search_fields = ('sender_patient__name', 'sender_doctor__name', 'doctor__name')
+    autocomplete_fields = ('sender_patient', 'sender_doctor', 'doctor')
+    ordering = ('-timestamp',)
+    readonly_fields = ('read_at',)
+    actions = ('mark_read',)
+
+    @admin.action(description='Mark selected messages as read')
+    def mark_read(self, request, queryset):
+        updated = queryset.filter(read_at__isnull=True).update(read_at=timezone.now())
+        self.message_user(request, f'{updated} messages marked as read.', messages.SUCCESS)
+
+
+@admin.register(DoctorAvailability)
+class DoctorAvailabilityAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('__str__', 'day_of_week', 'start_time', 'end_time')
+    # __str__ reads self.doctor.name
+    list_select_related = ('doctor',)
+    list_filter = ('day_of_week',)
+    search_fields = ('doctor__name',)
+    autocomplete_fields = ('doctor',)
+
+
+@admin.register(TimeSlot)
+class TimeSlotAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('doctor', 'start', 'end', 'available')
+    list_select_related = ('doctor',)
+    list_filter = ('available',)
+    search_fields = ('doctor__name',)
+    autocomplete_fields = ('doctor',)
+
+
+class InvoiceLineItemInline(admin.TabularInline):
+    model = InvoiceLineItem
+    extra = 0
+    # quantity x unit price, set by billing.recalculate_totals
+    readonly_fields = ('amount',)
+
+
+class PaymentInline(admin.TabularInline):
+    model = Payment
+    extra = 0
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('invoice_number', 'patient', 'date', 'due_date', 'amount', 'amount_paid', 'status')
+    list_select_related = ('patient',)
+    list_filter = ('status',)
+    search_fields = ('patient__name', '=id')
+    autocomplete_fields = ('patient',)
+    raw_id_fields = ('appointment',)
+    inlines = (InvoiceLineItemInline, PaymentInline)
+    actions = ('mark_paid', 'mark_void')
+    # derived from the line items and payments
+    readonly_fields = ('amount', 'amount_paid')
+
+    def save_formset(self, request, form, formset, change):
+        if formset.model is InvoiceLineItem:
+            for item in formset.save(commit=False):
+                item.amount = item.quantity * item.unit_price
+                item.save()
+            for item in formset.deleted_objects:
+                item.delete()
+        else:
+            formset.save()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        changed = {formset.model for formset in formsets if formset.has_changed()}
+        if changed:
+            billing.recalculate_totals(form.instance.pk, items=InvoiceLineItem in changed, payments=Payment in changed)
+
+    @admin.action(description='Mark selected invoices as paid in full')
+    def mark_paid(self, request, queryset):
+        # settles the balance without creating Payment rows (write-offs, external payments)
+        updated = queryset.filter(status__in=Invoice.OPEN_STATUSES).update(
+            status='paid', amount_paid=F('amount'), updated_at=timezone.now(),
+        )
+        self.message_user(request, f'{updated} invoices marked as paid.', messages.SUCCESS)
+
+    @admin.action(description='Void selected invoices')
+    def mark_void(self, request, queryset):
+        updated = queryset.exclude(status='paid').update(status='void', updated_at=timezone.now())
+        self.message_user(request, f'{updated} invoices voided.', messages.SUCCESS)
+
+
+class InvoiceTotalsMixin:
+    """Keeps the invoice totals in step when its line items or payments are edited on their own."""
+    recalculate = {}
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invoice_ids = {obj.invoice_id}
+        if change and 'invoice' in form.changed_data:
+            invoice_ids.add(form.initial['invoice'])
+        for invoice_id in invoice_ids:
+            billing.recalculate_totals(invoice_id, **self.recalculate)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        billing.recalculate_totals(obj.invoice_id, **self.recalculate)
+
+    def delete_queryset(self, request, queryset):
+        invoice_ids = set(queryset.values_list('invoice_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for invoice_id in invoice_ids:
+            billing.recalculate_totals(invoice_id, **self.recalculate)
+
+
+@admin.register(InvoiceLineItem)
+class InvoiceLineItemAdmin(InvoiceTotalsMixin, FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('invoice', 'description', 'quantity', 'unit_price', 'amount')
+    list_select_related = ('invoice', 'invoice__patient')
+    raw_id_fields = ('invoice',)
+    readonly_fields = ('amount',)
+    recalculate = {'items': True, 'payments': False}
+
+    def save_model(self, request, obj, form, change):
+        obj.amount = obj.quantity * obj.unit_price
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(Payment)
+class PaymentAdmin(InvoiceTotalsMixin, FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('paid_at', 'invoice', 'amount', 'method')
+    # __str__ of the invoice reads the patient too
+    list_select_related = ('invoice', 'invoice__patient')
+    list_filter = ('method',)
+    raw_id_fields = ('invoice',)
+    recalculate = {'items': False, 'payments': True}
+
+
+class ReadOnlyArchiveMixin:
+    """Archive rows are written by manage.py archive_old_data only."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedAppointment)
+class ArchivedAppointmentAdmin(ReadOnlyArchiveMixin, FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('date', 'patient', 'doctor', 'status', 'archived_at')
+    list_select_related = ('patient', 'doctor')
+    list_filter = ('status',)
+    search_fields = ('patient__name', 'doctor__name')
+    ordering = ('-date',)
+
+
+@admin.register(ArchivedMessage)
+class ArchivedMessageAdmin(ReadOnlyArchiveMixin, FastChangeListMixin, admin.ModelAdmin):
+    list_display = ('timestamp', 'sender_patient', 'sender_doctor', 'doctor', 'content', 'read_at')
+    list_select_related = ('sender_patient', 'sender_doctor', 'doctor')
+    search_fields = ('sender_patient__name', 'sender_doctor__name', 'doctor__name')
+    ordering = ('-timestamp',)
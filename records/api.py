@@ -0,0 +1,290 @@
+"""
+JSON API, version 1.
+
+    GET   /api/v1/<resource>/                list, cursor paginated
+    GET   /api/v1/<resource>/<pk>/           one object
+    PATCH /api/v1/appointments/<pk>/         {"status": ...}
+    POST  /api/v1/appointments/batch/        {"ids": [...], "status": ...}
+
+Resources: patients, doctors, appointments, records (medical records).
+
+Query parameters:
+    fields=a,b       sparse fieldset; only these columns are loaded
+    include=x,y      related objects, fetched with select_related/prefetch
+    limit=N          page size (max MAX_PAGE_SIZE)
+    after / before   cursors from links.next / links.prev
+
+Authentication is the regular session; every resource needs the model's
+view permission, writes need the change permission.
+"""
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods
+
+from . import routers
+from .models import Appointment, Department, Doctor, DoctorAvailability, MedicalRecord, Patient
+from .services import metrics, pagination, waitlist
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BATCH_SIZE = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class Resource:
+    """
+    How one model is exposed.
+
+    fields: model field names that can be selected (foreign keys render as ids)
+    includes: name -> ('one', relation) for select_related, or
+              ('many', accessor, fk_name) for prefetched reverse relations,
+              each rendered with the related model's resource
+    filters: query parameter -> ORM lookup
+    """
+
+    def __init__(self, model, fields, includes=None, filters=None):
+        self.model = model
+        self.fields = fields
+        self.includes = includes or {}
+        self.filters = filters or {}
+
+    def permission(self, action):
+        return f'{self.model._meta.app_label}.{action}_{self.model._meta.model_name}'
+
+    def related_resource(self, include):
+        spec = self.includes[include]
+        if spec[0] == 'one':
+            model = self.model._meta.get_field(spec[1]).related_model
+        else:
+            model = getattr(self.model, spec[1]).rel.related_model
+        return RESOURCES_BY_MODEL[model]
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.fields)
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(fields) - set(self.fields)
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(self.fields)}")
+        return ['id'] + [name for name in fields if name != 'id']
+
+    def parse_includes(self, value):
+        includes = [name.strip() for name in (value or '').split(',') if name.strip()]
+        unknown = set(includes) - set(self.includes)
+        if unknown:
+            raise ApiError(f"Unknown includes: {', '.join(sorted(unknown))}; choose from {', '.join(self.includes) or 'none'}")
+        return includes
+
+    def queryset(self, fields, includes):
+        queryset = self.model.objects.all()
+        columns = list(fields)
+        for name in includes:
+            spec = self.includes[name]
+            related = self.related_resource(name)
+            if spec[0] == 'one':
+                queryset = queryset.select_related(spec[1])
+                columns += [spec[1]] + [f'{spec[1]}__{field}' for field in related.fields]
+            else:
+                _, accessor, fk_name = spec
+                rows = related.model.objects.only(*set(related.fields) | {fk_name}).order_by('pk')
+                queryset = queryset.prefetch_related(Prefetch(accessor, queryset=rows))
+        return queryset.only(*columns)
+
+    def serialize(self, obj, fields=None, includes=()):
+        data = {}
+        for name in fields or self.fields:
+            data[name] = getattr(obj, self.model._meta.get_field(name).attname)
+        for name in includes:
+            resource = self.related_resource(name)
+            related = getattr(obj, self.includes[name][1])
+            if self.includes[name][0] == 'one':
+                data[name] = resource.serialize(related) if related is not None else None
+            else:
+                data[name] = [resource.serialize(item) for item in related.all()]
+        return data
+
+
+RESOURCES = {
+    'patients': Resource(
+        Patient,
+        ['id', 'name', 'dob', 'gender', 'phone', 'email', 'address', 'last_visit', 'updated_at'],
+        includes={
+            'appointments': ('many', 'appointment_set', 'patient'),
+            'records': ('many', 'medicalrecord_set', 'patient'),
+        },
+        filters={'name': 'name__istartswith', 'dob': 'dob'},
+    ),
+    'doctors': Resource(
+        Doctor,
+        ['id', 'name', 'specialization', 'experience_years', 'department', 'updated_at'],
+        includes={
+            'department': ('one', 'department'),
+            'availabilities': ('many', 'availabilities', 'doctor'),
+        },
+        filters={'department': 'department_id', 'specialization': 'specialization'},
+    ),
+    'appointments': Resource(
+        Appointment,
+        ['id', 'patient', 'doctor', 'date', 'duration_minutes', 'status', 'notes', 'updated_at'],
+        includes={'patient': ('one', 'patient'), 'doctor': ('one', 'doctor')},
+        filters={'patient': 'patient_id', 'doctor': 'doctor_id', 'status': 'status', 'from': 'date__gte', 'to': 'date__lt'},
+    ),
+    'records': Resource(
+        MedicalRecord,
+        ['id', 'patient', 'diagnosis', 'treatment', 'date_recorded', 'updated_at'],
+        includes={'patient': ('one', 'patient')},
+        filters={'patient': 'patient_id'},
+    ),
+}
+# models only reachable through include=
+RESOURCES_BY_MODEL = {resource.model: resource for resource in RESOURCES.values()}
+RESOURCES_BY_MODEL[Department] = Resource(Department, ['id', 'name'])
+RESOURCES_BY_MODEL[DoctorAvailability] = Resource(DoctorAvailability, ['id', 'day_of_week', 'start_time', 'end_time'])
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': {'message': message}}, status=status)
+
+
+def api_view(methods, perm='view'):
+    """Method check, JSON auth errors and ApiError handling for API views."""
+    def decorator(view):
+        @wraps(view)
+        @require_http_methods(methods)
+        def wrapper(request, resource, *args, **kwargs):
+            if resource not in RESOURCES:
+                return _error(f'Unknown resource {resource!r}', status=404)
+            if not request.user.is_authenticated:
+                return _error('Authentication required', status=401)
+            if not request.user.has_perm(RESOURCES[resource].permission(perm)):
+                return _error('Permission denied', status=403)
+            try:
+                return view(request, RESOURCES[resource], *args, **kwargs)
+            except ApiError as e:
+                return _error(str(e), status=e.status)
+        return wrapper
+    return decorator
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _link(request, **params):
+    query = request.GET.copy()
+    for key in ('after', 'before'):
+        query.pop(key, None)
+    query.update(params)
+    return request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+
+@api_view(['GET'])
+@routers.read_only_view
+def resource_list(request, resource):
+    fields = resource.parse_fields(request.GET.get('fields'))
+    includes = resource.parse_includes(request.GET.get('include'))
+    queryset = resource.queryset(fields, includes)
+    try:
+        for param, lookup in resource.filters.items():
+            if request.GET.get(param):
+                queryset = queryset.filter(**{lookup: request.GET[param]})
+        page = pagination.paginate(
+            queryset,
+            ['id'],
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            page_size=_page_size(request),
+        )
+    except pagination.InvalidCursor as e:
+        raise ApiError(str(e))
+    except (ValueError, TypeError, ValidationError) as e:
+        raise ApiError(f'Invalid filter value: {e}')
+    return JsonResponse({
+        'data': [resource.serialize(obj, fields, includes) for obj in page],
+        'links': {
+            'next': _link(request, after=page.next_cursor) if page.has_next else None,
+            'prev': _link(request, before=page.previous_cursor) if page.has_previous else None,
+        },
+    })
+
+
+def resource_item(request, resource, pk):
+    if request.method == 'PATCH' and resource == 'appointments':
+        return appointment_update(request, resource, pk)
+    return resource_detail(request, resource, pk)
+
+
+@api_view(['GET'])
+@routers.read_only_view
+def resource_detail(request, resource, pk):
+    fields = resource.parse_fields(request.GET.get('fields'))
+    includes = resource.parse_includes(request.GET.get('include'))
+    obj = resource.queryset(fields, includes).filter(pk=pk).first()
+    if obj is None:
+        raise ApiError('Not found', status=404)
+    return JsonResponse({'data': resource.serialize(obj, fields, includes)})
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Request body must be JSON')
+    if not isinstance(data, dict):
+        raise ApiError('Request body must be a JSON object')
+    return data
+
+
+def _status(data):
+    status = data.get('status')
+    if status not in dict(Appointment.STATUS_CHOICES):
+        raise ApiError(f"status must be one of {', '.join(dict(Appointment.STATUS_CHOICES))}")
+    return status
+
+
+@api_view(['PATCH'], perm='change')
+def appointment_update(request, resource, pk):
+    """Only the status can be changed; it is written with a one-column UPDATE."""
+    data = _json_body(request)
+    if set(data) - {'status'}:
+        raise ApiError('Only "status" can be updated')
+    status = _status(data)
+    updated = Appointment.objects.filter(pk=pk).update(status=status, updated_at=timezone.now())
+    if not updated:
+        raise ApiError('Not found', status=404)
+    metrics.APPOINTMENT_STATUS_UPDATES.inc(status=status, source='api')
+    if status == 'cancelled':
+        waitlist.slot_freed([pk])
+    obj = resource.queryset(resource.fields, []).get(pk=pk)
+    return JsonResponse({'data': resource.serialize(obj)})
+
+
+@api_view(['POST'], perm='change')
+def appointment_batch(request, resource):
+    """Set the status of many appointments with a single UPDATE ... WHERE id IN (...)."""
+    data = _json_body(request)
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+        raise ApiError('ids must be a non-empty list of integers')
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ApiError(f'At most {MAX_BATCH_SIZE} ids per batch')
+    status = _status(data)
+    updated = Appointment.objects.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+    metrics.APPOINTMENT_STATUS_UPDATES.inc(updated, status=status, source='api')
+    if status == 'cancelled':
+        waitlist.slot_freed(set(ids))
+    return JsonResponse({'data': {'requested': len(set(ids)), 'updated': updated}})
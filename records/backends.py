@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+KEY_PREFIX = 'auth_user'
+
+
+def _cache():
+    return caches[getattr(settings, 'USER_CACHE_ALIAS', 'default')]
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}:{user_id}'
+
+
+def forget_user(user_id):
+    """Drop a user from the lookup cache (called by signals when it changes)."""
+    _cache().delete(_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose per-request user lookup is cached for USER_CACHE_TIMEOUT seconds.
+
+    Saving or deleting a user drops its entry (see records/signals.py), so a
+    password change or deactivation applies right away in this process. With a
+    cache that isn't shared between workers, others may see the old user until
+    the entry expires; keep the timeout short. A timeout of 0 disables caching.
+    """
+
+    def get_user(self, user_id):
+        timeout = getattr(settings, 'USER_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().get_user(user_id)
+        cache = _cache()
+        user = cache.get(_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(_key(user_id), user, timeout)
+        return user
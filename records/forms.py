@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta, datetime
 from .models import Appointment, MedicalRecord, Patient, Doctor, Department
+from .services import caching, metrics
 
 class DateInput(forms.DateInput):
     input_type = 'date'
@@ -33,6 +34,7 @@ class AppointmentForm(ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields['doctor'].choices = caching.doctor_choices()
         if self.instance and self.instance.pk:
             self.fields['date'].initial = self.instance.date.date()
             self.fields['time'].initial = self.instance.date.time()
@@ -66,6 +68,7 @@ class AppointmentForm(ModelForm):
         ).exclude(pk=self.instance.pk if self.instance else None)
         
         if overlapping.exists():
+            metrics.APPOINTMENT_CONFLICTS.inc()
             raise ValidationError("Doctor already has an appointment at this time.")
         
         # Set the combined datetime to the model's date field
@@ -127,3 +130,13 @@ class PatientForm(ModelForm):
         if phone and not phone.isdigit():
             raise ValidationError("Phone number should contain only digits.")
         return phone or None  # Allow empty phone numbers since it's optional
+
+
+class PatientImportForm(PatientForm):
+    """Validates one row of a bulk patient import with the PatientForm rules."""
+    class Meta(PatientForm.Meta):
+        fields = ['name', 'dob', 'gender', 'phone', 'email', 'address']
+
+    def clean_phone(self):
+        # the model column is NOT NULL; bulk_create bypasses the model default
+        return super().clean_phone() or ''
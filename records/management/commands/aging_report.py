@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from records import routers
+from records.services import billing
+
+
+class Command(BaseCommand):
+    help = 'Prints outstanding balances by age (current, 0-30, 31-60, 61-90, 90+ days past due)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', type=date.fromisoformat, default=None, help='Report date (YYYY-MM-DD), defaults to today')
+
+    def handle(self, *args, **options):
+        with routers.replica_reads():
+            summary = billing.ledger_summary(as_of=options['as_of'])
+        for label, amount in summary['aging']:
+            self.stdout.write(f'{label:>8}  {amount:>12,.2f}')
+        self.stdout.write(f'{"total":>8}  {summary["outstanding_amount"]:>12,.2f}  ({summary["open_invoices"]} open invoices)')
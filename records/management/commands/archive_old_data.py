@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from records.services import archive
+
+
+class Command(BaseCommand):
+    help = 'Moves old appointments and messages into the archive tables and deletes past time slots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointment-days', type=int, help='Archive finished appointments older than this (default ARCHIVE_APPOINTMENTS_AFTER_DAYS)')
+        parser.add_argument('--message-days', type=int, help='Archive messages older than this (default ARCHIVE_MESSAGES_AFTER_DAYS)')
+        parser.add_argument('--slot-days', type=int, help='Delete time slots that ended more than this many days ago (default TIMESLOT_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, help='Rows per transaction (default ARCHIVE_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be moved')
+
+    def handle(self, *args, **options):
+        batch_size, dry_run = options['batch_size'], options['dry_run']
+        appointments = archive.archive_appointments(options['appointment_days'], batch_size, dry_run)
+        messages = archive.archive_messages(options['message_days'], batch_size, dry_run)
+        slots = archive.prune_time_slots(options['slot_days'], batch_size, dry_run)
+        verb = 'Would archive' if dry_run else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {appointments} appointments and {messages} messages; '
+            f'{"would delete" if dry_run else "deleted"} {slots} past time slots'
+        ))
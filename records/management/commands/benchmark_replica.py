@@ -0,0 +1,124 @@
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from records import routers
+from records.models import Appointment, Doctor, Patient
+from records.services import billing, fhir_export
+
+MARKER = 'benchmark_replica booking'
+
+
+def report_load(use_replica):
+    """Run the reports page's heavy queries in a loop until killed."""
+    while True:
+        with routers.replica_reads() if use_replica else nullcontext():
+            try:
+                billing.ledger_summary()
+                list(Appointment.objects.values('status').annotate(n=Count('id')))
+                for _ in fhir_export.iter_resources('Appointment', using=routers.read_alias()):
+                    pass
+            except OperationalError:
+                # SQLite: locked by a booking, try again
+                pass
+
+
+class Command(BaseCommand):
+    help = 'Measures booking latency alone and while report queries run on the primary and on the replica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=100, help='Appointments booked per phase')
+        parser.add_argument(
+            '--report-workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+            help='Processes running report queries (default: one per spare CPU)',
+        )
+        parser.add_argument('--max-slowdown', type=float, default=2.0, help='Allowed p95 ratio with reports on the replica vs. no load')
+        # internal: run as one of the report load processes
+        parser.add_argument('--load-worker', choices=['primary', 'replica'], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['load_worker']:
+            report_load(options['load_worker'] == 'replica')
+            return
+        if not getattr(settings, 'DATABASE_REPLICAS', []):
+            raise CommandError('No replica configured, set DATABASE_REPLICA_NAME')
+        patient = Patient.objects.first()
+        doctor = Doctor.objects.first()
+        if patient is None or doctor is None:
+            raise CommandError('Needs at least one patient and doctor, run manage.py seed_db first')
+
+        self.client = Client()
+        self.url = reverse('book_appointment', args=[patient.pk])
+        # far enough ahead that the bookings never overlap real appointments
+        self.next_start = timezone.now().replace(microsecond=0) + timedelta(days=random.randint(3650, 7300))
+        self.doctor = doctor
+        try:
+            results = [
+                ('no report load', self.book(options['bookings'])),
+                ('reports on primary', self.book_under_load(options, use_replica=False)),
+                ('reports on replica', self.book_under_load(options, use_replica=True)),
+            ]
+        finally:
+            Appointment.objects.filter(notes=MARKER).delete()
+
+        self.stdout.write(f'{"phase":<20} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8} {"failed":>7}')
+        for label, (timings, failed) in results:
+            self.stdout.write(f'{label:<20} {self.percentile(timings, 50):8.1f} {self.percentile(timings, 95):8.1f} {max(timings, default=0):8.1f} {failed:7d}')
+
+        baseline = self.percentile(results[0][1][0], 95)
+        on_replica = self.percentile(results[2][1][0], 95)
+        if results[2][1][1] or on_replica > baseline * options['max_slowdown']:
+            raise CommandError(f'Booking p95 went from {baseline:.1f} ms to {on_replica:.1f} ms with reports on the replica')
+        self.stdout.write(self.style.SUCCESS('Booking latency stays stable while reports run on the replica'))
+
+    def percentile(self, timings, pct):
+        if len(timings) < 2:
+            return timings[0] if timings else 0.0
+        return statistics.quantiles(timings, n=100)[pct - 1]
+
+    def book(self, count):
+        timings = []
+        failed = 0
+        for _ in range(count):
+            self.next_start += timedelta(hours=1)
+            started = time.perf_counter()
+            response = self.client.post(self.url, {
+                'doctor': self.doctor.pk,
+                'date': timezone.localtime(self.next_start).strftime('%Y-%m-%d %H:%M'),
+                'notes': MARKER,
+            }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code == 200:
+                timings.append(elapsed)
+            else:
+                failed += 1
+        return timings, failed
+
+    def book_under_load(self, options, use_replica):
+        # separate processes, like the web workers serving the reports would be
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'benchmark_replica',
+            '--load-worker', 'replica' if use_replica else 'primary',
+        ]
+        workers = [subprocess.Popen(command) for _ in range(options['report_workers'])]
+        time.sleep(2)  # let the report queries get going
+        try:
+            return self.book(options['bookings'])
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.wait()
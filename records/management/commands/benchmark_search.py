@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from records.models import Doctor, MedicalRecord, Patient, Prescription
+from records.services import search
+
+DIAGNOSES = [
+    'Type 2 diabetes mellitus', 'Essential hypertension', 'Asthma', 'Migraine',
+    'Hypothyroidism', 'Hyperlipidemia', 'Osteoarthritis', 'Gastroesophageal reflux',
+    'Atrial fibrillation', 'Chronic kidney disease', 'Major depressive disorder',
+]
+MEDICATIONS = [
+    'Metformin', 'Lisinopril', 'Atorvastatin', 'Levothyroxine', 'Albuterol',
+    'Omeprazole', 'Amlodipine', 'Sertraline', 'Ibuprofen', 'Warfarin',
+]
+WORDS = (
+    'patient reports improvement follow up in two weeks monitor blood glucose '
+    'pressure diet exercise review labs continue current therapy taper dose'
+).split()
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks full-text search against icontains scans on synthetic data (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Medical records to generate (same number of prescriptions)')
+        parser.add_argument('--patients', type=int, default=10000)
+        parser.add_argument('--query', default='metformin diabetes')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        with transaction.atomic():
+            self.generate(options)
+            self.run(options)
+            transaction.set_rollback(True)
+        self.stdout.write('Synthetic data rolled back.')
+
+    def generate(self, options):
+        rows, batch_size = options['rows'], options['batch_size']
+        started = time.perf_counter()
+
+        doctor = Doctor.objects.create(name='Benchmark Doctor', specialization='General Physician')
+        Patient.objects.bulk_create(
+            [Patient(name=f'Bench Patient {i}', dob=date(1950 + i % 50, 1 + i % 12, 1 + i % 28), address='-')
+             for i in range(options['patients'])],
+            batch_size=batch_size,
+        )
+        patient_ids = list(Patient.objects.filter(name__startswith='Bench Patient ').values_list('id', flat=True))
+
+        for offset in range(0, rows, batch_size):
+            count = min(batch_size, rows - offset)
+            MedicalRecord.objects.bulk_create([
+                MedicalRecord(
+                    patient_id=random.choice(patient_ids),
+                    diagnosis=random.choice(DIAGNOSES),
+                    treatment=' '.join(random.choices(WORDS, k=12)),
+                ) for _ in range(count)
+            ])
+            Prescription.objects.bulk_create([
+                Prescription(
+                    patient_id=random.choice(patient_ids),
+                    doctor=doctor,
+                    medication=random.choice(MEDICATIONS),
+                    dosage='500mg twice daily',
+                    instructions=' '.join(random.choices(WORDS, k=8)),
+                ) for _ in range(count)
+            ])
+
+        self.stdout.write(f'Generated {rows} records and {rows} prescriptions in {time.perf_counter() - started:.1f}s')
+        started = time.perf_counter()
+        indexed = search.rebuild_index(batch_size=batch_size)
+        self.stdout.write(f'Indexed {indexed} documents in {time.perf_counter() - started:.1f}s')
+
+    def timed(self, label, func, repeat):
+        timings = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(f'{label:<28} median {timings[len(timings) // 2]:8.1f} ms   best {timings[0]:8.1f} ms   hits {len(result)}')
+
+    def run(self, options):
+        query, repeat = options['query'], options['repeat']
+        self.stdout.write(f'Query: "{query}"')
+        self.timed('documents: full-text', lambda: search.search(query, limit=None), repeat)
+        self.timed('documents: icontains', lambda: search.icontains_search(query), repeat)
+        self.timed('patients: full-text', lambda: search.search_patients(query, limit=None), repeat)
+        self.timed('patients: icontains', lambda: search.icontains_patients(query), repeat)
@@ -0,0 +1,72 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from records.models import Appointment
+
+USERNAME = 'benchmark_sessions'
+
+
+class Command(BaseCommand):
+    help = 'Counts the queries of authenticated requests with each SESSION_PROFILE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5, help='Requests per page, after one warm-up request')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        paths = [reverse('reports'), reverse('settings')]
+        appointment = Appointment.objects.first()
+        if appointment is not None:
+            paths.append(reverse('edit_appointment', args=[appointment.pk]))
+
+        User = get_user_model()
+        user = User.objects.create_user(USERNAME)
+        try:
+            results = {name: self.measure(name, user, paths, options['requests']) for name in settings.SESSION_PROFILES}
+        finally:
+            user.delete()
+
+        profiles = list(results)
+        self.stdout.write(f'{"page":<32}' + ''.join(f'{name + " total":>14}{name + " auth":>13}' for name in profiles))
+        for path in paths:
+            row = f'{path:<32}'
+            for name in profiles:
+                total, auth = results[name][path]
+                row += f'{total:14.1f}{auth:13.1f}'
+            self.stdout.write(row)
+        self.stdout.write('(queries per request; "auth" counts django_session and auth_user queries)')
+
+        leftover = [path for path in paths if results['cached'][path][1]]
+        if leftover:
+            raise CommandError(f'Session or user queries left with the cached profile: {", ".join(leftover)}')
+        self.stdout.write(self.style.SUCCESS('The cached profile serves authenticated requests without session or user queries'))
+
+    def measure(self, name, user, paths, repeat):
+        profile = settings.SESSION_PROFILES[name]
+        with override_settings(**profile):
+            client = Client()
+            client.force_login(user, backend='records.backends.CachedModelBackend')
+            counts = {}
+            for path in paths:
+                client.get(path)  # warm-up: fills the caches
+                total = auth = 0
+                for _ in range(repeat):
+                    with ExitStack() as stack:
+                        captured = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+                        response = client.get(path)
+                    queries = [query for context in captured for query in context.captured_queries]
+                    if response.status_code != 200:
+                        raise CommandError(f'{path} returned {response.status_code} with the {name} profile')
+                    total += len(queries)
+                    auth += sum(1 for q in queries if 'django_session' in q['sql'] or '"auth_user"' in q['sql'])
+                counts[path] = (total / repeat, auth / repeat)
+            client.logout()
+        return counts
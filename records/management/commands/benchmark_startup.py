@@ -0,0 +1,71 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# run in a fresh interpreter so modules already imported by manage.py don't hide the cost
+STARTUP_SCRIPT = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver, resolve; '
+    'get_resolver().url_patterns; '
+    'resolve("/patients/")'
+)
+# optional dependencies that must only be imported by the code paths using them
+HEAVY_MODULES = ('pandas', 'openpyxl', 'PIL')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_startup():
+    """Run django.setup() plus URL resolution under `python -X importtime`.
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) tuples in import order.
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'medical_record_system.settings')}
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise CommandError(f'Startup script failed:\n{proc.stderr[-2000:]}')
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+class Command(BaseCommand):
+    help = 'Measures import time of django.setup() plus URL resolution and fails above the startup budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms', type=float,
+            default=getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', 1000),
+            help='Maximum total import time in milliseconds',
+        )
+        parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        modules = measure_startup()
+        # top-level entries are the imports the script itself triggered; their cumulative times add up to the total
+        top_level = [m for m in modules if m[3] == 0]
+        total_ms = sum(cumulative for _, _, cumulative, _ in top_level) / 1000
+
+        self.stdout.write(f'{len(modules)} modules imported in {total_ms:.1f} ms')
+        for module, _, cumulative, _ in sorted(top_level, key=lambda m: -m[2])[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  {module}')
+
+        loaded = {module.split('.')[0] for module, _, _, _ in modules}
+        heavy = [name for name in HEAVY_MODULES if name in loaded]
+        if heavy:
+            raise CommandError(f'Heavy optional modules imported at startup: {", ".join(heavy)}')
+        if total_ms > options['budget_ms']:
+            raise CommandError(f'Startup imports took {total_ms:.1f} ms, budget is {options["budget_ms"]:.0f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Within the {options["budget_ms"]:.0f} ms startup budget'))
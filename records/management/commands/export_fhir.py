@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from records import routers
+from records.services import fhir_export
+
+
+class Command(BaseCommand):
+    help = 'Exports patient charts as FHIR NDJSON files, one per resource type'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='fhir_export', help='Directory for the .ndjson files')
+        parser.add_argument(
+            '--types',
+            default=','.join(fhir_export.RESOURCES),
+            help='Comma separated resource types (default: all)',
+        )
+        parser.add_argument('--gzip', action='store_true', help='Write .ndjson.gz files')
+        parser.add_argument('--workers', type=int, default=4, help='Resource types exported in parallel')
+
+    def handle(self, *args, **options):
+        types = [t.strip() for t in options['types'].split(',') if t.strip()]
+        try:
+            with routers.replica_reads():
+                # worker threads don't see the replica_reads() context, hand them the alias
+                results = fhir_export.export_to_directory(
+                    options['output'],
+                    resource_types=types,
+                    compress=options['gzip'],
+                    workers=options['workers'],
+                    using=routers.read_alias(),
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+        for resource_type, (path, count) in results.items():
+            self.stdout.write(f'{resource_type}: {count} resources -> {path}')
+        self.stdout.write(self.style.SUCCESS(f'Exported {sum(c for _, c in results.values())} resources'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from records.services import billing
+
+
+class Command(BaseCommand):
+    help = 'Creates invoices for completed appointments that have not been billed yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Appointments per transaction')
+        parser.add_argument('--due-days', type=int, default=billing.DEFAULT_DUE_DAYS)
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of invoices to create')
+
+    def handle(self, *args, **options):
+        created = billing.generate_appointment_invoices(
+            batch_size=options['batch_size'],
+            due_days=options['due_days'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Created {created} invoices'))
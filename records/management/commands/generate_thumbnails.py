@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from records.models import Patient
+from records.services import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generates missing thumbnail/WebP derivatives for patient photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives for every photo')
+
+    def handle(self, *args, **options):
+        patients = Patient.objects.exclude(photo='').exclude(photo__isnull=True)
+        if not options['force']:
+            patients = patients.filter(photo_hash='')
+
+        done = 0
+        for patient_id in patients.values_list('id', flat=True).iterator():
+            if thumbnails.generate_for_patient(patient_id):
+                done += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {done} patients'))
@@ -0,0 +1,48 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from records.services import patient_import
+
+
+class Command(BaseCommand):
+    help = 'Imports patients from a CSV or XLSX file, skipping invalid rows and duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file with a header row (name, dob, gender, phone, email, address)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument('--errors', metavar='CSV', help='Write every rejected row number and reason to this file')
+
+    def handle(self, *args, **options):
+        errors_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        writer = csv.writer(errors_file) if errors_file else None
+        if writer:
+            writer.writerow(['row', 'error'])
+
+        def on_error(number, message):
+            if writer:
+                writer.writerow([number, message])
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = patient_import.import_patients(
+                    fileobj,
+                    options['path'],
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                    on_error=on_error,
+                )
+        except (OSError, patient_import.InvalidImportFile) as e:
+            raise CommandError(str(e))
+        finally:
+            if errors_file:
+                errors_file.close()
+
+        if not writer:
+            for number, message in result.errors:
+                self.stdout.write(self.style.WARNING(f'Row {number}: {message}'))
+            if result.invalid > len(result.errors):
+                self.stdout.write(f'... {result.invalid - len(result.errors)} more, use --errors to list them all')
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'{prefix}{result}'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from records.services import patient_matching
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the fuzzy patient lookup index used for duplicate detection'
+
+    def handle(self, *args, **options):
+        total = patient_matching.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {total} patient match keys'))
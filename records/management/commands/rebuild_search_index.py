@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from records.services import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index of records, prescriptions and treatment plans'
+
+    def handle(self, *args, **options):
+        total = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} documents'))
@@ -0,0 +1,26 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from records.services import prescription_pdf
+
+
+class Command(BaseCommand):
+    help = "Renders the PDFs of a day's prescriptions in parallel worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day the prescriptions were written, YYYY-MM-DD (default: today)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: PRESCRIPTION_PDF_WORKERS or one per CPU)')
+
+    def handle(self, *args, **options):
+        try:
+            day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Invalid date: {options['date']}")
+
+        counts = prescription_pdf.render_day(day, workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Prescriptions of {day}: {counts['rendered']} rendered, {counts['cached']} reused, "
+            f"{counts['current']} already up to date"
+        ))
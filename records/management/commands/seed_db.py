@@ -11,6 +11,7 @@ from records.models import (
     Prescription, TreatmentPlan, Vaccination, DoctorAvailability,
     Medication, Billing, Message, TimeSlot
 )
+from records.services import billing
 
 class Command(BaseCommand):
     help = 'Populates the database with sample data for testing'
@@ -301,14 +302,14 @@ class Command(BaseCommand):
         statuses = [True] * 8 + [False] * 2  # 80% paid, 20% unpaid
         
         for patient in patients:
-            # Create 1 billing record per patient
+            # Create 1 invoice per patient
             amount = random.randint(50, 500)
-            Billing.objects.create(
-                patient=patient,
-                amount=amount,
-                description=f"Consultation fee {Faker().month_name()} {timezone.now().year}",
-                paid=random.choice(statuses)
+            invoice = billing.create_invoice(
+                patient,
+                [(f"Consultation fee {Faker().month_name()} {timezone.now().year}", 1, amount)],
             )
+            if random.choice(statuses):
+                billing.record_payment(invoice.pk, amount)
         
         self.stdout.write(self.style.SUCCESS('Created billing records for all patients'))
     
@@ -324,6 +325,7 @@ class Command(BaseCommand):
             if random.choice([True, False]):
                 Message.objects.create(
                     sender_patient=sender_patient,
+                    doctor=sender_doctor,
                     content=Faker().paragraph(nb_sentences=2),
                     timestamp=Faker().date_time_between(start_date='-30d', end_date='now')
                 )
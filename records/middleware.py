@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+
+from . import routers
+from .services import metrics, profiling
+
+PIN_COOKIE = 'primary_pin'
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client on the primary database for a while after it wrote something.
+
+    Requests carrying the pin cookie never read from a replica; a request that
+    writes sets the cookie for REPLICA_PIN_SECONDS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = PIN_COOKIE in request.COOKIES
+        token = routers.pin_to_primary(pinned)
+        try:
+            response = self.get_response(request)
+            wrote = routers.is_pinned() and not pinned
+        finally:
+            routers.unpin(token)
+        if wrote and getattr(settings, 'DATABASE_REPLICAS', []):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Count requests and time responses per view for the /metrics endpoint."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        # label by URL name, never by raw path, to keep the number of series bounded
+        view = match.view_name if match else 'unresolved'
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, view=view, method=method)
+        metrics.HTTP_REQUESTS.inc(view=view, method=method, status=response.status_code)
+        return response
+
+
+class ProfilerMiddleware:
+    """Run the view under the profiler when a staff user asks for it.
+
+    Goes last in MIDDLEWARE so the CSRF and other view checks still run first.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not profiling.requested(request):
+            return None
+        response, profile = profiling.profile_call(view_func, request, *view_args, **view_kwargs)
+        response['X-Profile-Id'] = profiling.save(request, response, profile)
+        return response
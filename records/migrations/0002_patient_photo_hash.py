@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='photo_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+    ]
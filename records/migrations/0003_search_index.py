@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE records_search_fts USING fts5(
+        body, content='records_searchdocument', content_rowid='id',
+        tokenize='porter unicode61')""",
+    """CREATE TRIGGER records_search_ai AFTER INSERT ON records_searchdocument BEGIN
+        INSERT INTO records_search_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+    """CREATE TRIGGER records_search_ad AFTER DELETE ON records_searchdocument BEGIN
+        INSERT INTO records_search_fts(records_search_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END""",
+    """CREATE TRIGGER records_search_au AFTER UPDATE ON records_searchdocument BEGIN
+        INSERT INTO records_search_fts(records_search_fts, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO records_search_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS records_search_au',
+    'DROP TRIGGER IF EXISTS records_search_ad',
+    'DROP TRIGGER IF EXISTS records_search_ai',
+    'DROP TABLE IF EXISTS records_search_fts',
+]
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX records_search_body_gin ON records_searchdocument USING GIN (to_tsvector('english', body))",
+]
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS records_search_body_gin',
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRESQL_REVERSE}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def populate_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('records', 'SearchDocument')
+    sources = [
+        ('record', apps.get_model('records', 'MedicalRecord'), ['diagnosis', 'treatment']),
+        ('prescription', apps.get_model('records', 'Prescription'), ['medication', 'dosage', 'instructions']),
+        ('treatment_plan', apps.get_model('records', 'TreatmentPlan'), ['description']),
+    ]
+    for kind, model, fields in sources:
+        docs = [
+            SearchDocument(kind=kind, object_id=pk, patient_id=patient_id, body='\n'.join(t for t in text if t))
+            for pk, patient_id, *text in model.objects.values_list('pk', 'patient_id', *fields).iterator()
+        ]
+        SearchDocument.objects.bulk_create(docs, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0002_patient_photo_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('record', 'Medical record'), ('prescription', 'Prescription'), ('treatment_plan', 'Treatment plan')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='records.patient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient', 'kind'], name='records_sea_patient_e655cf_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:59
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of records.services.patient_matching.build_keys as it was when
+# this migration was written, so later changes to the service can't change
+# what this migration does. Patients saved afterwards are re-keyed by the
+# signal with the current version.
+NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]+')
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def normalize_name(name):
+    text = unicodedata.normalize('NFKD', name or '')
+    text = text.encode('ascii', 'ignore').decode('ascii').lower().replace("'", '')
+    return ' '.join(NON_ALNUM_RE.sub(' ', text).split())
+
+
+def soundex(token):
+    token = ''.join(c for c in token.lower() if c.isalpha())
+    if not token:
+        return ''
+    first = token[0]
+    code = first.upper()
+    previous = SOUNDEX_CODES.get(first, '')
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def build_keys(name, phone=''):
+    tokens = normalize_name(name).split()
+    keys = set()
+    for token in tokens:
+        padded = f'  {token} '
+        keys.update(f't:{padded[i:i + 3]}' for i in range(len(padded) - 2))
+    keys.update(f'p:{code}' for code in (soundex(token) for token in tokens) if code)
+    phone = re.sub(r'\D', '', phone or '')[-10:]
+    if len(phone) >= 7:
+        keys.add(f'ph:{phone}')
+    return keys
+
+
+def populate_match_keys(apps, schema_editor):
+    Patient = apps.get_model('records', 'Patient')
+    PatientMatchKey = apps.get_model('records', 'PatientMatchKey')
+    keys = [
+        PatientMatchKey(patient_id=pk, key=key)
+        for pk, name, phone in Patient.objects.values_list('pk', 'name', 'phone').iterator()
+        for key in build_keys(name, phone)
+    ]
+    PatientMatchKey.objects.bulk_create(keys, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=24)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='records.patient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'patient'], name='records_match_key_idx')],
+            },
+        ),
+        migrations.RunPython(populate_match_keys, migrations.RunPython.noop),
+    ]
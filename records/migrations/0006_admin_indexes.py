@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0005_billing_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='doctor',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='name',
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'date'], name='records_appt_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='billing',
+            index=models.Index(fields=['paid', 'created_at'], name='records_billing_paid_created'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0011_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='calendar_token',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'updated_at'], name='records_appt_doctor_updated'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0013_calendar_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='generated_pdf',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='prescriptions/generated/'),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='pdf_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='prescription',
+            name='date_prescribed',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0014_prescription_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='vaccination',
+            name='date_given',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('read_at__isnull', True)), fields=['timestamp'], name='records_message_unread'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:30
+
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+DUE_DAYS = 30
+BATCH_SIZE = 500
+NOTE = 'Migrated from bill #{}'
+
+
+def bills_to_invoices(apps, schema_editor):
+    """One invoice (with one line item, and a payment if paid) per legacy bill."""
+    Billing = apps.get_model('records', 'Billing')
+    Invoice = apps.get_model('records', 'Invoice')
+    InvoiceLineItem = apps.get_model('records', 'InvoiceLineItem')
+    Payment = apps.get_model('records', 'Payment')
+
+    bills = Billing.objects.order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(bills.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        invoices = []
+        for bill in batch:
+            issued = timezone.localdate(bill.created_at)
+            invoices.append(Invoice(
+                patient_id=bill.patient_id,
+                date=issued,
+                due_date=issued + timedelta(days=DUE_DAYS),
+                description=bill.description,
+                amount=bill.amount,
+                amount_paid=bill.amount if bill.paid else 0,
+                status='paid' if bill.paid else 'pending',
+                notes=NOTE.format(bill.pk),
+            ))
+        Invoice.objects.bulk_create(invoices)
+        InvoiceLineItem.objects.bulk_create([
+            InvoiceLineItem(invoice=invoice, description=bill.description or 'Consultation', quantity=1,
+                            unit_price=bill.amount, amount=bill.amount)
+            for bill, invoice in zip(batch, invoices)
+        ])
+        Payment.objects.bulk_create([
+            Payment(invoice=invoice, amount=bill.amount, reference=f'bill #{bill.pk}', paid_at=bill.updated_at)
+            for bill, invoice in zip(batch, invoices) if bill.paid
+        ])
+
+
+def remove_migrated_invoices(apps, schema_editor):
+    Invoice = apps.get_model('records', 'Invoice')
+    Invoice.objects.filter(notes__startswith=NOTE.format('')).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0015_dashboard'),
+    ]
+
+    operations = [
+        migrations.RunPython(bills_to_invoices, remove_migrated_invoices),
+    ]
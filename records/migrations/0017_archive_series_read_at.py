@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0016_billing_to_invoices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedappointment',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_appointments', to='records.appointmentseries'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
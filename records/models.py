@@ -12,7 +12,7 @@ class Department(models.Model):
 
 class Patient(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     dob = models.DateField()
     address = models.TextField()
     email = models.EmailField(blank=True)
@@ -21,6 +21,10 @@ class Patient(models.Model):
     last_visit = models.DateField(null=True, blank=True)
     # optional profile photo
     photo = models.ImageField(upload_to='patient_photos/', null=True, blank=True)
+    # SHA-1 of the current photo, set once its thumbnails have been generated
+    photo_hash = models.CharField(max_length=40, blank=True, editable=False)
+    # versions cached template fragments; queryset.update() must set it too
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -28,16 +32,50 @@ class Patient(models.Model):
 
 class Doctor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True)
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     specialization = models.CharField(max_length=100)
     experience_years = models.PositiveIntegerField(default=0)
     bio = models.TextField(blank=True)
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # secret of the doctor's iCalendar feed URL; empty means no feed
+    calendar_token = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return self.name
 
 
+class AppointmentSeries(models.Model):
+    """A recurring booking, like an RRULE: FREQ, INTERVAL and COUNT or UNTIL.
+
+    The occurrences are materialized as ordinary Appointment rows pointing back
+    here (see records/services/recurrence.py).
+    """
+    FREQUENCY_CHOICES = [
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='appointment_series')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='appointment_series')
+    # first occurrence; later ones keep its local time of day
+    start = models.DateTimeField()
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='weekly')
+    interval = models.PositiveSmallIntegerField(default=1, help_text='Every N weeks or months')
+    count = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Number of occurrences')
+    until = models.DateField(null=True, blank=True, help_text='Last possible date (inclusive)')
+    duration_minutes = models.PositiveIntegerField(default=30)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'appointment series'
+
+    def __str__(self):
+        every = self.get_frequency_display().lower() if self.interval == 1 else f'every {self.interval} {self.frequency[:-2]}s'
+        return f'{self.patient} with {self.doctor}, {every} from {self.start:%Y-%m-%d}'
+
+
 class Appointment(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
@@ -54,6 +92,52 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     # duration in minutes (used to detect overlapping appointments)
     duration_minutes = models.PositiveIntegerField(default=30)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    series = models.ForeignKey(AppointmentSeries, on_delete=models.SET_NULL, null=True, blank=True, related_name='appointments')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'date'], name='records_appt_status_date'),
+            # a doctor's schedule over a date range (conflict checks, calendars)
+            models.Index(fields=['doctor', 'date'], name='records_appt_doctor_date'),
+            # newest change per doctor (calendar feed ETags)
+            models.Index(fields=['doctor', 'updated_at'], name='records_appt_doctor_updated'),
+        ]
+
+
+class WaitlistEntry(models.Model):
+    """A patient waiting for an earlier slot, filled when an appointment is cancelled.
+
+    Either a specific doctor or any doctor of a specialization, between
+    `earliest` and `latest` (see records/services/waitlist.py).
+    """
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('booked', 'Booked'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='waitlist_entries')
+    specialization = models.CharField(max_length=100, blank=True, help_text='Any doctor of this specialization, when no doctor is chosen')
+    earliest = models.DateTimeField()
+    latest = models.DateTimeField()
+    duration_minutes = models.PositiveIntegerField(default=30)
+    # higher first, then first come first served
+    priority = models.PositiveSmallIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    appointment = models.OneToOneField(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            models.Index(fields=['status', 'doctor', 'earliest'], name='records_waitlist_doctor'),
+            models.Index(fields=['status', 'specialization', 'earliest'], name='records_waitlist_spec'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient} waiting for {self.doctor or self.specialization}"
 
 
 class MedicalRecord(models.Model):
@@ -61,6 +145,7 @@ class MedicalRecord(models.Model):
     diagnosis = models.CharField(max_length=255)
     treatment = models.TextField()
     date_recorded = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     # allow storing a report file
     report = models.FileField(upload_to='medical_reports/', null=True, blank=True)
 
@@ -68,11 +153,15 @@ class MedicalRecord(models.Model):
 class Prescription(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
-    date_prescribed = models.DateTimeField(auto_now_add=True)
+    date_prescribed = models.DateTimeField(auto_now_add=True, db_index=True)
     medication = models.CharField(max_length=255)
     dosage = models.CharField(max_length=255)
     instructions = models.TextField()
     prescription_file = models.FileField(upload_to='prescriptions/', null=True, blank=True)
+    # printable PDF generated from the fields above (see records/services/prescription_pdf.py)
+    generated_pdf = models.FileField(upload_to='prescriptions/generated/', null=True, blank=True, editable=False)
+    # content hash of the inputs generated_pdf was rendered from
+    pdf_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return f"Prescription for {self.patient} by {self.doctor} on {self.date_prescribed}"
@@ -92,7 +181,8 @@ class TreatmentPlan(models.Model):
 class Vaccination(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     vaccine_name = models.CharField(max_length=200)
-    date_given = models.DateField()
+    date_given = models.DateField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
     notes = models.TextField(blank=True)
 
 
@@ -109,6 +199,7 @@ class DoctorAvailability(models.Model):
     day_of_week = models.IntegerField(choices=DAY_CHOICES)
     start_time = models.TimeField()
     end_time = models.TimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['doctor', 'day_of_week', 'start_time']
@@ -123,6 +214,7 @@ class Medication(models.Model):
     dosage_instructions = models.TextField()
     start_date = models.DateField(null=True, blank=True)
     end_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
 class Billing(models.Model):
@@ -131,14 +223,113 @@ class Billing(models.Model):
     description = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     paid = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['paid', 'created_at'], name='records_billing_paid_created'),
+        ]
+
+
+class Invoice(models.Model):
+    """Billing ledger header. Totals are denormalised from line items and payments.
+
+    `amount` is the sum of the line items and `amount_paid` the sum of the
+    payments; both are maintained by records/services/billing.py so lists and
+    aging reports never have to join the detail tables.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('partial', 'Partially paid'),
+        ('paid', 'Paid'),
+        ('void', 'Void'),
+    ]
+    OPEN_STATUSES = ('pending', 'partial')
+
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='invoices')
+    # at most one invoice per appointment; manual invoices have none
+    appointment = models.OneToOneField(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='invoice')
+    date = models.DateField()
+    due_date = models.DateField()
+    description = models.CharField(max_length=255, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date', '-id']
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='records_invoice_status_due'),
+            models.Index(fields=['patient', 'date'], name='records_invoice_patient_date'),
+            models.Index(fields=['date'], name='records_invoice_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice_number} - {self.patient}"
+
+    @property
+    def invoice_number(self):
+        return f"INV-{self.pk:06d}" if self.pk else ''
+
+    @property
+    def balance(self):
+        return self.amount - self.amount_paid
+
+    @property
+    def is_overdue(self):
+        from django.utils import timezone
+        return self.status in self.OPEN_STATUSES and self.due_date < timezone.localdate()
+
+
+class InvoiceLineItem(models.Model):
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='items')
+    description = models.CharField(max_length=255)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.description} x{self.quantity}"
+
+
+class Payment(models.Model):
+    METHOD_CHOICES = [
+        ('cash', 'Cash'),
+        ('card', 'Card'),
+        ('insurance', 'Insurance'),
+        ('transfer', 'Bank transfer'),
+    ]
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES, default='cash')
+    reference = models.CharField(max_length=100, blank=True)
+    paid_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-paid_at']
+
+    def __str__(self):
+        return f"{self.amount} on {self.invoice.invoice_number}"
 
 
 class Message(models.Model):
     # simple patient-doctor messaging
     sender_patient = models.ForeignKey(Patient, on_delete=models.CASCADE, null=True, blank=True)
     sender_doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True)
+    # the doctor a patient's message is addressed to
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='received_messages')
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # set when staff have read a patient's message
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp'], condition=models.Q(read_at__isnull=True), name='records_message_unread'),
+        ]
 
 
 class TimeSlot(models.Model):
@@ -147,9 +338,107 @@ class TimeSlot(models.Model):
     start = models.DateTimeField()
     end = models.DateTimeField()
     available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['doctor', 'start']
+        indexes = [
+            models.Index(fields=['doctor', 'start'], name='records_timeslot_doctor_start'),
+        ]
 
     def __str__(self):
         return f"{self.doctor.name}: {self.start} - {self.end} ({'available' if self.available else 'busy'})"
+
+
+class PatientMatchKey(models.Model):
+    """Inverted index of name trigrams, Soundex codes and phone numbers.
+
+    Used to spot likely duplicate patients at registration, see
+    records/services/patient_matching.py.
+    """
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='match_keys')
+    key = models.CharField(max_length=24)
+
+    class Meta:
+        indexes = [
+            # covers the key IN (...) GROUP BY patient_id lookup
+            models.Index(fields=['key', 'patient'], name='records_match_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient_id}: {self.key}"
+
+
+class SearchDocument(models.Model):
+    """Searchable text of a medical record, prescription or treatment plan.
+
+    Kept in sync by signals (see records/signals.py). The full-text index itself
+    lives outside the ORM: an FTS5 table on SQLite, a GIN index on PostgreSQL.
+    """
+    KIND_CHOICES = [
+        ('record', 'Medical record'),
+        ('prescription', 'Prescription'),
+        ('treatment_plan', 'Treatment plan'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='search_documents')
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['patient', 'kind']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}"
+
+
+class ArchivedAppointment(models.Model):
+    """Appointment moved out of the hot table by manage.py archive_old_data.
+
+    Keeps the original primary key, see records/services/archive.py.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='archived_appointments')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='archived_appointments')
+    invoice = models.OneToOneField(Invoice, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_appointment')
+    series = models.ForeignKey(AppointmentSeries, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_appointments')
+    date = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    duration_minutes = models.PositiveIntegerField(default=30)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['patient', 'date'], name='records_archappt_patient_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient_id} with {self.doctor_id} on {self.date} (archived)"
+
+
+class ArchivedMessage(models.Model):
+    """Message moved out of the hot table by manage.py archive_old_data."""
+    id = models.BigIntegerField(primary_key=True)
+    sender_patient = models.ForeignKey(Patient, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_messages')
+    sender_doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_messages')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name='archived_received_messages')
+    content = models.TextField()
+    timestamp = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['sender_patient', 'timestamp'], name='records_archmsg_patient_ts'),
+        ]
@@ -0,0 +1,90 @@
+"""
+Database router sending read-only traffic to replicas.
+
+Reads only leave the primary inside `replica_reads()` (or views decorated
+with `read_only_view`): the report, export and list pages opt in, everything
+else keeps reading from 'default'. Auth, sessions and other apps always use
+the primary.
+
+Read-your-writes: the first write of a request pins the rest of it to the
+primary (outside requests: the rest of the thread), and
+ReadYourWritesMiddleware carries the pin over to the client's next requests
+for REPLICA_PIN_SECONDS, long enough for the replicas to catch up.
+
+Replicas are listed in settings.DATABASE_REPLICAS. With none configured the
+router is a no-op.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_APPS = {'records'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+def read_alias():
+    """Alias the next read of a records model goes to."""
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    if replicas and _replica_reads.get() and not _pinned.get():
+        return random.choice(replicas)
+    return DEFAULT_DB_ALIAS
+
+
+def pin_to_primary(pinned=True):
+    """Set the read-your-writes pin; returns a token for `unpin`."""
+    return _pinned.set(pinned)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+@contextmanager
+def replica_reads():
+    """Send the reads inside the block to a replica (unless pinned to the primary)."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_only_view(view):
+    """Serve GET/HEAD requests of a view from a replica."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS:
+            return DEFAULT_DB_ALIAS
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        # anything read after a write in this request must see it
+        _pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
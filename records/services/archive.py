@@ -0,0 +1,172 @@
+"""
+Archive Module
+
+Keeps the hot Appointment, Message and TimeSlot tables small. Rows older than
+a cutoff are copied into ArchivedAppointment / ArchivedMessage and deleted from
+the hot table, one transaction per batch, so a long run never holds a big lock
+and can be interrupted at any point:
+
+    pick a batch of old primary keys -> bulk_create archive rows -> delete hot rows
+
+Archive rows keep the original primary key. Past time slots carry no history
+worth keeping and are simply deleted.
+
+Only finished appointments are archived: cancelled ones, and completed ones
+that already have an invoice (generate_invoices still needs the others).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+APPOINTMENT_FIELDS = [
+    'id', 'patient_id', 'doctor_id', 'series_id', 'date', 'notes', 'status', 'duration_minutes', 'created_at', 'updated_at',
+]
+MESSAGE_FIELDS = ['id', 'sender_patient_id', 'sender_doctor_id', 'doctor_id', 'content', 'timestamp', 'read_at']
+
+
+def _cutoff(days, setting, default):
+    if days is None:
+        days = getattr(settings, setting, default)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_appointments(cutoff):
+    from ..models import Appointment
+
+    return Appointment.objects.filter(
+        Q(status='cancelled') | Q(status='completed', invoice__isnull=False),
+        date__lt=cutoff,
+    )
+
+
+def _move_batches(queryset, archive_model, fields, batch_size, expressions=None, before_delete=None):
+    """
+    Move the rows of `queryset` into `archive_model`, `batch_size` at a time.
+
+    `fields` and `expressions` are read with values() and passed to the
+    archive model as keyword arguments.
+
+    Returns:
+        int: Number of rows moved
+    """
+    model = queryset.model
+    moved = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            rows = model.objects.filter(pk__in=ids).values(*fields, **(expressions or {}))
+            archive_model.objects.bulk_create([archive_model(**row) for row in rows])
+            if before_delete:
+                before_delete(ids)
+            model.objects.filter(pk__in=ids).delete()
+        moved += len(ids)
+        logger.info("Archived %d %s rows", moved, model._meta.model_name)
+    return moved
+
+
+def _detach_invoices(appointment_ids):
+    # the archive row now holds the link; clear it here instead of letting the
+    # delete collector do it so updated_at moves with it
+    from ..models import Invoice
+
+    Invoice.objects.filter(appointment_id__in=appointment_ids).update(appointment=None, updated_at=timezone.now())
+
+
+def archive_appointments(days=None, batch_size=None, dry_run=False):
+    """
+    Move finished appointments older than `days` into ArchivedAppointment.
+
+    Args:
+        days (int): Age in days (default ARCHIVE_APPOINTMENTS_AFTER_DAYS)
+        batch_size (int): Rows per transaction (default ARCHIVE_BATCH_SIZE)
+        dry_run (bool): Only count the rows that would be moved
+
+    Returns:
+        int: Number of appointments archived (or archivable, for dry runs)
+    """
+    from ..models import ArchivedAppointment
+
+    queryset = archivable_appointments(_cutoff(days, 'ARCHIVE_APPOINTMENTS_AFTER_DAYS', 730))
+    if dry_run:
+        return queryset.count()
+    return _move_batches(
+        queryset, ArchivedAppointment, APPOINTMENT_FIELDS,
+        batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        expressions={'invoice_id': F('invoice__id')},
+        before_delete=_detach_invoices,
+    )
+
+
+def archive_messages(days=None, batch_size=None, dry_run=False):
+    """
+    Move messages older than `days` into ArchivedMessage.
+
+    Args:
+        days (int): Age in days (default ARCHIVE_MESSAGES_AFTER_DAYS)
+        batch_size (int): Rows per transaction (default ARCHIVE_BATCH_SIZE)
+        dry_run (bool): Only count the rows that would be moved
+
+    Returns:
+        int: Number of messages archived (or archivable, for dry runs)
+    """
+    from ..models import ArchivedMessage, Message
+
+    queryset = Message.objects.filter(timestamp__lt=_cutoff(days, 'ARCHIVE_MESSAGES_AFTER_DAYS', 730))
+    if dry_run:
+        return queryset.count()
+    return _move_batches(
+        queryset, ArchivedMessage, MESSAGE_FIELDS,
+        batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+    )
+
+
+def prune_time_slots(days=None, batch_size=None, dry_run=False):
+    """
+    Delete time slots that ended more than `days` ago.
+
+    Args:
+        days (int): Age in days (default TIMESLOT_RETENTION_DAYS)
+        batch_size (int): Rows per transaction (default ARCHIVE_BATCH_SIZE)
+        dry_run (bool): Only count the rows that would be deleted
+
+    Returns:
+        int: Number of time slots deleted (or deletable, for dry runs)
+    """
+    from ..models import TimeSlot
+
+    queryset = TimeSlot.objects.filter(end__lt=_cutoff(days, 'TIMESLOT_RETENTION_DAYS', 1))
+    if dry_run:
+        return queryset.count()
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        TimeSlot.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+    return deleted
+
+
+def patient_history(patient_id):
+    """
+    Archived appointments and messages of one patient, newest first.
+
+    Returns:
+        dict: 'appointments' and 'messages' querysets
+    """
+    from ..models import ArchivedAppointment, ArchivedMessage
+
+    return {
+        'appointments': ArchivedAppointment.objects.filter(patient_id=patient_id).select_related('doctor', 'invoice'),
+        'messages': ArchivedMessage.objects.filter(sender_patient_id=patient_id).select_related('doctor'),
+    }
@@ -0,0 +1,61 @@
+"""
+Background Task Module
+
+This module provides a small in-process worker pool for jobs that should not
+block a request (image processing, notifications, ...). Jobs run on a shared
+thread pool; set BACKGROUND_TASKS_ASYNC = False to run them inline, which is
+handy for management commands and tests.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    """Return the shared thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'BACKGROUND_TASKS_WORKERS', 2)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='records-bg')
+    return _executor
+
+
+def _run(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Background task {func.__name__} failed: {str(e)}", exc_info=True)
+        raise
+    finally:
+        # Worker threads get their own DB connections; don't leak them.
+        close_old_connections()
+        metrics.BACKGROUND_TASKS_IN_FLIGHT.dec()
+
+
+def submit(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on the background pool.
+
+    Args:
+        func (callable): The job to run
+
+    Returns:
+        concurrent.futures.Future or None: The future for the job, or None
+        when the job was executed inline
+    """
+    if not getattr(settings, 'BACKGROUND_TASKS_ASYNC', True):
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Task {func.__name__} failed: {str(e)}", exc_info=True)
+        return None
+    metrics.BACKGROUND_TASKS_IN_FLIGHT.inc()
+    return get_executor().submit(_run, func, *args, **kwargs)
@@ -0,0 +1,243 @@
+"""
+Billing Ledger Module
+
+Invoices, line items and payments. Invoice.amount and Invoice.amount_paid are
+denormalised totals kept in step here, which lets the aging report and the
+revenue figures come out of one aggregate query over the invoice table.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEE = Decimal('50.00')
+DEFAULT_DUE_DAYS = 30
+AGING_BUCKETS = [
+    ('0-30', 0, 30),
+    ('31-60', 31, 60),
+    ('61-90', 61, 90),
+    ('90+', 91, None),
+]
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0.00'), output_field=MONEY)
+
+
+def consultation_fee(doctor):
+    """Fee for an appointment, by specialization with a global default."""
+    fees = getattr(settings, 'CONSULTATION_FEES', {})
+    default = Decimal(str(getattr(settings, 'DEFAULT_CONSULTATION_FEE', DEFAULT_FEE)))
+    return Decimal(str(fees.get(doctor.specialization, default)))
+
+
+@transaction.atomic
+def create_invoice(patient, items, date=None, due_days=DEFAULT_DUE_DAYS, description='', notes='', appointment=None, due_date=None):
+    """
+    Create an invoice with its line items.
+
+    Args:
+        patient (Patient): Who is billed
+        items (list): (description, quantity, unit_price) tuples
+        date (date): Issue date, defaults to today
+        due_days (int): Payment term in days
+        due_date (date): Explicit due date, overrides due_days
+
+    Returns:
+        Invoice: The saved invoice
+    """
+    from ..models import Invoice, InvoiceLineItem
+
+    date = date or timezone.localdate()
+    lines = [
+        InvoiceLineItem(description=desc, quantity=qty, unit_price=Decimal(price), amount=Decimal(price) * qty)
+        for desc, qty, price in items
+    ]
+    invoice = Invoice.objects.create(
+        patient=patient,
+        appointment=appointment,
+        date=date,
+        due_date=due_date or date + timedelta(days=due_days),
+        description=description or (lines[0].description if lines else ''),
+        amount=sum((line.amount for line in lines), Decimal('0.00')),
+        notes=notes,
+    )
+    for line in lines:
+        line.invoice = invoice
+    InvoiceLineItem.objects.bulk_create(lines)
+    return invoice
+
+
+def record_payment(invoice_id, amount, method='cash', reference='', paid_at=None):
+    """
+    Apply a (possibly partial) payment to an invoice.
+
+    The running total and the status are updated by a single UPDATE so two
+    concurrent payments can't overwrite each other.
+
+    Returns:
+        Payment: The saved payment
+    """
+    from ..models import Invoice, Payment
+
+    amount = Decimal(amount)
+    if amount <= 0:
+        raise ValueError('Payment amount must be positive')
+    with transaction.atomic():
+        new_paid = F('amount_paid') + amount
+        updated = Invoice.objects.filter(pk=invoice_id, status__in=Invoice.OPEN_STATUSES).update(
+            amount_paid=new_paid,
+            status=Case(
+                When(amount__lte=new_paid, then=Value('paid')),
+                default=Value('partial'),
+            ),
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise ValueError('Invoice is not open for payments')
+        return Payment.objects.create(
+            invoice_id=invoice_id,
+            amount=amount,
+            method=method,
+            reference=reference,
+            paid_at=paid_at or timezone.now(),
+        )
+
+
+def recalculate_totals(invoice_id, items=True, payments=True):
+    """
+    Recompute an invoice's stored totals and status from its rows.
+
+    For edits that don't go through create_invoice/record_payment, such as
+    changing line items or payments in the admin. Only the totals asked for
+    are recomputed, so amounts settled without Payment rows (the admin's
+    "paid in full" action) stay settled when only line items change.
+
+    Returns:
+        Invoice: The updated invoice
+    """
+    from ..models import Invoice
+
+    with transaction.atomic():
+        invoice = Invoice.objects.select_for_update().get(pk=invoice_id)
+        if items:
+            invoice.items.update(amount=F('quantity') * F('unit_price'))
+            invoice.amount = invoice.items.aggregate(total=Coalesce(Sum('amount'), ZERO))['total']
+        if payments:
+            invoice.amount_paid = invoice.payments.aggregate(total=Coalesce(Sum('amount'), ZERO))['total']
+        if invoice.status != 'void':
+            if invoice.amount_paid <= 0:
+                invoice.status = 'pending'
+            elif invoice.amount_paid < invoice.amount:
+                invoice.status = 'partial'
+            else:
+                invoice.status = 'paid'
+        invoice.save(update_fields=['amount', 'amount_paid', 'status', 'updated_at'])
+    return invoice
+
+
+def generate_appointment_invoices(batch_size=500, due_days=DEFAULT_DUE_DAYS, limit=None):
+    """
+    Invoice every completed appointment that has no invoice yet.
+
+    Appointments are walked by primary key in batches; each batch is one
+    transaction with one bulk insert for invoices and one for line items.
+
+    Args:
+        batch_size (int): Appointments per transaction
+        due_days (int): Payment term in days
+        limit (int): Stop after this many invoices (None for all)
+
+    Returns:
+        int: Number of invoices created
+    """
+    from ..models import Appointment, Invoice, InvoiceLineItem
+
+    pending = (
+        Appointment.objects.filter(status='completed', invoice__isnull=True)
+        .select_related('doctor')
+        .order_by('pk')
+    )
+    created = 0
+    last_pk = 0
+    while limit is None or created < limit:
+        size = batch_size if limit is None else min(batch_size, limit - created)
+        batch = list(pending.filter(pk__gt=last_pk)[:size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        with transaction.atomic():
+            invoices = []
+            lines = []
+            for appt in batch:
+                fee = consultation_fee(appt.doctor)
+                issued = timezone.localdate(appt.date) if timezone.is_aware(appt.date) else appt.date.date()
+                description = f"Consultation - {appt.doctor.name}"
+                invoices.append(Invoice(
+                    patient_id=appt.patient_id,
+                    appointment=appt,
+                    date=issued,
+                    due_date=issued + timedelta(days=due_days),
+                    description=description,
+                    amount=fee,
+                ))
+                lines.append(InvoiceLineItem(description=description, quantity=1, unit_price=fee, amount=fee))
+            # bulk_create fills in primary keys on SQLite and PostgreSQL
+            Invoice.objects.bulk_create(invoices)
+            for invoice, line in zip(invoices, lines):
+                line.invoice = invoice
+            InvoiceLineItem.objects.bulk_create(lines)
+        created += len(batch)
+        logger.info(f"Invoiced {created} appointments so far")
+    return created
+
+
+def ledger_summary(as_of=None, queryset=None):
+    """
+    Revenue totals and the aging of open balances, in one aggregate query.
+
+    Aging buckets count days past the due date; balances not yet due are
+    reported as 'current'. Pass a filtered Invoice queryset to summarise a
+    subset, e.g. one patient's invoices.
+
+    Returns:
+        dict: total_revenue, paid_amount, outstanding_amount, overdue_amount,
+        open_invoices and aging (list of (label, amount))
+    """
+    from ..models import Invoice
+
+    as_of = as_of or timezone.localdate()
+    balance = F('amount') - F('amount_paid')
+    is_open = Q(status__in=Invoice.OPEN_STATUSES)
+
+    def open_sum(condition):
+        return Coalesce(Sum(Case(When(is_open & condition, then=balance), default=ZERO, output_field=MONEY)), ZERO)
+
+    # Buckets compare due_date against constants so the (status, due_date)
+    # index can be used; no per-row date arithmetic in SQL.
+    aggregates = {
+        'total_revenue': Coalesce(Sum('amount', filter=~Q(status='void')), ZERO),
+        'paid_amount': Coalesce(Sum('amount_paid'), ZERO),
+        'outstanding_amount': open_sum(Q()),
+        'overdue_amount': open_sum(Q(due_date__lt=as_of)),
+        'open_invoices': Count('id', filter=is_open),
+        'current': open_sum(Q(due_date__gte=as_of)),
+    }
+    for label, low, high in AGING_BUCKETS:
+        condition = Q(due_date__lte=as_of - timedelta(days=low or 1))
+        if high is not None:
+            condition &= Q(due_date__gte=as_of - timedelta(days=high))
+        aggregates[f'aging_{label}'] = open_sum(condition)
+
+    if queryset is None:
+        queryset = Invoice.objects.all()
+    totals = queryset.order_by().aggregate(**aggregates)
+    totals['aging'] = [('current', totals.pop('current'))] + [
+        (label, totals.pop(f'aging_{label}')) for label, _, _ in AGING_BUCKETS
+    ]
+    return totals
@@ -0,0 +1,144 @@
+"""
+Reference Data Cache Module
+
+Caches read-mostly reference data (departments, doctors, doctor availability)
+in the Django cache configured by REFERENCE_CACHE_ALIAS, which can be any
+backend: locmem, file based, Redis, ...
+
+Keys are versioned per model. Every cached value records the version of each
+model it was built from, and saving or deleting a row of that model replaces
+the version once the transaction commits (see records/signals.py), so stale
+entries are simply never read again and expire on their own. Versions are
+random tokens rather than counters: when a version key is evicted, the new
+one can't coincide with a version that entries were cached under before.
+
+Bulk queryset.update() calls bypass the signals; call invalidate() after them.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+
+KEY_PREFIX = 'refcache'
+DEFAULT_TIMEOUT = 60 * 60
+
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')]
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    metrics.REFERENCE_CACHE_EVENTS.inc(event=name)
+
+
+def stats():
+    """Hit/miss/invalidation counters of this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _version_key(model):
+    return f'{KEY_PREFIX}:version:{model._meta.label_lower}'
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def invalidate(model):
+    """Give a model a new version, orphaning every entry built from it."""
+    get_cache().set(_version_key(model), _new_version(), timeout=None)
+    _count('invalidations')
+
+
+def _versions(models):
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # never stored, or evicted: start fresh versions. add() keeps a version
+        # another process stored meanwhile, and we read back whichever won.
+        fresh = {key: _new_version() for key in missing}
+        for key, version in fresh.items():
+            cache.add(key, version, timeout=None)
+        found.update({**fresh, **cache.get_many(missing)})
+    return [found[key] for key in keys]
+
+
+def cached(name, models, builder, timeout=None):
+    """
+    Return builder() from the cache, rebuilding it when any model changed.
+
+    Args:
+        name (str): Identifies the cached value, e.g. 'doctor_list'
+        models (list): Models the value is derived from
+        builder (callable): Produces the value on a miss; it must be picklable
+        timeout (int): Seconds to keep the value, defaults to REFERENCE_CACHE_TIMEOUT
+
+    Returns:
+        The cached or freshly built value
+    """
+    cache = get_cache()
+    key = f"{KEY_PREFIX}:{name}:{'.'.join(_versions(models))}"
+    value = cache.get(key)
+    if value is not None:
+        _count('hits')
+        return value
+    _count('misses')
+    value = builder()
+    if timeout is None:
+        timeout = getattr(settings, 'REFERENCE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    cache.set(key, value, timeout)
+    return value
+
+
+def all_doctors():
+    """Every doctor with its department, ordered by name."""
+    from ..models import Department, Doctor
+
+    return cached(
+        'doctors',
+        [Doctor, Department],
+        lambda: list(Doctor.objects.select_related('department').order_by('name')),
+    )
+
+
+def get_doctor(pk):
+    """A single doctor with its department, or None."""
+    from ..models import Department, Doctor
+
+    return cached(
+        f'doctor:{pk}',
+        [Doctor, Department],
+        lambda: Doctor.objects.select_related('department').filter(pk=pk).first(),
+    )
+
+
+def doctor_choices():
+    """(pk, label) pairs for doctor <select> widgets."""
+    from ..models import Doctor
+
+    return cached(
+        'doctor_choices',
+        [Doctor],
+        lambda: [('', '---------')] + [(pk, name) for pk, name in Doctor.objects.order_by('name').values_list('pk', 'name')],
+    )
+
+
+def doctor_availabilities(doctor_id):
+    from ..models import DoctorAvailability
+
+    return cached(
+        f'availabilities:{doctor_id}',
+        [DoctorAvailability],
+        lambda: list(DoctorAvailability.objects.filter(doctor_id=doctor_id).order_by('day_of_week', 'start_time')),
+    )
@@ -0,0 +1,143 @@
+"""
+Calendar Grid Module
+
+Lays out appointments and open time slots as a day, week or month calendar
+for one doctor or a whole department.
+
+Each kind of row is fetched with one plain `date >= X AND date < Y` range
+query (no date casts on the column, so the (doctor, date) and
+(doctor, start) indexes apply), then dropped into its day cell in a
+single pass. Every week carries a version string for the {% cache %} tag,
+built from the rows it shows, so unchanged weeks are not rendered again.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+from . import fragment_cache
+
+VIEWS = ('day', 'week', 'month')
+
+
+def period(view, day):
+    """
+    First and last-exclusive date shown by a view around a day.
+
+    Weeks start on Monday; a month view covers the whole weeks around it.
+
+    Returns:
+        tuple: (first date, date after the last one)
+    """
+    if view == 'day':
+        return day, day + timedelta(days=1)
+    if view == 'week':
+        first = day - timedelta(days=day.weekday())
+        return first, first + timedelta(weeks=1)
+    month_start = day.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    first = month_start - timedelta(days=month_start.weekday())
+    last = next_month + timedelta(days=(7 - next_month.weekday()) % 7)
+    return first, last
+
+
+def step(view, day, direction):
+    """The day one view earlier (direction=-1) or later (direction=1)."""
+    if view == 'day':
+        return day + timedelta(days=direction)
+    if view == 'week':
+        return day + timedelta(weeks=direction)
+    month = day.month - 1 + direction
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _scoped(queryset, doctor_id, department_id):
+    if doctor_id:
+        return queryset.filter(doctor_id=doctor_id)
+    if department_id:
+        return queryset.filter(doctor__department_id=department_id)
+    return queryset
+
+
+def load(first, last, doctor_id=None, department_id=None, using=None):
+    """
+    Appointments and open slots between two dates: one query each.
+
+    Returns:
+        tuple: (appointments, time slots), ordered by start
+    """
+    from ..models import Appointment, TimeSlot
+
+    start, end = _aware(first), _aware(last)
+    appointments = (
+        _scoped(Appointment.objects.using(using), doctor_id, department_id)
+        .filter(date__gte=start, date__lt=end)
+        .select_related('patient', 'doctor')
+        .only('date', 'duration_minutes', 'status', 'updated_at', 'patient__name', 'patient__updated_at',
+              'doctor__name', 'doctor__updated_at')
+        .order_by('date')
+    )
+    slots = (
+        _scoped(TimeSlot.objects.using(using), doctor_id, department_id)
+        .filter(start__gte=start, start__lt=end, available=True)
+        .only('doctor_id', 'start', 'end', 'updated_at')
+        .order_by('start')
+    )
+    return list(appointments), list(slots)
+
+
+def build(view, day, appointments, slots, scope=''):
+    """
+    Group rows into weeks of day cells in one pass.
+
+    Args:
+        view (str): 'day', 'week' or 'month'
+        day (date): Any day inside the period
+        appointments (list): Appointments of the period, ordered by date
+        slots (list): Open time slots of the period, ordered by start
+        scope (str): Identifies the doctor/department, part of the versions
+
+    Returns:
+        list: Weeks, each a dict with 'days' (cells) and 'version'
+    """
+    first, last = period(view, day)
+    today = timezone.localdate()
+    cells = {}
+    current = first
+    while current < last:
+        cells[current] = {
+            'date': current,
+            'appointments': [],
+            'free_slots': 0,
+            'today': current == today,
+            'outside': view == 'month' and current.month != day.month,
+        }
+        current += timedelta(days=1)
+
+    rows = {}
+    for appointment in appointments:
+        local_day = timezone.localtime(appointment.date).date()
+        if local_day in cells:
+            cells[local_day]['appointments'].append(appointment)
+            rows.setdefault(local_day, []).append(appointment)
+    for slot in slots:
+        local_day = timezone.localtime(slot.start).date()
+        if local_day in cells:
+            cells[local_day]['free_slots'] += 1
+            rows.setdefault(local_day, []).append(slot)
+
+    days = list(cells.values())
+    weeks = []
+    for offset in range(0, len(days), 7):
+        week = days[offset:offset + 7]
+        week_rows = [row for cell in week for row in rows.get(cell['date'], [])]
+        marks = ''.join('T' if cell['today'] else 'O' if cell['outside'] else '-' for cell in week)
+        weeks.append({
+            'start': week[0]['date'],
+            'days': week,
+            'version': f"{view}:{scope}:{week[0]['date'].isoformat()}:{marks}:{fragment_cache.version_for(week_rows)}",
+        })
+    return weeks
@@ -0,0 +1,147 @@
+"""
+Conditional GET Module
+
+Lets pages answer 304 Not Modified without running their queries or
+rendering. Each page has a state function that returns, in a single query,
+the newest updated_at and the row counts of everything the page shows; the
+counts catch deletions, which don't move the newest timestamp.
+
+The ETag also carries the user id, because pages differ per user (navigation,
+CSRF tokens), and responses are marked private/no-cache so browsers always
+revalidate instead of guessing freshness.
+"""
+import hashlib
+from functools import wraps
+
+from django.contrib import messages
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def _related(model, fk, **filters):
+    """Newest updated_at and row count of model rows pointing at the outer row."""
+    rows = (
+        model.objects.filter(**{fk: OuterRef('pk')}, **filters)
+        .order_by()
+        .values(fk)
+        .annotate(latest=Max('updated_at'), total=Count('pk'))
+    )
+    return Subquery(rows.values('latest')), Subquery(rows.values('total'))
+
+
+def _state(row, names):
+    """Reduce an annotated row to (last_modified, fingerprint)."""
+    stamps = [row['updated_at']] + [row[f'{name}_latest'] for name in names]
+    counts = [row[f'{name}_total'] or 0 for name in names]
+    latest = max(stamp for stamp in stamps if stamp is not None)
+    return latest, '.'.join(str(count) for count in counts)
+
+
+def _annotated(queryset, related):
+    annotations = {}
+    for name, (model, fk, filters) in related.items():
+        annotations[f'{name}_latest'], annotations[f'{name}_total'] = _related(model, fk, **filters)
+    return queryset.annotate(**annotations).values('updated_at', *annotations).first()
+
+
+def patient_state(pk):
+    """State of everything patient_detail renders for one patient."""
+    from ..models import Invoice, MedicalRecord, Medication, Patient, Vaccination
+
+    related = {
+        'records': (MedicalRecord, 'patient', {}),
+        'vaccinations': (Vaccination, 'patient', {}),
+        'medications': (Medication, 'patient', {}),
+        'invoices': (Invoice, 'patient', {}),
+    }
+    row = _annotated(Patient.objects.filter(pk=pk), related)
+    if not row:
+        return None
+    latest, fingerprint = _state(row, related)
+    # invoices turn overdue and the billing summary ages by the day
+    return latest, f'{fingerprint}.{timezone.localdate().isoformat()}'
+
+
+def doctor_state(pk):
+    """State of a doctor's schedule page: the doctor, availability and open slots."""
+    from ..models import Doctor, DoctorAvailability, TimeSlot
+
+    now = timezone.now()
+    related = {
+        'availabilities': (DoctorAvailability, 'doctor', {}),
+        # slots drop off the page as they start, so count only future ones
+        'slots': (TimeSlot, 'doctor', {'available': True, 'start__gt': now}),
+    }
+    row = _annotated(Doctor.objects.filter(pk=pk), related)
+    if not row:
+        return None
+    latest, fingerprint = _state(row, related)
+    # the page lists the next seven days
+    return latest, f'{fingerprint}.{timezone.localdate().isoformat()}'
+
+
+def appointment_list_state():
+    """State of the appointment list: all appointments plus the names they show."""
+    from ..models import Appointment, Doctor, Patient
+
+    def newest(model):
+        return Subquery(model.objects.order_by('-updated_at').values('updated_at')[:1])
+
+    row = Appointment.objects.order_by().aggregate(
+        appointments=Max('updated_at'),
+        total=Count('pk'),
+        patients=Max(newest(Patient)),
+        doctors=Max(newest(Doctor)),
+    )
+    stamps = [row[name] for name in ('appointments', 'patients', 'doctors') if row[name] is not None]
+    if not stamps:
+        return None
+    return max(stamps), str(row['total'])
+
+
+def conditional_page(state_func):
+    """
+    Decorator answering GET/HEAD with 304 when the page's state is unchanged.
+
+    Args:
+        state_func (callable): Called with the view's URL kwargs; returns
+            (last_modified, fingerprint) or None to skip the check
+
+    Usage:
+        @conditional_page(conditional.patient_state)
+        def patient_detail(request, pk): ...
+    """
+    def state(request, *args, **kwargs):
+        if not hasattr(request, '_page_state'):
+            request._page_state = None
+            # a pending flash message must be rendered, never 304'd away
+            if request.method in ('GET', 'HEAD') and not len(messages.get_messages(request)):
+                request._page_state = state_func(*args, **kwargs)
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        current = state(request, *args, **kwargs)
+        if current is None:
+            return None
+        latest, fingerprint = current
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        raw = f'{user}:{latest.isoformat()}:{fingerprint}:{request.get_full_path()}'
+        return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+    def last_modified(request, *args, **kwargs):
+        current = state(request, *args, **kwargs)
+        return current[0] if current else None
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
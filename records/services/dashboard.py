@@ -0,0 +1,261 @@
+"""
+Dashboard Module
+
+Widgets of the clinic dashboard. Each widget is one small aggregate query
+over an indexed column, cached on its own for its own time
+(DASHBOARD_WIDGET_TIMEOUTS): today's appointments go stale within a minute,
+the patient count can be reused for much longer.
+
+collect() returns every widget within a fixed latency budget
+(DASHBOARD_BUDGET_MS), however large the tables grow:
+
+- fresh cached values are used as they are;
+- expired ones, kept for another DASHBOARD_STALE_SECONDS, are served while a
+  refresh runs in the background;
+- missing ones are computed concurrently on a small thread pool, each thread
+  with its own database connection. A widget that misses the budget is shown
+  as unavailable and cached when its query finishes, for the next request.
+
+A widget is never computed twice at once: requests arriving while it runs
+wait for the same future. With BACKGROUND_TASKS_ASYNC = False widgets are
+computed inline, like background jobs.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'dashboard'
+DEFAULT_BUDGET_MS = 300
+DEFAULT_STALE_SECONDS = 10 * 60
+DEFAULT_WORKERS = 4
+UPCOMING_DAYS = 14
+LIST_SIZE = 5
+
+_executor = None
+_running = {}
+_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the dashboard's thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'DASHBOARD_WORKERS', DEFAULT_WORKERS)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='records-dash')
+    return _executor
+
+
+def get_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+# -- widgets -------------------------------------------------------------------
+# Each takes the database alias and the local date, and returns plain values
+# (they are pickled into the cache).
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def patient_count(using, today):
+    from ..models import Patient
+
+    return Patient.objects.using(using).count()
+
+
+def doctor_count(using, today):
+    from ..models import Doctor
+
+    return Doctor.objects.using(using).count()
+
+
+def today_appointments(using, today):
+    """Today's appointments per doctor, on the (doctor, date) index."""
+    from ..models import Appointment
+
+    start, end = _day_range(today)
+    rows = list(
+        Appointment.objects.using(using)
+        .filter(date__gte=start, date__lt=end).exclude(status='cancelled')
+        .values('doctor_id', 'doctor__name')
+        .annotate(total=Count('id'), completed=Count('id', filter=Q(status='completed')))
+        .order_by('doctor__name')
+    )
+    return {'total': sum(row['total'] for row in rows), 'doctors': rows}
+
+
+def upcoming_appointments(using, today):
+    from ..models import Appointment
+
+    return list(
+        Appointment.objects.using(using)
+        .filter(status='scheduled', date__gte=timezone.now())
+        .order_by('date')
+        .values('id', 'date', 'status', 'patient__name', 'doctor__name')[:10]
+    )
+
+
+def unpaid_bills(using, today):
+    """Count and outstanding balance of open invoices, on the (status, due_date) index."""
+    from ..models import Invoice
+
+    return Invoice.objects.using(using).filter(status__in=Invoice.OPEN_STATUSES).aggregate(
+        count=Count('id'), total=Sum(F('amount') - F('amount_paid')),
+    )
+
+
+def upcoming_vaccinations(using, today):
+    from ..models import Vaccination
+
+    vaccinations = Vaccination.objects.using(using).filter(
+        date_given__gte=today, date_given__lt=today + timedelta(days=UPCOMING_DAYS),
+    )
+    return {
+        'count': vaccinations.count(),
+        'next': list(vaccinations.order_by('date_given').values('date_given', 'vaccine_name', 'patient__name')[:LIST_SIZE]),
+    }
+
+
+def unread_messages(using, today):
+    """Patient messages nobody has read yet, on the partial 'unread' index."""
+    from ..models import Message
+
+    messages = Message.objects.using(using).filter(read_at__isnull=True, sender_patient__isnull=False)
+    return {
+        'count': messages.count(),
+        'latest': list(messages.order_by('-timestamp').values('timestamp', 'content', 'sender_patient__name')[:LIST_SIZE]),
+    }
+
+
+WIDGETS = {
+    'patient_count': patient_count,
+    'doctor_count': doctor_count,
+    'today_appointments': today_appointments,
+    'upcoming_appointments': upcoming_appointments,
+    'unpaid_bills': unpaid_bills,
+    'upcoming_vaccinations': upcoming_vaccinations,
+    'unread_messages': unread_messages,
+}
+DEFAULT_TIMEOUTS = {
+    'patient_count': 10 * 60,
+    'doctor_count': 60 * 60,
+    'today_appointments': 60,
+    'upcoming_appointments': 60,
+    'unpaid_bills': 5 * 60,
+    'upcoming_vaccinations': 30 * 60,
+    'unread_messages': 60,
+}
+
+
+# -- collecting ----------------------------------------------------------------
+
+def timeout_for(name):
+    return getattr(settings, 'DASHBOARD_WIDGET_TIMEOUTS', {}).get(name, DEFAULT_TIMEOUTS[name])
+
+
+def _key(name, today):
+    # the date is part of the key, so day-based widgets roll over at midnight
+    return f'{KEY_PREFIX}:{name}:{today.isoformat()}'
+
+
+def compute(name, using=None, today=None):
+    """Run one widget's query and cache the result."""
+    today = today or timezone.localdate()
+    value = WIDGETS[name](using, today)
+    timeout = timeout_for(name)
+    get_cache().set(
+        _key(name, today), (time.time() + timeout, value),
+        timeout + getattr(settings, 'DASHBOARD_STALE_SECONDS', DEFAULT_STALE_SECONDS),
+    )
+    return value
+
+
+def _compute_in_thread(name, using, today):
+    try:
+        return compute(name, using, today)
+    except Exception as e:
+        logger.error(f"Dashboard widget {name} failed: {str(e)}", exc_info=True)
+        raise
+    finally:
+        # pool threads get their own DB connections; don't leak them
+        close_old_connections()
+        with _lock:
+            _running.pop(name, None)
+
+
+def _start(name, using, today):
+    """The running computation of a widget, started if there is none."""
+    with _lock:
+        future = _running.get(name)
+        if future is None:
+            future = _running[name] = get_executor().submit(_compute_in_thread, name, using, today)
+    return future
+
+
+def collect(using=None, names=None):
+    """
+    Every widget's value, within DASHBOARD_BUDGET_MS.
+
+    Args:
+        using (str): Database alias to read from (the pool threads don't see
+            the request's replica routing)
+        names (list): Widgets to collect, defaults to all
+
+    Returns:
+        dict: Widget name -> value, None for widgets that failed or are
+        still being computed
+    """
+    today = timezone.localdate()
+    names = list(names or WIDGETS)
+    inline = not getattr(settings, 'BACKGROUND_TASKS_ASYNC', True)
+    cached = get_cache().get_many([_key(name, today) for name in names])
+
+    values, pending = {}, {}
+    for name in names:
+        entry = cached.get(_key(name, today))
+        if entry is not None:
+            expires, values[name] = entry
+            if expires > time.time():
+                metrics.DASHBOARD_WIDGETS.inc(widget=name, result='hit')
+                continue
+            metrics.DASHBOARD_WIDGETS.inc(widget=name, result='stale')
+            if not inline:
+                _start(name, using, today)
+        elif inline:
+            try:
+                values[name] = compute(name, using, today)
+                metrics.DASHBOARD_WIDGETS.inc(widget=name, result='computed')
+            except Exception as e:
+                logger.error(f"Dashboard widget {name} failed: {str(e)}", exc_info=True)
+                values[name] = None
+                metrics.DASHBOARD_WIDGETS.inc(widget=name, result='error')
+        else:
+            pending[name] = _start(name, using, today)
+
+    if pending:
+        wait(pending.values(), timeout=getattr(settings, 'DASHBOARD_BUDGET_MS', DEFAULT_BUDGET_MS) / 1000)
+        for name, future in pending.items():
+            if not future.done():
+                values[name] = None
+                metrics.DASHBOARD_WIDGETS.inc(widget=name, result='timeout')
+            elif future.exception() is not None:
+                values[name] = None
+                metrics.DASHBOARD_WIDGETS.inc(widget=name, result='error')
+            else:
+                values[name] = future.result()
+                metrics.DASHBOARD_WIDGETS.inc(widget=name, result='computed')
+    return values
+
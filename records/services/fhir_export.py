@@ -0,0 +1,263 @@
+"""
+FHIR Export Module
+
+Exports patient charts as FHIR-shaped resources in NDJSON (one JSON resource
+per line), the format of the FHIR Bulk Data API:
+
+    Patient, Appointment, Condition (MedicalRecord), MedicationRequest
+    (Prescription), Immunization (Vaccination), MedicationStatement
+    (Medication) and CarePlan (TreatmentPlan)
+
+Rows are read with values().iterator() so neither model instances nor whole
+tables are held in memory. export_to_directory() writes one file per resource
+type, several types at a time on a thread pool, optionally gzipped;
+stream_resource() feeds a StreamingHttpResponse.
+"""
+import gzip
+import json
+import logging
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 2000
+STREAM_BUFFER = 64 * 1024
+
+APPOINTMENT_STATUS = {'scheduled': 'booked', 'cancelled': 'cancelled', 'completed': 'fulfilled'}
+FHIR_GENDERS = {'male', 'female', 'other'}
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _ref(kind, pk, display=None):
+    ref = {'reference': f'{kind}/{pk}'}
+    if display:
+        ref['display'] = display
+    return ref
+
+
+def _compact(resource):
+    """Drop empty fields; FHIR doesn't allow nulls or empty arrays."""
+    return {key: value for key, value in resource.items() if value not in (None, '', [], {})}
+
+
+def _patient(row):
+    gender = (row['gender'] or '').lower()
+    telecom = []
+    if row['phone']:
+        telecom.append({'system': 'phone', 'value': row['phone']})
+    if row['email']:
+        telecom.append({'system': 'email', 'value': row['email']})
+    return _compact({
+        'resourceType': 'Patient',
+        'id': str(row['id']),
+        'name': [{'text': row['name']}],
+        'gender': gender if gender in FHIR_GENDERS else 'unknown',
+        'birthDate': _date(row['dob']),
+        'telecom': telecom,
+        'address': [{'text': row['address']}] if row['address'] else [],
+    })
+
+
+def _appointment(row):
+    start = row['date']
+    return _compact({
+        'resourceType': 'Appointment',
+        'id': str(row['id']),
+        'status': APPOINTMENT_STATUS.get(row['status'], 'booked'),
+        'start': _date(start),
+        'end': _date(start + timedelta(minutes=row['duration_minutes'])) if start else None,
+        'minutesDuration': row['duration_minutes'],
+        'comment': row['notes'],
+        'participant': [
+            {'actor': _ref('Patient', row['patient_id']), 'status': 'accepted'},
+            {'actor': _ref('Practitioner', row['doctor_id'], row['doctor__name']), 'status': 'accepted'},
+        ],
+    })
+
+
+def _condition(row):
+    return _compact({
+        'resourceType': 'Condition',
+        'id': str(row['id']),
+        'subject': _ref('Patient', row['patient_id']),
+        'code': {'text': row['diagnosis']},
+        'recordedDate': _date(row['date_recorded']),
+        'note': [{'text': row['treatment']}] if row['treatment'] else [],
+    })
+
+
+def _medication_request(row):
+    dosage = {'text': row['dosage']}
+    if row['instructions']:
+        dosage['patientInstruction'] = row['instructions']
+    return _compact({
+        'resourceType': 'MedicationRequest',
+        'id': str(row['id']),
+        'status': 'active',
+        'intent': 'order',
+        'medicationCodeableConcept': {'text': row['medication']},
+        'subject': _ref('Patient', row['patient_id']),
+        'requester': _ref('Practitioner', row['doctor_id'], row['doctor__name']),
+        'authoredOn': _date(row['date_prescribed']),
+        'dosageInstruction': [dosage],
+    })
+
+
+def _immunization(row):
+    return _compact({
+        'resourceType': 'Immunization',
+        'id': str(row['id']),
+        'status': 'completed',
+        'vaccineCode': {'text': row['vaccine_name']},
+        'patient': _ref('Patient', row['patient_id']),
+        'occurrenceDateTime': _date(row['date_given']),
+        'note': [{'text': row['notes']}] if row['notes'] else [],
+    })
+
+
+def _medication_statement(row):
+    return _compact({
+        'resourceType': 'MedicationStatement',
+        'id': str(row['id']),
+        'status': 'completed' if row['end_date'] else 'active',
+        'medicationCodeableConcept': {'text': row['name']},
+        'subject': _ref('Patient', row['patient_id']),
+        'effectivePeriod': _compact({'start': _date(row['start_date']), 'end': _date(row['end_date'])}),
+        'dosage': [{'text': row['dosage_instructions']}] if row['dosage_instructions'] else [],
+    })
+
+
+def _care_plan(row):
+    return _compact({
+        'resourceType': 'CarePlan',
+        'id': str(row['id']),
+        'status': 'completed' if row['end_date'] else 'active',
+        'intent': 'plan',
+        'subject': _ref('Patient', row['patient_id']),
+        'author': _ref('Practitioner', row['doctor_id'], row['doctor__name']),
+        'period': _compact({'start': _date(row['start_date']), 'end': _date(row['end_date'])}),
+        'description': row['description'],
+    })
+
+
+# resource type -> (model name, fields, builder)
+RESOURCES = {
+    'Patient': ('Patient', ['id', 'name', 'gender', 'dob', 'phone', 'email', 'address'], _patient),
+    'Appointment': ('Appointment', ['id', 'patient_id', 'doctor_id', 'doctor__name', 'date', 'duration_minutes', 'status', 'notes'], _appointment),
+    'Condition': ('MedicalRecord', ['id', 'patient_id', 'diagnosis', 'treatment', 'date_recorded'], _condition),
+    'MedicationRequest': ('Prescription', ['id', 'patient_id', 'doctor_id', 'doctor__name', 'medication', 'dosage', 'instructions', 'date_prescribed'], _medication_request),
+    'Immunization': ('Vaccination', ['id', 'patient_id', 'vaccine_name', 'date_given', 'notes'], _immunization),
+    'MedicationStatement': ('Medication', ['id', 'patient_id', 'name', 'dosage_instructions', 'start_date', 'end_date'], _medication_statement),
+    'CarePlan': ('TreatmentPlan', ['id', 'patient_id', 'doctor_id', 'doctor__name', 'start_date', 'end_date', 'description'], _care_plan),
+}
+
+# rows moved out of the hot table by manage.py archive_old_data are exported too
+ARCHIVE_MODELS = {
+    'Appointment': 'ArchivedAppointment',
+}
+
+
+def iter_resources(resource_type, using=None):
+    """
+    Yield one NDJSON line (with trailing newline) per row of a resource type.
+
+    Args:
+        resource_type (str): A key of RESOURCES, e.g. 'Patient'
+        using (str): Database alias to read from (default: routed)
+    """
+    from django.apps import apps
+
+    model_name, fields, build = RESOURCES[resource_type]
+    model_names = [model_name] + ([ARCHIVE_MODELS[resource_type]] if resource_type in ARCHIVE_MODELS else [])
+    for name in model_names:
+        model = apps.get_model('records', name)
+        rows = model.objects.using(using).order_by('pk').values(*fields).iterator(chunk_size=CHUNK_ROWS)
+        for row in rows:
+            yield json.dumps(build(row), separators=(',', ':')) + '\n'
+
+
+def stream_resource(resource_type, compress=False, using=None):
+    """
+    Byte chunks of a resource type's NDJSON, optionally as a gzip stream.
+
+    Lines are buffered into ~64 KB chunks so a response isn't one write per row.
+    The response body is consumed after the view returns, so pass `using`
+    rather than relying on the router's replica_reads() block.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # 31 = gzip container
+    buffer = []
+    size = 0
+    for line in iter_resources(resource_type, using):
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= STREAM_BUFFER:
+            chunk = b''.join(buffer)
+            buffer, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def _write_file(resource_type, directory, compress, using=None):
+    path = os.path.join(directory, f"{resource_type}.ndjson{'.gz' if compress else ''}")
+    opener = gzip.open if compress else open
+    count = 0
+    with opener(path, 'wt', encoding='utf-8') as out:
+        for line in iter_resources(resource_type, using):
+            out.write(line)
+            count += 1
+    logger.info(f"Exported {count} {resource_type} resources to {path}")
+    return path, count
+
+
+def _write_in_thread(resource_type, directory, compress, using):
+    try:
+        return _write_file(resource_type, directory, compress, using)
+    finally:
+        # each worker thread opened its own database connection
+        connections.close_all()
+
+
+def export_to_directory(directory, resource_types=None, compress=False, workers=4, using=None):
+    """
+    Write one NDJSON file per resource type into directory.
+
+    Args:
+        directory (str): Output directory, created if missing
+        resource_types (list): Subset of RESOURCES to export (default: all)
+        compress (bool): Write .ndjson.gz files
+        workers (int): Resource types exported concurrently; 1 runs inline
+        using (str): Database alias to read from (default: routed)
+
+    Returns:
+        dict: resource type -> (path, resource count)
+    """
+    resource_types = list(resource_types or RESOURCES)
+    unknown = set(resource_types) - set(RESOURCES)
+    if unknown:
+        raise ValueError(f"Unknown resource types: {', '.join(sorted(unknown))}")
+    os.makedirs(directory, exist_ok=True)
+
+    if workers <= 1:
+        return {resource_type: _write_file(resource_type, directory, compress, using) for resource_type in resource_types}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fhir-export') as pool:
+        futures = {
+            resource_type: pool.submit(_write_in_thread, resource_type, directory, compress, using)
+            for resource_type in resource_types
+        }
+        return {resource_type: future.result() for resource_type, future in futures.items()}
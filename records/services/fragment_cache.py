@@ -0,0 +1,54 @@
+"""
+Template Fragment Cache Module
+
+Builds the version strings used as vary-on keys for Django's {% cache %} tag.
+A version covers each row's primary key and updated_at, plus the updated_at
+of any related rows already loaded through select_related, so a fragment is
+re-rendered as soon as anything it displays changes and the stale entry just
+ages out of the cache.
+
+Usage in a template:
+
+    {% load cache fragments %}
+    {% cache 3600 appointment_rows appointments|fragment_version %}
+        {% for app in appointments %}
+            {% cache 3600 appointment_row app|fragment_version %}...{% endcache %}
+        {% endfor %}
+    {% endcache %}
+"""
+import hashlib
+
+from django.db.models import Model
+
+
+def _stamp(obj):
+    updated_at = getattr(obj, 'updated_at', None)
+    return updated_at.isoformat() if updated_at else ''
+
+
+def _describe(obj):
+    parts = [f'{obj._meta.label_lower}:{obj.pk}:{_stamp(obj)}']
+    # related objects fetched with select_related live in the fields cache
+    for related in obj._state.fields_cache.values():
+        if isinstance(related, Model):
+            parts.append(f'{related._meta.label_lower}:{related.pk}:{_stamp(related)}')
+    return '|'.join(parts)
+
+
+def version_for(objects):
+    """
+    Digest identifying the current state of one object or a list of objects.
+
+    Args:
+        objects (Model or iterable): Rows the fragment renders
+
+    Returns:
+        str: A short hex digest, stable across processes
+    """
+    if isinstance(objects, Model):
+        objects = [objects]
+    digest = hashlib.sha1()
+    for obj in objects:
+        digest.update(_describe(obj).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()[:20]
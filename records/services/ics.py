@@ -0,0 +1,195 @@
+"""
+iCalendar Feed Module
+
+Per-doctor appointment feeds for calendar apps (RFC 5545). A feed URL carries
+the doctor's secret calendar_token, so calendar apps can subscribe without a
+login; resetting the token in the admin revokes every subscription.
+
+Calendar apps poll often, so a feed costs as little as possible:
+
+- feed_state() checks the token and reads the newest appointment change and
+  the appointment count in one query on the (doctor, updated_at) index. The
+  view derives its ETag and Last-Modified from that and answers 304 without
+  building anything.
+- Clients that don't revalidate get the body from the cache, keyed by the
+  same state, so it is built once per change.
+- Building it streams over an indexed date range query, filling the cache
+  as it goes.
+
+Patient names only appear in events when ICS_FEED_PATIENT_NAMES is on, since
+feeds end up on third-party calendar servers.
+
+Event UIDs end in ICS_FEED_UID_DOMAIN, so they stay the same whichever host
+name a calendar app subscribed with; without it the request's host is used
+and is part of the cache key.
+"""
+import hashlib
+import logging
+import secrets
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAST_DAYS = 30
+DEFAULT_FUTURE_DAYS = 365
+DEFAULT_CACHE_TIMEOUT = 60 * 60 * 24
+CACHE_PREFIX = 'ics'
+PRODID = '-//Medical Record System//Doctor Schedule//EN'
+STATUSES = {'scheduled': 'CONFIRMED', 'completed': 'CONFIRMED', 'cancelled': 'CANCELLED'}
+
+
+def new_token():
+    return secrets.token_urlsafe(24)
+
+
+def _show_patient_names():
+    return getattr(settings, 'ICS_FEED_PATIENT_NAMES', False)
+
+
+def feed_state(doctor_id, token, using=None):
+    """
+    Check a feed token and describe the feed's current contents, in one query.
+
+    Returns:
+        dict or None: doctor name, last_modified and etag; None when the
+        doctor doesn't exist or the token is wrong
+    """
+    from ..models import Doctor
+
+    stats = {'latest': Max('appointment__updated_at'), 'total': Count('appointment')}
+    if _show_patient_names():
+        stats['patients'] = Max('appointment__patient__updated_at')
+    row = (
+        Doctor.objects.using(using).filter(pk=doctor_id).exclude(calendar_token='')
+        .values('name', 'calendar_token', 'updated_at').annotate(**stats).order_by('name').first()
+    )
+    if row is None or not secrets.compare_digest(row['calendar_token'], token):
+        return None
+    stamps = [row['updated_at'], row['latest'], row.get('patients')]
+    last_modified = max(stamp for stamp in stamps if stamp is not None)
+    # the window moves daily, and the settings shape the body
+    raw = ':'.join(str(part) for part in (
+        doctor_id, token, last_modified.isoformat(), row['total'], timezone.localdate(),
+        _show_patient_names(), *_window_days(),
+    ))
+    return {'name': row['name'], 'last_modified': last_modified, 'etag': hashlib.sha1(raw.encode()).hexdigest()[:24]}
+
+
+def uid_domain(host):
+    """Domain of the event UIDs: ICS_FEED_UID_DOMAIN, else the request's host."""
+    return getattr(settings, 'ICS_FEED_UID_DOMAIN', '') or host.split(':')[0]
+
+
+def _window_days():
+    return (
+        getattr(settings, 'ICS_FEED_PAST_DAYS', DEFAULT_PAST_DAYS),
+        getattr(settings, 'ICS_FEED_FUTURE_DAYS', DEFAULT_FUTURE_DAYS),
+    )
+
+
+def escape(value):
+    """Escape a TEXT value."""
+    return (
+        value.replace('\\', '\\\\').replace(';', r'\;').replace(',', r'\,')
+        .replace('\r\n', r'\n').replace('\n', r'\n').replace('\r', r'\n')
+    )
+
+
+def fold(line):
+    """Fold a content line at 75 octets, without splitting UTF-8 characters."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start, limit = end, 74  # continuation lines start with a space
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(appointment, dtstamp, domain):
+    if _show_patient_names():
+        summary = f'Appointment: {appointment.patient.name}'
+    else:
+        summary = 'Patient appointment'
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{appointment.pk}@{domain}',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART:{_stamp(appointment.date)}',
+        f'DTEND:{_stamp(appointment.date + timedelta(minutes=appointment.duration_minutes))}',
+        f'LAST-MODIFIED:{_stamp(appointment.updated_at)}',
+        f'SUMMARY:{escape(summary)}',
+        f'STATUS:{STATUSES.get(appointment.status, "CONFIRMED")}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def iter_feed(doctor_id, name, domain, using=None, chunk_size=500):
+    """
+    Yield the feed's text in pieces: header, one chunk per event, footer.
+
+    Events cover ICS_FEED_PAST_DAYS back to ICS_FEED_FUTURE_DAYS ahead,
+    read with a `date >= X AND date < Y` range on the (doctor, date) index.
+    """
+    from ..models import Appointment
+
+    past_days, future_days = _window_days()
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    fields = ['date', 'duration_minutes', 'status', 'updated_at']
+    appointments = (
+        Appointment.objects.using(using)
+        .filter(doctor_id=doctor_id, date__gte=today - timedelta(days=past_days), date__lt=today + timedelta(days=future_days))
+        .order_by('date')
+    )
+    if _show_patient_names():
+        appointments = appointments.select_related('patient')
+        fields.append('patient__name')
+    appointments = appointments.only(*fields)
+    yield ''.join(fold(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape(name)}',
+    ])
+    dtstamp = _stamp(timezone.now())
+    for appointment in appointments.iterator(chunk_size=chunk_size):
+        yield _event(appointment, dtstamp, domain)
+    yield fold('END:VCALENDAR')
+
+
+def cached_feed(doctor_id, state, domain, using=None):
+    """
+    The feed for this state: from the cache, or streamed and cached as it goes.
+
+    Returns:
+        iterable: str chunks
+    """
+    cache = caches[getattr(settings, 'ICS_FEED_CACHE_ALIAS', 'default')]
+    key = f"{CACHE_PREFIX}:{doctor_id}:{domain}:{state['etag']}"
+    body = cache.get(key)
+    if body is not None:
+        return [body]
+
+    def generate():
+        chunks = []
+        for chunk in iter_feed(doctor_id, state['name'], domain, using=using):
+            chunks.append(chunk)
+            yield chunk
+        cache.set(key, ''.join(chunks), getattr(settings, 'ICS_FEED_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+        logger.info(f"Built calendar feed of doctor {doctor_id} ({len(chunks) - 2} events)")
+    return generate()
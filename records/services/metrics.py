@@ -0,0 +1,323 @@
+"""
+Metrics Module
+
+Counters, gauges and histograms exposed in the Prometheus text format by the
+/metrics view. The metrics of the app are declared at the bottom of this
+module and updated where things happen:
+
+    metrics.BOOKINGS.inc(result='created')
+    with metrics.SMS_SEND_SECONDS.time():
+        ...
+
+Values live in the process. Under a prefork server (gunicorn, uWSGI) each
+worker only knows its own numbers, so point METRICS_MULTIPROCESS_DIR at a
+directory shared by the workers: every process then writes a snapshot of its
+values to <dir>/<pid>.json (at most every METRICS_FLUSH_INTERVAL seconds, and
+at exit) and a scrape adds up the snapshots of all processes. Counters and
+histograms of exited workers keep counting; gauges only include live ones.
+Empty the directory when the server is restarted.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {', '.join(self.labelnames) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        """JSON-serializable [[label values], value] pairs."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError('Counters can only go up')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        registry.changed()
+
+    @staticmethod
+    def merge(values):
+        return sum(values)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        registry.changed()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        registry.changed()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @staticmethod
+    def merge(values):
+        return sum(values)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+        registry.changed()
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), {'buckets': list(v['buckets']), 'sum': v['sum'], 'count': v['count']}]
+                    for key, v in self._values.items()]
+
+    @staticmethod
+    def merge(values):
+        values = list(values)
+        return {
+            'buckets': [sum(column) for column in zip(*(v['buckets'] for v in values))],
+            'sum': sum(v['sum'] for v in values),
+            'count': sum(v['count'] for v in values),
+        }
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._flush_timer = None
+        self._pid = os.getpid()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self.metrics()}
+
+    # -- multi-process mode --------------------------------------------------
+
+    def directory(self):
+        return getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+
+    def changed(self):
+        """Write this process's snapshot if it is due (multi-process mode only)."""
+        if not self.directory():
+            return
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked worker: the parent's timer thread didn't come along
+                self._pid = os.getpid()
+                self._flush_timer = None
+                self._last_flush = 0.0
+            wait = self._last_flush + interval - time.monotonic()
+            if wait > 0:
+                # flush the latest values even if nothing else happens for a while
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(wait, self.flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                return
+            self._last_flush = time.monotonic()
+        self.flush()
+
+    def flush(self):
+        directory = self.directory()
+        if not directory:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            self._flush_timer = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as out:
+                json.dump(self.snapshot(), out)
+            os.replace(tmp_path, os.path.join(directory, f'{os.getpid()}.json'))
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot to {directory}: {str(e)}")
+
+    def _process_snapshots(self):
+        """(pid, snapshot) of every process, this one read live."""
+        own_pid = os.getpid()
+        yield own_pid, self.snapshot()
+        directory = self.directory()
+        if not directory or not os.path.isdir(directory):
+            return
+        for filename in os.listdir(directory):
+            pid, ext = os.path.splitext(filename)
+            if ext != '.json' or not pid.isdigit() or int(pid) == own_pid:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as f:
+                    yield int(pid), json.load(f)
+            except (OSError, ValueError):
+                # being replaced right now, or garbage; skip it this time
+                continue
+
+    # -- exposition ----------------------------------------------------------
+
+    def collect(self):
+        """name -> {label values tuple: merged value} over all processes."""
+        merged = {metric.name: {} for metric in self.metrics()}
+        metrics = {metric.name: metric for metric in self.metrics()}
+        for pid, snapshot in self._process_snapshots():
+            for name, samples in snapshot.items():
+                if name not in metrics:
+                    continue
+                if metrics[name].type == 'gauge' and pid != os.getpid() and not _pid_alive(pid):
+                    continue
+                for key, value in samples:
+                    merged[name].setdefault(tuple(key), []).append(value)
+        return {
+            name: {key: metrics[name].merge(values) for key, values in series.items()}
+            for name, series in merged.items()
+        }
+
+    def exposition(self):
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        collected = self.collect()
+        lines = []
+        for metric in sorted(self.metrics(), key=lambda m: m.name):
+            lines.append(f'# HELP {metric.name} {_escape(metric.documentation)}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for key, value in sorted(collected[metric.name].items()):
+                if metric.type == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value['buckets']):
+                        cumulative += count
+                        le = [('le', _format_value(bound))]
+                        lines.append(f'{metric.name}_bucket{_labels(metric.labelnames, key, le)} {cumulative}')
+                    lines.append(f'{metric.name}_sum{_labels(metric.labelnames, key)} {_format_value(value["sum"])}')
+                    lines.append(f'{metric.name}_count{_labels(metric.labelnames, key)} {value["count"]}')
+                else:
+                    lines.append(f'{metric.name}{_labels(metric.labelnames, key)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Metrics of this app
+
+HTTP_REQUESTS = counter('records_http_requests_total', 'HTTP requests by view, method and status code', ['view', 'method', 'status'])
+HTTP_REQUEST_SECONDS = histogram('records_http_request_duration_seconds', 'Time to produce a response, by view', ['view', 'method'])
+BOOKINGS = counter('records_appointment_bookings_total', 'Appointment booking attempts by result', ['result'])
+APPOINTMENT_CONFLICTS = counter('records_appointment_conflicts_total', 'Bookings rejected because the doctor is busy')
+APPOINTMENT_STATUS_UPDATES = counter('records_appointment_status_updates_total', 'Appointments whose status was set, by status and source', ['status', 'source'])
+WAITLIST_BACKFILLS = counter('records_waitlist_backfills_total', 'Cancelled slots offered to the waitlist, by result', ['result'])
+MESSAGES = counter('records_messages_total', 'Patient messages sent to doctors')
+SMS_MESSAGES = counter('records_sms_messages_total', 'SMS messages by result', ['result'])
+SMS_SEND_SECONDS = histogram('records_sms_send_duration_seconds', 'Time spent handing an SMS to the gateway')
+REFERENCE_CACHE_EVENTS = counter('records_reference_cache_events_total', 'Reference data cache hits, misses and invalidations', ['event'])
+DASHBOARD_WIDGETS = counter('records_dashboard_widgets_total', 'Dashboard widgets served, by widget and source (hit, stale, computed, timeout, error)', ['widget', 'result'])
+BACKGROUND_TASKS_IN_FLIGHT = gauge('records_background_tasks_in_flight', 'Background jobs queued or running')
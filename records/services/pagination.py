@@ -0,0 +1,119 @@
+"""
+Keyset Pagination Module
+
+Paginates by "seeking" past the last row seen instead of using OFFSET, so
+page 5,000 costs the same as page 1 and no COUNT(*) is needed. The ordering
+must end in a unique column (normally 'id') for the cursor to be exact.
+
+Cursors are opaque URL-safe tokens encoding the ordering values of the
+boundary row.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, previous_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _split(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def encode_cursor(obj, ordering):
+    values = []
+    for name, _ in _split(ordering):
+        value = getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+        fields = _split(ordering)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [model._meta.get_field(name).to_python(value) for (name, _), value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        raise InvalidCursor('Malformed cursor')
+
+
+def _seek(ordering, values, forward):
+    """
+    Build the WHERE clause selecting rows after (or before) a boundary row:
+    (a > x) OR (a = x AND b > y) OR ... with > / < following each column's
+    direction.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(_split(ordering), values):
+        after = descending != forward  # ascending+forward -> gt
+        lookup = 'gt' if after else 'lt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate(queryset, ordering, after=None, before=None, page_size=25):
+    """
+    Return one page of queryset ordered by ordering.
+
+    Args:
+        queryset (QuerySet): Rows to page through (filters already applied)
+        ordering (list): Order fields, e.g. ['-date', '-id']; last one unique
+        after (str): Cursor of the last row of the previous page
+        before (str): Cursor of the first row of the next page (going back)
+        page_size (int): Rows per page
+
+    Returns:
+        KeysetPage: items plus next/previous cursors (None at either end)
+    """
+    model = queryset.model
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+
+    if cursor:
+        values = decode_cursor(cursor, model, ordering)
+        queryset = queryset.filter(_seek(ordering, values, forward=not backwards))
+    if backwards:
+        reversed_ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        rows = list(queryset.order_by(*reversed_ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        items = list(reversed(rows[:page_size]))
+        has_next, has_previous = True, has_more
+    else:
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        items = rows[:page_size]
+        has_next, has_previous = has_more, bool(cursor)
+
+    next_cursor = encode_cursor(items[-1], ordering) if items and has_next else None
+    previous_cursor = encode_cursor(items[0], ordering) if items and has_previous else None
+    return KeysetPage(items, next_cursor, previous_cursor)
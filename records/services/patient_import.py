@@ -0,0 +1,225 @@
+"""
+Patient Import Module
+
+Bulk-loads patients from CSV or XLSX files. Rows are streamed from the file,
+validated with the PatientForm rules, de-duplicated and inserted batch by
+batch, so memory stays flat however large the file is:
+
+    read rows -> validate a batch -> drop duplicates -> bulk_create (one transaction)
+
+Duplicates are rows whose (name, date of birth) or (phone, date of birth)
+matches an existing patient or an earlier row of the same batch. Earlier
+batches are already in the database when a batch is checked, so the one
+query per batch also catches duplicates across the whole file (except in dry
+runs, where nothing is written).
+"""
+import codecs
+import csv
+import logging
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+from .patient_matching import build_keys, normalize_name, normalize_phone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 200
+FIELDS = ['name', 'dob', 'gender', 'phone', 'email', 'address']
+HEADER_ALIASES = {
+    'full_name': 'name',
+    'patient_name': 'name',
+    'date_of_birth': 'dob',
+    'birth_date': 'dob',
+    'birthdate': 'dob',
+    'sex': 'gender',
+    'phone_number': 'phone',
+    'mobile': 'phone',
+    'email_address': 'email',
+}
+
+
+class InvalidImportFile(ValueError):
+    pass
+
+
+class ImportResult:
+    """Counters of an import plus the first errors, as (row number, message)."""
+
+    def __init__(self, max_errors=MAX_REPORTED_ERRORS):
+        self.rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row_number, message):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, message))
+
+    def __str__(self):
+        return (f"{self.rows} rows: {self.created} created, {self.duplicates} duplicates, "
+                f"{self.invalid} invalid")
+
+
+def _normalize_header(header):
+    key = '_'.join(str(header or '').strip().lower().replace('-', ' ').split())
+    return HEADER_ALIASES.get(key, key)
+
+
+def _csv_rows(fileobj):
+    # uploads and files opened in binary mode are decoded on the fly
+    if 'b' in getattr(fileobj, 'mode', 'b'):
+        fileobj = codecs.getreader('utf-8-sig')(fileobj)
+    reader = csv.reader(fileobj)
+    header = next(reader, None)
+    if header is None:
+        return
+    yield [_normalize_header(h) for h in header]
+    yield from reader
+
+
+def _xlsx_rows(fileobj):
+    from openpyxl import load_workbook
+
+    # read_only streams the sheet instead of building the whole workbook
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_normalize_header(h) for h in header]
+        for row in rows:
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    """
+    Stream the rows of a CSV or XLSX file as dicts keyed by patient field.
+
+    Args:
+        fileobj (file): Open file (binary for XLSX)
+        filename (str): Used to pick the format from its extension
+
+    Yields:
+        tuple: (row number, dict) for every non-empty row; the header is row 1
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(fileobj)
+    elif extension in ('.xlsx', '.xlsm'):
+        rows = _xlsx_rows(fileobj)
+    else:
+        raise InvalidImportFile(f'Unsupported file type {extension or filename!r}, use .csv or .xlsx')
+
+    header = next(rows, None)
+    if header is None:
+        return
+    if 'name' not in header or 'dob' not in header:
+        raise InvalidImportFile('The file needs at least "name" and "dob" columns')
+    columns = [(index, name) for index, name in enumerate(header) if name in FIELDS]
+    for number, row in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in row):
+            continue
+        yield number, {name: row[index] if index < len(row) else '' for index, name in columns}
+
+
+def _dedupe_keys(name, dob, phone):
+    keys = [('n', normalize_name(name), dob)]
+    phone = normalize_phone(phone)
+    if phone:
+        keys.append(('p', phone, dob))
+    return keys
+
+
+def _existing_keys(patients):
+    """Dedupe keys of stored patients that could collide with this batch."""
+    from ..models import Patient
+
+    # candidates share a date of birth and a phonetic name code or a phone
+    # number; both are normalised PatientMatchKey rows, so spacing and case
+    # variants of a name are found as well
+    lookup = {
+        key
+        for patient in patients
+        for key in build_keys(patient.name, patient.phone)
+        if key.startswith(('p:', 'ph:'))
+    }
+    candidates = Patient.objects.filter(
+        dob__in={patient.dob for patient in patients},
+        match_keys__key__in=lookup,
+    ).values_list('name', 'dob', 'phone')
+    keys = set()
+    for name, dob, phone in candidates:
+        keys.update(_dedupe_keys(name, dob, phone))
+    return keys
+
+
+def _flush(batch, result, dry_run):
+    from ..models import Patient, PatientMatchKey
+
+    seen = _existing_keys([patient for _, patient in batch])
+    new = []
+    for number, patient in batch:
+        keys = _dedupe_keys(patient.name, patient.dob, patient.phone)
+        if seen.intersection(keys):
+            result.duplicates += 1
+            continue
+        seen.update(keys)
+        new.append(patient)
+    if new and not dry_run:
+        with transaction.atomic():
+            Patient.objects.bulk_create(new)
+            # post_save doesn't fire for bulk_create, so index the new rows here
+            PatientMatchKey.objects.bulk_create([
+                PatientMatchKey(patient_id=patient.pk, key=key)
+                for patient in new
+                for key in build_keys(patient.name, patient.phone)
+            ])
+    result.created += len(new)
+
+
+def import_patients(fileobj, filename, batch_size=None, dry_run=False, on_error=None):
+    """
+    Import patients from a CSV or XLSX file.
+
+    Args:
+        fileobj (file): The open file
+        filename (str): Original file name, for the format
+        batch_size (int): Rows per validation batch and transaction
+        dry_run (bool): Validate and de-duplicate without writing
+        on_error (callable): Called with (row number, message) for every bad row
+
+    Returns:
+        ImportResult: Counters and the first MAX_REPORTED_ERRORS errors
+    """
+    from ..forms import PatientImportForm
+
+    batch_size = batch_size or getattr(settings, 'PATIENT_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    result = ImportResult()
+    batch = []
+    for number, data in read_rows(fileobj, filename):
+        result.rows += 1
+        form = PatientImportForm(data={field: data.get(field, '') for field in FIELDS})
+        if not form.is_valid():
+            message = '; '.join(f'{field}: {" ".join(errors)}' for field, errors in form.errors.items())
+            result.add_error(number, message)
+            if on_error:
+                on_error(number, message)
+            continue
+        batch.append((number, form.save(commit=False)))
+        if len(batch) >= batch_size:
+            _flush(batch, result, dry_run)
+            batch = []
+            logger.info(f"Patient import: {result}")
+    if batch:
+        _flush(batch, result, dry_run)
+    logger.info(f"Patient import finished: {result}")
+    return result
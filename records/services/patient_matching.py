@@ -0,0 +1,223 @@
+"""
+Patient Matching Module
+
+Finds existing patients that look like the one being registered, so the front
+desk doesn't create duplicates for "Jon Smyth" when "John Smith" exists.
+
+Every patient gets a handful of PatientMatchKey rows:
+
+    t:<trigram>   padded trigrams of each normalised name token
+    p:<soundex>   Soundex code of each name token
+    ph:<digits>   last 10 digits of the phone number
+
+A lookup builds the same keys for the query, pulls the patients sharing the
+most keys with one indexed GROUP BY, and re-scores that short list in Python.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db.models import Count
+
+NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]+')
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+CANDIDATE_POOL = 50
+
+
+def normalize_name(name):
+    """Lowercase, strip accents and punctuation: 'Jöhn  O'Neil' -> 'john oneil'."""
+    text = unicodedata.normalize('NFKD', name or '')
+    text = text.encode('ascii', 'ignore').decode('ascii').lower().replace("'", '')
+    return ' '.join(NON_ALNUM_RE.sub(' ', text).split())
+
+
+def normalize_phone(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:]
+
+
+def soundex(token):
+    """Classic American Soundex, e.g. 'smyth' and 'smith' -> 'S530'."""
+    token = ''.join(c for c in token.lower() if c.isalpha())
+    if not token:
+        return ''
+    first = token[0]
+    code = first.upper()
+    previous = SOUNDEX_CODES.get(first, '')
+    for char in token[1:]:
+        digit = SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # 'h' and 'w' don't separate letters with the same code
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def trigrams(name):
+    grams = set()
+    for token in normalize_name(name).split():
+        padded = f'  {token} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def phonetic_codes(name):
+    return {code for code in (soundex(t) for t in normalize_name(name).split()) if code}
+
+
+def build_keys(name, phone=''):
+    """Return the set of index keys for a name / phone pair."""
+    keys = {f't:{gram}' for gram in trigrams(name)}
+    keys.update(f'p:{code}' for code in phonetic_codes(name))
+    phone = normalize_phone(phone)
+    if len(phone) >= 7:
+        keys.add(f'ph:{phone}')
+    return keys
+
+
+def index_patient(patient):
+    """Replace the match keys of a single patient."""
+    from ..models import PatientMatchKey
+
+    PatientMatchKey.objects.filter(patient_id=patient.pk).delete()
+    PatientMatchKey.objects.bulk_create([
+        PatientMatchKey(patient_id=patient.pk, key=key)
+        for key in build_keys(patient.name, patient.phone)
+    ])
+
+
+def rebuild_index(batch_size=5000):
+    """
+    Regenerate the keys of every patient.
+
+    Returns:
+        int: Number of keys written
+    """
+    from ..models import Patient, PatientMatchKey
+
+    PatientMatchKey.objects.all().delete()
+    batch = []
+    total = 0
+    for pk, name, phone in Patient.objects.values_list('pk', 'name', 'phone').iterator(chunk_size=batch_size):
+        batch.extend(PatientMatchKey(patient_id=pk, key=key) for key in build_keys(name, phone))
+        if len(batch) >= batch_size:
+            PatientMatchKey.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        PatientMatchKey.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def _parse_dob(dob):
+    """Accept a date, 'YYYY-MM-DD' or a bare 'YYYY'; return (date_or_None, year_or_None)."""
+    if dob is None or dob == '':
+        return None, None
+    if hasattr(dob, 'year'):
+        return dob, dob.year
+    dob = str(dob).strip()
+    if re.fullmatch(r'\d{4}', dob):
+        return None, int(dob)
+    match = re.fullmatch(r'(\d{4})-(\d{2})-(\d{2})', dob)
+    if match:
+        from datetime import date
+        try:
+            parsed = date(*map(int, match.groups()))
+        except ValueError:
+            return None, int(match.group(1))
+        return parsed, parsed.year
+    return None, None
+
+
+def score_candidate(query, candidate):
+    """
+    Similarity between a query and a candidate patient, roughly 0..1.
+
+    Args:
+        query (dict): name, phone, dob_date, dob_year of the person searched for
+        candidate (Patient): Existing patient
+
+    Returns:
+        float: Weighted blend of trigram, phonetic, birth date and phone matches
+    """
+    query_grams, candidate_grams = query['trigrams'], trigrams(candidate.name)
+    union = query_grams | candidate_grams
+    trigram_score = len(query_grams & candidate_grams) / len(union) if union else 0.0
+
+    query_codes, candidate_codes = query['phonetic'], phonetic_codes(candidate.name)
+    phonetic_score = len(query_codes & candidate_codes) / len(query_codes) if query_codes else 0.0
+
+    score = 0.45 * trigram_score + 0.35 * phonetic_score
+    if query['dob_date'] and candidate.dob == query['dob_date']:
+        score += 0.2
+    elif query['dob_year'] and candidate.dob and candidate.dob.year == query['dob_year']:
+        score += 0.1
+    if query['phone'] and normalize_phone(candidate.phone) == query['phone']:
+        score += 0.3
+    return round(min(score, 1.0), 3)
+
+
+def find_candidates(name, dob=None, phone='', limit=10, exclude_pk=None):
+    """
+    Look up patients that may be the same person.
+
+    Args:
+        name (str): Full name as typed
+        dob (date or str): Birth date, 'YYYY-MM-DD' or just 'YYYY'
+        phone (str): Phone number in any format
+        limit (int): Maximum number of candidates
+        exclude_pk (int): Patient to leave out (when editing)
+
+    Returns:
+        list: (Patient, score) tuples, best match first
+    """
+    from ..models import Patient, PatientMatchKey
+
+    keys = build_keys(name, phone)
+    if not keys:
+        return []
+    pool = (
+        PatientMatchKey.objects.filter(key__in=keys)
+        .values('patient_id')
+        .annotate(hits=Count('id'))
+        .order_by('-hits')
+    )
+    if exclude_pk is not None:
+        pool = pool.exclude(patient_id=exclude_pk)
+    patient_ids = [row['patient_id'] for row in pool[:CANDIDATE_POOL]]
+    if not patient_ids:
+        return []
+
+    dob_date, dob_year = _parse_dob(dob)
+    query = {
+        'trigrams': trigrams(name),
+        'phonetic': phonetic_codes(name),
+        'phone': normalize_phone(phone),
+        'dob_date': dob_date,
+        'dob_year': dob_year,
+    }
+    candidates = Patient.objects.filter(pk__in=patient_ids).only('id', 'name', 'dob', 'phone', 'email')
+    scored = [(patient, score_candidate(query, patient)) for patient in candidates]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
+
+
+def likely_duplicates(name, dob=None, phone='', exclude_pk=None):
+    """Candidates scoring above PATIENT_DUPLICATE_THRESHOLD."""
+    threshold = getattr(settings, 'PATIENT_DUPLICATE_THRESHOLD', 0.6)
+    return [
+        (patient, score)
+        for patient, score in find_candidates(name, dob, phone, limit=5, exclude_pk=exclude_pk)
+        if score >= threshold
+    ]
@@ -0,0 +1,242 @@
+"""
+Prescription PDF Module
+
+Generates a printable one-page PDF for each prescription from the
+prescription, doctor and patient data. The PDF is written by a small built-in
+writer (standard Helvetica fonts, no dependency needed) and always comes out
+byte-identical for the same inputs.
+
+Files are stored under a path keyed by a SHA-256 of those inputs. Re-printing
+an unchanged prescription, or saving it without changing anything that is
+printed, reuses the stored file instead of rendering again; a change to any
+printed value produces a new hash and a new file.
+
+Rendering runs on the background pool after a prescription is saved (see
+records/signals.py), at most one queued job per prescription however often
+the PDF is asked for while it is pending, and render_day() renders a whole day's prescriptions in
+parallel worker processes (manage.py render_prescriptions).
+"""
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import background
+
+logger = logging.getLogger(__name__)
+
+# bump when the layout changes, so every PDF is rendered again
+LAYOUT_VERSION = 1
+PDF_DIR = 'prescriptions/generated'
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+
+# prescriptions with a generate() job queued but not started yet
+_pending = set()
+_lock = threading.Lock()
+
+
+def prescription_data(prescription):
+    """Everything printed on the PDF, as JSON-serializable values."""
+    return {
+        'number': prescription.pk,
+        'date': timezone.localtime(prescription.date_prescribed).strftime('%Y-%m-%d'),
+        'medication': prescription.medication,
+        'dosage': prescription.dosage,
+        'instructions': prescription.instructions,
+        'doctor': prescription.doctor.name,
+        'specialization': prescription.doctor.specialization,
+        'patient': prescription.patient.name,
+        'dob': prescription.patient.dob.isoformat() if prescription.patient.dob else '',
+    }
+
+
+def content_hash(data):
+    raw = json.dumps([LAYOUT_VERSION, data], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def pdf_name(digest):
+    return posixpath.join(PDF_DIR, digest[:2], f'{digest}.pdf')
+
+
+# -- PDF writer ----------------------------------------------------------------
+
+def _pdf_text(value):
+    """A PDF string literal in WinAnsi (cp1252) encoding."""
+    encoded = value.encode('cp1252', errors='replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _wrap(value, size):
+    # Helvetica averages about half an em per character
+    width = int((PAGE_WIDTH - 2 * MARGIN) / (size * 0.5))
+    lines = []
+    for paragraph in value.splitlines() or ['']:
+        lines.extend(textwrap.wrap(paragraph, width) or [''])
+    return lines
+
+
+def render_pdf(data):
+    """
+    Render a prescription as PDF bytes.
+
+    Pure function of `data` (see prescription_data), so it can run in a
+    worker process.
+    """
+    lines = []  # (font, size, text, gap before)
+    lines.append(('F2', 20, 'Prescription', 0))
+    lines.append(('F1', 10, f"No. {data['number']}    Date: {data['date']}", 8))
+    lines.append(('F2', 12, data['doctor'], 24))
+    lines.append(('F1', 10, data['specialization'], 4))
+    lines.append(('F2', 12, f"Patient: {data['patient']}", 24))
+    if data['dob']:
+        lines.append(('F1', 10, f"Date of birth: {data['dob']}", 4))
+    lines.append(('F2', 16, f"Rx  {data['medication']}", 30))
+    lines.append(('F1', 12, f"Dosage: {data['dosage']}", 10))
+    for index, text in enumerate(_wrap(data['instructions'], 11)):
+        lines.append(('F1', 11, text, 14 if index == 0 else 4))
+    lines.append(('F1', 10, 'Signature: ______________________________', 60))
+
+    commands = [b'BT']
+    y = PAGE_HEIGHT - MARGIN
+    for font, size, text, gap in lines:
+        y -= gap + size
+        commands.append(b'/%s %d Tf 1 0 0 1 %d %d Tm %s Tj' % (font.encode(), size, MARGIN, y, _pdf_text(text)))
+    commands.append(b'ET')
+    stream = b'\n'.join(commands)
+
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents 4 0 R '
+        b'/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> >>' % (PAGE_WIDTH, PAGE_HEIGHT),
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+    ]
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for offset in offsets:
+        out += b'%010d 00000 n \n' % offset
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# -- generation ----------------------------------------------------------------
+
+def _store(name, pdf):
+    saved = default_storage.save(name, ContentFile(pdf))
+    if saved != name:
+        # another worker stored the same file meanwhile; keep theirs
+        default_storage.delete(saved)
+
+
+def _publish(prescription_id, digest):
+    from ..models import Prescription
+
+    Prescription.objects.filter(pk=prescription_id).update(generated_pdf=pdf_name(digest), pdf_hash=digest)
+
+
+def generate(prescription_id):
+    """
+    Make sure a prescription's PDF matches its current data.
+
+    Returns:
+        str: The content hash, or '' if the prescription doesn't exist
+    """
+    from ..models import Prescription
+
+    prescription = Prescription.objects.select_related('doctor', 'patient').filter(pk=prescription_id).first()
+    if prescription is None:
+        return ''
+    data = prescription_data(prescription)
+    digest = content_hash(data)
+    if prescription.pdf_hash == digest and default_storage.exists(pdf_name(digest)):
+        return digest
+    if not default_storage.exists(pdf_name(digest)):
+        _store(pdf_name(digest), render_pdf(data))
+    _publish(prescription_id, digest)
+    return digest
+
+
+def _generate_queued(prescription_id):
+    # a change saved from now on reads new data, so it may queue another job
+    with _lock:
+        _pending.discard(prescription_id)
+    return generate(prescription_id)
+
+
+def _submit(prescription_id):
+    with _lock:
+        if prescription_id in _pending:
+            return
+        _pending.add(prescription_id)
+    background.submit(_generate_queued, prescription_id)
+
+
+def schedule(prescription):
+    """Queue PDF generation once the current transaction commits, unless a job is already queued."""
+    prescription_id = prescription.pk
+    transaction.on_commit(lambda: _submit(prescription_id))
+
+
+def render_day(day, workers=None):
+    """
+    Generate the PDFs of every prescription written on a day, rendering in parallel processes.
+
+    Args:
+        day (date): Local date the prescriptions were written
+        workers (int): Worker processes, defaults to PRESCRIPTION_PDF_WORKERS
+
+    Returns:
+        dict: Counts of 'rendered', 'cached' (file existed) and 'current' (nothing to do)
+    """
+    from ..models import Prescription
+
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    prescriptions = (
+        Prescription.objects.select_related('doctor', 'patient')
+        .filter(date_prescribed__gte=start, date_prescribed__lt=start + timedelta(days=1))
+        .order_by('pk')
+    )
+    counts = {'rendered': 0, 'cached': 0, 'current': 0}
+    todo = []
+    for prescription in prescriptions:
+        data = prescription_data(prescription)
+        digest = content_hash(data)
+        exists = default_storage.exists(pdf_name(digest))
+        if exists and prescription.pdf_hash == digest:
+            counts['current'] += 1
+        elif exists:
+            counts['cached'] += 1
+            _publish(prescription.pk, digest)
+        else:
+            todo.append((prescription.pk, digest, data))
+
+    if todo:
+        workers = workers or getattr(settings, 'PRESCRIPTION_PDF_WORKERS', None) or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            pdfs = pool.map(render_pdf, [data for _, _, data in todo], chunksize=max(1, len(todo) // (workers * 4)))
+            for (prescription_id, digest, _), pdf in zip(todo, pdfs):
+                _store(pdf_name(digest), pdf)
+                _publish(prescription_id, digest)
+                counts['rendered'] += 1
+    logger.info(f"Prescription PDFs for {day}: {counts}")
+    return counts
@@ -0,0 +1,174 @@
+"""
+Request Profiling Module
+
+Lets staff profile one real request without redeploying: add ?_profile=1 to
+the URL or send an `X-Profile: 1` header. ProfilerMiddleware then runs the
+view under cProfile and times every SQL query it makes. The result is stored
+in a ring buffer holding the last PROFILER_BUFFER_SIZE profiles, browsable at
+/admin/profiles/.
+
+The buffer lives in the cache selected by PROFILER_CACHE_ALIAS, so all
+workers share it when that cache is shared (file or Redis). With locmem, each
+process only lists its own profiles.
+
+Requests without the flag pay nothing beyond checking for it.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'X-Profile'
+KEY_PREFIX = 'profiles'
+DEFAULT_BUFFER_SIZE = 50
+DEFAULT_TTL = 60 * 60 * 24
+# functions kept per profile: the top ones by own time plus the top ones by cumulative time
+MAX_FUNCTIONS = 200
+MAX_QUERIES = 200
+
+
+def requested(request):
+    """Whether this request asked to be profiled (staff only)."""
+    if not (request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)):
+        return False
+    return request.user.is_staff
+
+
+class QueryTimer:
+    """execute_wrapper that groups queries by SQL text and times them (in ms)."""
+
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            entry = self.queries.setdefault(sql, {'sql': sql, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            entry['count'] += 1
+            entry['total_ms'] += elapsed
+            entry['max_ms'] = max(entry['max_ms'], elapsed)
+
+
+def _short_path(filename):
+    if filename.startswith(str(settings.BASE_DIR)):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def _functions(profiler):
+    rows = [
+        {
+            'function': funcname,
+            'location': f'{_short_path(filename)}:{line}' if line else _short_path(filename),
+            'ncalls': ncalls,
+            'primitive_calls': primitive_calls,
+            'own_ms': tottime * 1000,
+            'cumulative_ms': cumtime * 1000,
+        }
+        for (filename, line, funcname), (primitive_calls, ncalls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items()
+    ]
+    keep = {id(row) for row in sorted(rows, key=lambda r: -r['own_ms'])[:MAX_FUNCTIONS]}
+    keep |= {id(row) for row in sorted(rows, key=lambda r: -r['cumulative_ms'])[:MAX_FUNCTIONS]}
+    return [row for row in rows if id(row) in keep]
+
+
+def profile_call(func, *args, **kwargs):
+    """
+    Call func(*args, **kwargs) under cProfile, timing its SQL queries.
+
+    Template responses are rendered inside the profile. Times are in ms.
+
+    Returns:
+        tuple: (func's return value, profile dict)
+    """
+    timer = QueryTimer()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        profiler.enable()
+        try:
+            result = func(*args, **kwargs)
+            if getattr(result, 'is_rendered', True) is False:
+                result.render()
+        finally:
+            profiler.disable()
+    duration = (time.perf_counter() - started) * 1000
+
+    queries = sorted(timer.queries.values(), key=lambda q: -q['total_ms'])
+    return result, {
+        'duration_ms': duration,
+        'sql_count': sum(q['count'] for q in queries),
+        'sql_ms': sum(q['total_ms'] for q in queries),
+        'functions': _functions(profiler),
+        'queries': queries[:MAX_QUERIES],
+    }
+
+
+def _cache():
+    return caches[getattr(settings, 'PROFILER_CACHE_ALIAS', 'default')]
+
+
+def _key(profile_id):
+    return f'{KEY_PREFIX}:{profile_id}'
+
+
+def save(request, response, profile):
+    """
+    Add a profile to the ring buffer, dropping the oldest one when full.
+
+    Returns:
+        str: The profile's id
+    """
+    cache = _cache()
+    size = getattr(settings, 'PROFILER_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+    ttl = getattr(settings, 'PROFILER_TTL', DEFAULT_TTL)
+    match = request.resolver_match
+    profile_id = uuid.uuid4().hex[:12]
+    profile.update({
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else '',
+        'user': request.user.get_username(),
+        'status': response.status_code,
+        'recorded_at': timezone.now(),
+    })
+    cache.set(_key(profile_id), profile, ttl)
+    # read-modify-write: two workers saving at the same instant can drop one id
+    index = [profile_id] + (cache.get(_key('index')) or [])
+    cache.set(_key('index'), index[:size], ttl)
+    if len(index) > size:
+        cache.delete_many([_key(old) for old in index[size:]])
+    logger.info(f"Profiled {request.method} {request.path} as {profile_id}: {profile['duration_ms']:.1f} ms")
+    return profile_id
+
+
+def recent():
+    """Profiles in the ring buffer, newest first."""
+    cache = _cache()
+    ids = cache.get(_key('index')) or []
+    found = cache.get_many([_key(profile_id) for profile_id in ids])
+    return [found[_key(profile_id)] for profile_id in ids if _key(profile_id) in found]
+
+
+def get(profile_id):
+    return _cache().get(_key(profile_id))
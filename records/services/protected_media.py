@@ -0,0 +1,127 @@
+"""
+Protected Media Module
+
+Serves uploaded files (medical reports, prescriptions) after the calling view
+has checked permissions. Depending on PROTECTED_MEDIA_SERVER the bytes are
+handed off to the front-end web server:
+
+    'nginx'     -> X-Accel-Redirect to PROTECTED_MEDIA_INTERNAL_URL
+    'xsendfile' -> X-Sendfile with the absolute path (Apache/lighttpd)
+    None        -> FileResponse from Django, with single-range support
+
+All modes answer If-None-Match / If-Modified-Since with 304 based on a
+validator built from the file's name, size and mtime, so nothing is read.
+"""
+import mimetypes
+import os
+import re
+import zlib
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _file_etag(name, stat):
+    return quote_etag(f"{stat.st_size:x}-{int(stat.st_mtime):x}-{zlib.crc32(name.encode()):x}")
+
+
+def _parse_range(header, size):
+    """Return (start, end) for a single satisfiable byte range, else None."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _stream_range(path, start, end):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, field_file, as_attachment=False):
+    """
+    Build the response for an already-authorised FileField value.
+
+    Args:
+        request (HttpRequest): The incoming request
+        field_file (FieldFile): The file to serve
+        as_attachment (bool): Force a download instead of inline display
+
+    Returns:
+        HttpResponse: 200/206/304/416 response, or a hand-off response
+    """
+    if not field_file:
+        raise Http404('No file attached')
+    try:
+        path = field_file.path
+        stat = os.stat(path)
+    except (NotImplementedError, FileNotFoundError):
+        raise Http404('File not found')
+
+    etag = _file_etag(field_file.name, stat)
+    last_modified = int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    disposition = 'attachment' if as_attachment else 'inline'
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+
+    if server in ('nginx', 'xsendfile'):
+        response = HttpResponse(content_type=content_type)
+        if server == 'nginx':
+            internal = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+            response['X-Accel-Redirect'] = quote(internal.rstrip('/') + '/' + field_file.name)
+        else:
+            # the web server fills in the body, length and range handling
+            response['X-Sendfile'] = path
+    else:
+        range_header = request.META.get('HTTP_RANGE')
+        byte_range = _parse_range(range_header, stat.st_size) if range_header else None
+        if range_header and byte_range is None and RANGE_RE.match(range_header.strip()):
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range and request.META.get('HTTP_IF_RANGE', etag) == etag:
+            start, end = byte_range
+            response = StreamingHttpResponse(_stream_range(path, start, end), status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            # FileResponse lets the WSGI server use wsgi.file_wrapper / sendfile
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    return response
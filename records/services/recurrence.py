@@ -0,0 +1,267 @@
+"""
+Recurring Appointments Module
+
+An AppointmentSeries describes repeating appointments the way an RRULE does:
+weekly or monthly, every `interval` weeks/months, ending after `count`
+occurrences or on `until`. Creating a series materializes every occurrence as
+an Appointment with a single bulk_create.
+
+Conflicts are checked for all occurrences at once: one range query fetches
+the doctor's scheduled appointments between the first and the last
+occurrence, and a sweep over both sorted lists finds the overlaps in memory,
+instead of one overlap query per occurrence.
+
+Editing or cancelling "this and following" occurrences is a single bulk
+UPDATE. An edit splits the series: the edited occurrences move to a new
+series and the old one ends the day before.
+"""
+import bisect
+import calendar
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_OCCURRENCES = 104
+# how far back to look for appointments that started before a slot but may still run into it
+LOOKBACK = timedelta(hours=24)
+
+
+class SeriesConflict(ValueError):
+    """Some occurrences overlap appointments the doctor already has."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__(
+            'The doctor is already booked on ' + ', '.join(f'{timezone.localtime(start):%Y-%m-%d %H:%M}' for start in conflicts)
+        )
+
+
+def _add_months(value, months):
+    """Same day in a later month, or that month's last day when it is shorter."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_dates(start, frequency='weekly', interval=1, count=None, until=None):
+    """
+    Start datetimes of a series' occurrences.
+
+    Occurrences keep the local time of day of `start` across DST changes.
+    Monthly occurrences on the 29th-31st fall on the last day of shorter
+    months.
+
+    Args:
+        start (datetime): First occurrence (aware)
+        frequency (str): 'weekly' or 'monthly'
+        interval (int): Every N weeks or months
+        count (int): Number of occurrences
+        until (date): Last possible date, inclusive
+
+    Returns:
+        list: Aware datetimes, in order
+    """
+    if frequency not in ('weekly', 'monthly'):
+        raise ValueError(f'Unknown frequency {frequency!r}')
+    if interval < 1:
+        raise ValueError('The interval must be at least 1')
+    if not count and not until:
+        raise ValueError('A series needs a count or an end date')
+    limit = getattr(settings, 'APPOINTMENT_SERIES_MAX_OCCURRENCES', DEFAULT_MAX_OCCURRENCES)
+    if count and count > limit:
+        raise ValueError(f'A series can have at most {limit} occurrences')
+
+    local_start = timezone.localtime(start).replace(tzinfo=None)
+    dates = []
+    for n in range(count or limit + 1):
+        if frequency == 'weekly':
+            local = local_start + timedelta(weeks=n * interval)
+        else:
+            local = _add_months(local_start, n * interval)
+        if until and local.date() > until:
+            break
+        if len(dates) == limit:
+            raise ValueError(f'A series can have at most {limit} occurrences, choose an earlier end date')
+        dates.append(timezone.make_aware(local))
+    return dates
+
+
+def find_conflicts(doctor_id, starts, duration_minutes, exclude_ids=()):
+    """
+    The starts whose slot overlaps one of the doctor's scheduled appointments.
+
+    Args:
+        doctor_id (int): Doctor to check
+        starts (list): Start datetimes of the new slots
+        duration_minutes (int): Length of each new slot
+        exclude_ids (iterable): Appointments to ignore (the ones being moved)
+
+    Returns:
+        list: Conflicting starts, in order
+    """
+    from ..models import Appointment
+
+    if not starts:
+        return []
+    starts = sorted(starts)
+    length = timedelta(minutes=duration_minutes)
+    busy = (
+        Appointment.objects
+        .filter(doctor_id=doctor_id, status='scheduled', date__gte=starts[0] - LOOKBACK, date__lt=starts[-1] + length)
+        .exclude(pk__in=list(exclude_ids))
+        .order_by('date')
+        .values_list('date', 'duration_minutes')
+    )
+    busy_starts, latest_end = [], []
+    for start, minutes in busy:
+        end = start + timedelta(minutes=minutes)
+        busy_starts.append(start)
+        latest_end.append(max(end, latest_end[-1]) if latest_end else end)
+
+    # a slot conflicts when some appointment starting before the slot ends
+    # is still running when it starts
+    conflicts = []
+    for start in starts:
+        before_end = bisect.bisect_left(busy_starts, start + length)
+        if before_end and latest_end[before_end - 1] > start:
+            conflicts.append(start)
+    return conflicts
+
+
+def create_series(patient, doctor, start, frequency='weekly', interval=1, count=None, until=None,
+                  duration_minutes=30, notes='', skip_conflicts=False):
+    """
+    Create a series and book all of its occurrences.
+
+    Args:
+        skip_conflicts (bool): Book only the free occurrences instead of
+            raising SeriesConflict when some are taken
+
+    Returns:
+        tuple: (AppointmentSeries, number of appointments booked, skipped starts)
+    """
+    from ..models import Appointment, AppointmentSeries
+
+    dates = occurrence_dates(start, frequency, interval, count, until)
+    conflicts = find_conflicts(doctor.pk, dates, duration_minutes)
+    if conflicts:
+        metrics.APPOINTMENT_CONFLICTS.inc(len(conflicts))
+        if not skip_conflicts:
+            metrics.BOOKINGS.inc(result='rejected')
+            raise SeriesConflict(conflicts)
+    taken = set(conflicts)
+
+    with transaction.atomic():
+        series = AppointmentSeries.objects.create(
+            patient=patient, doctor=doctor, start=start, frequency=frequency, interval=interval,
+            count=count, until=until, duration_minutes=duration_minutes, notes=notes,
+        )
+        created = Appointment.objects.bulk_create([
+            Appointment(
+                patient=patient, doctor=doctor, date=date, duration_minutes=duration_minutes,
+                notes=notes, series=series,
+            )
+            for date in dates if date not in taken
+        ])
+    metrics.BOOKINGS.inc(len(created), result='created')
+    logger.info(f"Booked series {series.pk}: {len(created)} appointments, {len(conflicts)} skipped")
+    return series, len(created), conflicts
+
+
+def following(appointment):
+    """Scheduled occurrences of the appointment's series from this one on."""
+    from ..models import Appointment
+
+    return Appointment.objects.filter(series_id=appointment.series_id, date__gte=appointment.date, status='scheduled')
+
+
+def _end_before(series, appointment):
+    """Make a series end the day before the given occurrence."""
+    series.until = timezone.localtime(appointment.date).date() - timedelta(days=1)
+    series.count = None
+    series.save(update_fields=['until', 'count', 'updated_at'])
+
+
+def cancel_following(appointment):
+    """
+    Cancel this occurrence and the following ones with one UPDATE.
+
+    Returns:
+        int: Number of appointments cancelled
+    """
+    if appointment.series_id is None:
+        raise ValueError('The appointment is not part of a series')
+    from ..models import Appointment
+    from . import waitlist
+
+    ids = list(following(appointment).values_list('pk', flat=True))
+    with transaction.atomic():
+        cancelled = Appointment.objects.filter(pk__in=ids, status='scheduled').update(status='cancelled', updated_at=timezone.now())
+        _end_before(appointment.series, appointment)
+        waitlist.slot_freed(ids)
+    metrics.APPOINTMENT_STATUS_UPDATES.inc(cancelled, status='cancelled', source='series')
+    return cancelled
+
+
+def update_following(appointment, start=None, doctor=None, duration_minutes=None, notes=None):
+    """
+    Move or change this occurrence and the following ones with one UPDATE.
+
+    Moving shifts every occurrence by the same amount as this one. The changed
+    occurrences become a new series; the old one ends the day before.
+
+    Returns:
+        int: Number of appointments changed
+
+    Raises:
+        SeriesConflict: If the changed occurrences would overlap other appointments
+    """
+    from ..models import AppointmentSeries
+
+    series = appointment.series
+    if series is None:
+        raise ValueError('The appointment is not part of a series')
+    shift = (start - appointment.date) if start else timedelta(0)
+    doctor_id = doctor.pk if doctor else appointment.doctor_id
+    duration = duration_minutes or appointment.duration_minutes
+
+    rows = list(following(appointment).values_list('pk', 'date'))
+    conflicts = find_conflicts(doctor_id, [date + shift for _, date in rows], duration, exclude_ids=[pk for pk, _ in rows])
+    if conflicts:
+        metrics.APPOINTMENT_CONFLICTS.inc(len(conflicts))
+        raise SeriesConflict(conflicts)
+
+    changes = {'doctor_id': doctor_id, 'duration_minutes': duration, 'updated_at': timezone.now()}
+    if shift:
+        changes['date'] = F('date') + shift
+    if notes is not None:
+        changes['notes'] = notes
+    with transaction.atomic():
+        if appointment.date > series.start:
+            new_series = AppointmentSeries.objects.create(
+                patient_id=series.patient_id, doctor_id=doctor_id, start=appointment.date + shift,
+                frequency=series.frequency, interval=series.interval,
+                count=len(rows) if series.count else None,
+                until=timezone.localtime(rows[-1][1] + shift).date() if series.until and rows else series.until,
+                duration_minutes=duration, notes=series.notes if notes is None else notes,
+            )
+            _end_before(series, appointment)
+            changes['series'] = new_series
+        else:
+            # editing from the first occurrence: the whole series changes
+            series.start += shift
+            series.doctor_id = doctor_id
+            series.duration_minutes = duration
+            if notes is not None:
+                series.notes = notes
+            series.save()
+        updated = following(appointment).update(**changes)
+    return updated
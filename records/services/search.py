@@ -0,0 +1,256 @@
+"""
+Search Service Module
+
+Full-text search over medical records, prescriptions and treatment plans.
+
+Each clinical row is flattened into a SearchDocument. On SQLite the documents
+are mirrored into an FTS5 table (records_search_fts) by triggers and ranked
+with bm25(); on PostgreSQL a GIN index on to_tsvector(body) is used with
+ts_rank(). Other databases fall back to icontains scans.
+
+Searches read from the alias they are given, by default the one the router
+picks (a replica inside `read_only_view`), and choose the engine by that
+database's vendor.
+"""
+import re
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Q
+
+from .. import routers
+
+FTS_TABLE = 'records_search_fts'
+PG_CONFIG = 'english'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+BULK_BATCH_SIZE = 2000
+
+
+def document_body(kind, obj):
+    """Return the indexed text for a source object."""
+    if kind == 'record':
+        parts = [obj.diagnosis, obj.treatment]
+    elif kind == 'prescription':
+        parts = [obj.medication, obj.dosage, obj.instructions]
+    else:
+        parts = [obj.description]
+    return '\n'.join(p for p in parts if p)
+
+
+def index_object(kind, obj):
+    """Create or refresh the search document of a saved object."""
+    from ..models import SearchDocument
+
+    SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=obj.pk,
+        defaults={'patient_id': obj.patient_id, 'body': document_body(kind, obj)},
+    )
+
+
+def unindex_object(kind, pk):
+    from ..models import SearchDocument
+
+    SearchDocument.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def _sources():
+    from ..models import MedicalRecord, Prescription, TreatmentPlan
+
+    return [
+        ('record', MedicalRecord, ['diagnosis', 'treatment']),
+        ('prescription', Prescription, ['medication', 'dosage', 'instructions']),
+        ('treatment_plan', TreatmentPlan, ['description']),
+    ]
+
+
+def rebuild_index(batch_size=BULK_BATCH_SIZE):
+    """
+    Regenerate every search document from the source tables.
+
+    Returns:
+        int: Number of documents written
+    """
+    from ..models import SearchDocument
+
+    total = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for kind, model, fields in _sources():
+            batch = []
+            rows = model.objects.values_list('pk', 'patient_id', *fields).iterator(chunk_size=batch_size)
+            for pk, patient_id, *text in rows:
+                body = '\n'.join(t for t in text if t)
+                batch.append(SearchDocument(kind=kind, object_id=pk, patient_id=patient_id, body=body))
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                SearchDocument.objects.bulk_create(batch)
+                total += len(batch)
+    return total
+
+
+def tokenize(query):
+    return [t.lower() for t in TOKEN_RE.findall(query or '')]
+
+
+def _fts5_query(tokens):
+    # Quote every token so user input can't inject FTS5 syntax; the last
+    # token is a prefix match so partially typed words still hit.
+    quoted = ['"%s"' % t.replace('"', '""') for t in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _search_sqlite(using, tokens, patient_id, kinds, limit):
+    sql = [
+        f"SELECT d.id, d.kind, d.object_id, d.patient_id, bm25({FTS_TABLE}) AS score",
+        f"FROM {FTS_TABLE} JOIN records_searchdocument d ON d.id = {FTS_TABLE}.rowid",
+        f"WHERE {FTS_TABLE} MATCH %s",
+    ]
+    params = [_fts5_query(tokens)]
+    if patient_id is not None:
+        sql.append("AND d.patient_id = %s")
+        params.append(patient_id)
+    if kinds:
+        sql.append("AND d.kind IN (%s)" % ', '.join(['%s'] * len(kinds)))
+        params.extend(kinds)
+    # bm25() is lower-is-better
+    sql.append("ORDER BY score")
+    if limit is not None:
+        sql.append("LIMIT %s")
+        params.append(limit)
+    with connections[using].cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return [(row[0], row[1], row[2], row[3], -row[4]) for row in cursor.fetchall()]
+
+
+def _search_postgresql(using, tokens, patient_id, kinds, limit):
+    sql = [
+        "SELECT d.id, d.kind, d.object_id, d.patient_id,",
+        f"ts_rank(to_tsvector('{PG_CONFIG}', d.body), q) AS score",
+        f"FROM records_searchdocument d, websearch_to_tsquery('{PG_CONFIG}', %s) q",
+        f"WHERE to_tsvector('{PG_CONFIG}', d.body) @@ q",
+    ]
+    params = [' '.join(tokens)]
+    if patient_id is not None:
+        sql.append("AND d.patient_id = %s")
+        params.append(patient_id)
+    if kinds:
+        sql.append("AND d.kind = ANY(%s)")
+        params.append(list(kinds))
+    sql.append("ORDER BY score DESC")
+    if limit is not None:
+        sql.append("LIMIT %s")
+        params.append(limit)
+    with connections[using].cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return cursor.fetchall()
+
+
+def _search_fallback(using, tokens, patient_id, kinds, limit):
+    from ..models import SearchDocument
+
+    docs = SearchDocument.objects.using(using)
+    for token in tokens:
+        docs = docs.filter(body__icontains=token)
+    if patient_id is not None:
+        docs = docs.filter(patient_id=patient_id)
+    if kinds:
+        docs = docs.filter(kind__in=kinds)
+    rows = docs.order_by('-updated_at').values_list('id', 'kind', 'object_id', 'patient_id')
+    if limit is not None:
+        rows = rows[:limit]
+    return [(*row, 0.0) for row in rows]
+
+
+def _backend(using):
+    vendor = connections[using].vendor
+    if vendor == 'sqlite':
+        return _search_sqlite
+    if vendor == 'postgresql':
+        return _search_postgresql
+    return _search_fallback
+
+
+def search(query, patient_id=None, kinds=None, limit=50, using=None):
+    """
+    Ranked full-text search over clinical documents.
+
+    Args:
+        query (str): Free text, every word must match
+        patient_id (int): Restrict to one patient's chart
+        kinds (list): Restrict to some SearchDocument kinds
+        limit (int): Maximum number of hits, None for all
+        using (str): Database alias, defaults to the router's read alias
+
+    Returns:
+        list: (document_id, kind, object_id, patient_id, score) tuples,
+        best match first
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    using = using or routers.read_alias()
+    return _backend(using)(using, tokens, patient_id, kinds, limit)
+
+
+def search_patients(query, limit=50, using=None):
+    """
+    Find patients whose chart as a whole matches every word of the query.
+
+    "metformin diabetes" returns patients with a Metformin prescription and a
+    diabetes diagnosis even though the words live in different documents.
+
+    Returns:
+        list: (patient_id, score) tuples, best match first
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    using = using or routers.read_alias()
+    search_fn = _backend(using)
+    scores = None
+    for token in tokens:
+        token_scores = defaultdict(float)
+        for _, _, _, patient_id, score in search_fn(using, [token], None, None, None):
+            token_scores[patient_id] += score
+        if scores is None:
+            scores = token_scores
+        else:
+            scores = {pid: s + token_scores[pid] for pid, s in scores.items() if pid in token_scores}
+        if not scores:
+            return []
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:limit]
+
+
+def icontains_search(query, patient_id=None):
+    """Reference implementations scanning the source tables, used by the benchmark."""
+    hits = []
+    for kind, model, fields in _sources():
+        rows = model.objects.all()
+        for token in tokenize(query):
+            match = Q()
+            for field in fields:
+                match |= Q(**{f'{field}__icontains': token})
+            rows = rows.filter(match)
+        if patient_id is not None:
+            rows = rows.filter(patient_id=patient_id)
+        hits.extend((kind, pk) for pk in rows.values_list('pk', flat=True))
+    return hits
+
+
+def icontains_patients(query):
+    patient_ids = None
+    for token in tokenize(query):
+        matched = set()
+        for kind, model, fields in _sources():
+            match = Q()
+            for field in fields:
+                match |= Q(**{f'{field}__icontains': token})
+            matched.update(model.objects.filter(match).values_list('patient_id', flat=True))
+        patient_ids = matched if patient_ids is None else patient_ids & matched
+    return sorted(patient_ids or [])
@@ -8,6 +8,8 @@ For development, it will log messages to the console.
 import logging
 from django.conf import settings
 
+from . import metrics
+
 logger = logging.getLogger(__name__)
 
 def send_sms(phone_number, message):
@@ -21,32 +23,39 @@ def send_sms(phone_number, message):
     Returns:
         bool: True if the message was sent successfully, False otherwise
     """
+    if not phone_number or not message:
+        logger.warning("SMS not sent: Missing phone number or message")
+        metrics.SMS_MESSAGES.inc(result='skipped')
+        return False
     try:
-        if not phone_number or not message:
-            logger.warning("SMS not sent: Missing phone number or message")
-            return False
-            
-        # In a real application, this would connect to an SMS gateway like Twilio, Nexmo, etc.
-        # For development, we'll just log the message
-        logger.info(f"[SMS to {phone_number}]: {message}")
-        
-        # If you want to implement a real SMS service, you can uncomment and configure this:
-        """
-        # Example with Twilio (requires twilio package)
-        # from twilio.rest import Client
-        # client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        # message = client.messages.create(
-        #     body=message,
-        #     from_=settings.TWILIO_PHONE_NUMBER,
-        #     to=phone_number
-        # )
-        # return message.sid is not None
-        """
-        
-        return True
+        with metrics.SMS_SEND_SECONDS.time():
+            sent = _send(phone_number, message)
     except Exception as e:
         logger.error(f"Error sending SMS to {phone_number}: {str(e)}", exc_info=True)
-        return False
+        sent = False
+    metrics.SMS_MESSAGES.inc(result='sent' if sent else 'failed')
+    return sent
+
+def _send(phone_number, message):
+    """Hand one message to the SMS gateway; True on success."""
+    # In a real application, this would connect to an SMS gateway like Twilio, Nexmo, etc.
+    # For development, we'll just log the message
+    logger.info(f"[SMS to {phone_number}]: {message}")
+
+    # If you want to implement a real SMS service, you can uncomment and configure this:
+    """
+    # Example with Twilio (requires twilio package)
+    # from twilio.rest import Client
+    # client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    # message = client.messages.create(
+    #     body=message,
+    #     from_=settings.TWILIO_PHONE_NUMBER,
+    #     to=phone_number
+    # )
+    # return message.sid is not None
+    """
+
+    return True
 
 def send_bulk_sms(phone_numbers, message):
     """
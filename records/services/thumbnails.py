@@ -0,0 +1,132 @@
+"""
+Thumbnail Service Module
+
+Generates fixed-size derivatives (JPEG + WebP) of patient photos so list and
+detail pages don't ship full resolution uploads. Derivatives are written to
+MEDIA_ROOT under a path keyed by the SHA-1 of the source image and the target
+size, so a re-upload of the same image reuses the existing files and a new
+image never collides with stale ones.
+"""
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from . import background
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {
+    'card': (160, 160),
+    'detail': (320, 320),
+}
+FORMATS = {
+    'jpeg': 'jpg',
+    'webp': 'webp',
+}
+DERIVATIVE_DIR = 'patient_photos/derivatives'
+
+
+def get_sizes():
+    return getattr(settings, 'PATIENT_PHOTO_SIZES', DEFAULT_SIZES)
+
+
+def source_hash(field_file):
+    """Return the SHA-1 hex digest of an uploaded file, read in chunks."""
+    digest = hashlib.sha1()
+    field_file.open('rb')
+    try:
+        for chunk in field_file.chunks():
+            digest.update(chunk)
+    finally:
+        field_file.close()
+    return digest.hexdigest()
+
+
+def derivative_name(digest, size, fmt):
+    """
+    Build the storage path of a derivative.
+
+    Args:
+        digest (str): SHA-1 of the source image
+        size (str): Key into the configured sizes, e.g. 'card'
+        fmt (str): 'jpeg' or 'webp'
+
+    Returns:
+        str: Path relative to MEDIA_ROOT
+    """
+    width, height = get_sizes()[size]
+    filename = f"{digest}_{width}x{height}.{FORMATS[fmt]}"
+    return posixpath.join(DERIVATIVE_DIR, digest[:2], filename)
+
+
+def derivative_url(digest, size, fmt):
+    return default_storage.url(derivative_name(digest, size, fmt))
+
+
+def render_derivatives(field_file, digest):
+    """Write every missing size/format derivative for the given source."""
+    # Pillow is only needed by the worker, keep it off the import path.
+    from PIL import Image, ImageOps
+
+    field_file.open('rb')
+    try:
+        source = Image.open(field_file)
+        source = ImageOps.exif_transpose(source)
+        source.load()
+    finally:
+        field_file.close()
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGB')
+
+    written = 0
+    for size, dimensions in get_sizes().items():
+        thumb = ImageOps.fit(source, dimensions, Image.LANCZOS)
+        for fmt in FORMATS:
+            name = derivative_name(digest, size, fmt)
+            if default_storage.exists(name):
+                continue
+            image = thumb.convert('RGB') if fmt == 'jpeg' else thumb
+            buffer = BytesIO()
+            image.save(buffer, format=fmt.upper(), quality=82, optimize=True)
+            default_storage.save(name, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def generate_for_patient(patient_id):
+    """
+    Create the derivatives of a patient's photo and record its hash.
+
+    Args:
+        patient_id (int): Primary key of the patient
+
+    Returns:
+        str: The source hash, or '' if the patient has no usable photo
+    """
+    from ..models import Patient
+
+    patient = Patient.objects.filter(pk=patient_id).only('id', 'photo', 'photo_hash').first()
+    if patient is None or not patient.photo:
+        return ''
+    try:
+        digest = source_hash(patient.photo)
+        render_derivatives(patient.photo, digest)
+    except Exception as e:
+        logger.error(f"Could not build thumbnails for patient {patient_id}: {str(e)}", exc_info=True)
+        return ''
+    # Only publish the hash if the photo wasn't replaced while we worked.
+    Patient.objects.filter(pk=patient_id, photo=patient.photo.name).update(photo_hash=digest, updated_at=timezone.now())
+    return digest
+
+
+def schedule_for_patient(patient):
+    """Queue derivative generation once the current transaction commits."""
+    patient_id = patient.pk
+    transaction.on_commit(lambda: background.submit(generate_for_patient, patient_id))
@@ -0,0 +1,131 @@
+"""
+Waitlist Module
+
+Refills cancelled appointments from the waitlist. When an appointment is
+cancelled, slot_freed() queues it once the transaction commits, and a single
+background job drains the queue: for each freed slot it finds the best waiting
+patient with one query (a specific request for that doctor, or any doctor of
+that specialization, whose window contains the slot; highest priority, then
+longest waiting), books the slot for them and notifies them by SMS.
+
+Status updates therefore only pay for queueing, and a burst of cancellations
+(a doctor calling in sick, a batch API call) is worked off one slot at a time
+in the background. Entries are claimed with a conditional UPDATE, so two
+processes never book the same patient twice. Queued slots that were not
+processed yet are lost on restart, like every background job.
+"""
+import logging
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import background, metrics, recurrence, sms_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_NOTICE_MINUTES = 60
+# candidates fetched per slot, in case the best ones get claimed by another process first
+CANDIDATES = 5
+
+_queue = deque()
+_lock = threading.Lock()
+_draining = False
+
+
+def slot_freed(appointment_ids):
+    """Backfill these (just cancelled) appointments once the transaction commits."""
+    ids = list(appointment_ids)
+    if ids:
+        transaction.on_commit(lambda: enqueue(ids))
+
+
+def enqueue(appointment_ids):
+    global _draining
+    with _lock:
+        _queue.extend(appointment_ids)
+        if _draining:
+            return
+        _draining = True
+    background.submit(_drain)
+
+
+def _drain():
+    global _draining
+    while True:
+        with _lock:
+            if not _queue:
+                _draining = False
+                return
+            appointment_id = _queue.popleft()
+        try:
+            backfill(appointment_id)
+        except Exception as e:
+            logger.error(f"Waitlist backfill of appointment {appointment_id} failed: {str(e)}", exc_info=True)
+
+
+def candidates(doctor, start, duration_minutes, exclude_patient_id=None):
+    """Waiting entries that fit a slot, best first."""
+    from ..models import WaitlistEntry
+
+    end = start + timedelta(minutes=duration_minutes)
+    wanted = Q(doctor=doctor)
+    if doctor.specialization:
+        wanted |= Q(doctor__isnull=True, specialization=doctor.specialization)
+    entries = (
+        WaitlistEntry.objects
+        .filter(wanted, status='waiting', earliest__lte=start, latest__gte=end, duration_minutes__lte=duration_minutes)
+        .select_related('patient')
+        .order_by('-priority', 'created_at')
+    )
+    if exclude_patient_id is not None:
+        entries = entries.exclude(patient_id=exclude_patient_id)
+    return entries
+
+
+def backfill(appointment_id):
+    """
+    Book a cancelled appointment's slot for the best waiting patient.
+
+    Returns:
+        WaitlistEntry or None: The entry that got the slot
+    """
+    from ..models import Appointment, WaitlistEntry
+
+    notice = timedelta(minutes=getattr(settings, 'WAITLIST_MIN_NOTICE_MINUTES', DEFAULT_MIN_NOTICE_MINUTES))
+    freed = (
+        Appointment.objects.select_related('doctor')
+        .filter(pk=appointment_id, status='cancelled', date__gte=timezone.now() + notice)
+        .first()
+    )
+    if freed is None:
+        return None
+    if recurrence.find_conflicts(freed.doctor_id, [freed.date], freed.duration_minutes):
+        metrics.WAITLIST_BACKFILLS.inc(result='slot_taken')
+        return None
+
+    for entry in candidates(freed.doctor, freed.date, freed.duration_minutes, freed.patient_id)[:CANDIDATES]:
+        with transaction.atomic():
+            claimed = WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='booked', updated_at=timezone.now())
+            if not claimed:
+                continue
+            entry.appointment = Appointment.objects.create(
+                patient=entry.patient, doctor=freed.doctor, date=freed.date,
+                duration_minutes=entry.duration_minutes, notes='Booked from the waitlist',
+            )
+            entry.status = 'booked'
+            entry.save(update_fields=['appointment', 'status', 'updated_at'])
+        metrics.WAITLIST_BACKFILLS.inc(result='booked')
+        metrics.BOOKINGS.inc(result='waitlist')
+        logger.info(f"Gave the slot of appointment {freed.pk} to waitlist entry {entry.pk}")
+        sms_service.send_sms(entry.patient.phone, (
+            f"An earlier appointment opened up: you are booked with {freed.doctor.name} on "
+            f"{timezone.localtime(freed.date):%Y-%m-%d at %H:%M}. Please call us if you cannot make it."
+        ))
+        return entry
+    metrics.WAITLIST_BACKFILLS.inc(result='no_match')
+    return None
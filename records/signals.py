@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import backends
+from .models import Department, Doctor, DoctorAvailability, MedicalRecord, Patient, Prescription, TreatmentPlan
+from .services import caching, patient_matching, prescription_pdf, search, thumbnails
+
+CACHED_MODELS = [Department, Doctor, DoctorAvailability]
+SEARCH_KINDS = {
+    MedicalRecord: 'record',
+    Prescription: 'prescription',
+    TreatmentPlan: 'treatment_plan',
+}
+
+
+@receiver(pre_save, sender=Patient)
+def reset_photo_hash(sender, instance, raw=False, **kwargs):
+    """Forget the old thumbnails when a different photo is uploaded."""
+    if raw or not instance.pk or not instance.photo_hash:
+        return
+    old_photo = Patient.objects.filter(pk=instance.pk).values_list('photo', flat=True).first()
+    if old_photo != instance.photo.name:
+        instance.photo_hash = ''
+
+
+@receiver(post_save, sender=Patient)
+def queue_photo_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw or not instance.photo or instance.photo_hash:
+        return
+    thumbnails.schedule_for_patient(instance)
+
+
+@receiver(post_save, sender=Patient)
+def update_patient_match_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not {'name', 'phone'} & set(update_fields):
+        return
+    patient_matching.index_patient(instance)
+
+
+@receiver(post_save, sender=Prescription)
+def queue_prescription_pdf(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and set(update_fields) <= {'prescription_file', 'generated_pdf', 'pdf_hash'}:
+        return
+    prescription_pdf.schedule(instance)
+
+
+def update_search_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_object(SEARCH_KINDS[sender], instance)
+
+
+def remove_search_document(sender, instance, **kwargs):
+    search.unindex_object(SEARCH_KINDS[sender], instance.pk)
+
+
+for _model in SEARCH_KINDS:
+    post_save.connect(update_search_document, sender=_model, dispatch_uid=f'search_save_{_model.__name__}')
+    post_delete.connect(remove_search_document, sender=_model, dispatch_uid=f'search_delete_{_model.__name__}')
+
+
+def invalidate_reference_cache(sender, **kwargs):
+    # bumped on commit: a request reading in between would otherwise cache the
+    # old rows under the new version
+    transaction.on_commit(lambda: caching.invalidate(sender))
+
+
+for _model in CACHED_MODELS:
+    post_save.connect(invalidate_reference_cache, sender=_model, dispatch_uid=f'refcache_save_{_model.__name__}')
+    post_delete.connect(invalidate_reference_cache, sender=_model, dispatch_uid=f'refcache_delete_{_model.__name__}')
+
+
+def forget_cached_user(sender, instance, **kwargs):
+    backends.forget_user(instance.pk)
+
+
+post_save.connect(forget_cached_user, sender=get_user_model(), dispatch_uid='user_cache_save')
+post_delete.connect(forget_cached_user, sender=get_user_model(), dispatch_uid='user_cache_delete')
@@ -0,0 +1,11 @@
+from django import template
+
+from ..services import fragment_cache
+
+register = template.Library()
+
+
+@register.filter
+def fragment_version(objects):
+    """Vary-on key for {% cache %}: changes whenever a rendered row changes."""
+    return fragment_cache.version_for(objects)
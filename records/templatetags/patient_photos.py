@@ -0,0 +1,41 @@
+from django import template
+from django.utils.html import format_html
+
+from ..services import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def patient_thumbnail_url(patient, size='card', fmt='jpeg'):
+    """URL of a photo derivative, falling back to the original upload."""
+    if not patient.photo:
+        return ''
+    if patient.photo_hash:
+        return thumbnails.derivative_url(patient.photo_hash, size, fmt)
+    return patient.photo.url
+
+
+@register.simple_tag
+def patient_photo(patient, size='card', css_class=''):
+    """
+    Render a <picture> with a WebP source and a JPEG fallback.
+
+    Usage: {% patient_photo patient 'card' 'rounded-circle' %}
+    """
+    if not patient.photo:
+        return ''
+    width, height = thumbnails.get_sizes()[size]
+    if not patient.photo_hash:
+        # Thumbnails are still being generated, size the original down.
+        return format_html(
+            '<img src="{}" alt="{}" width="{}" height="{}" class="{}" loading="lazy" style="object-fit:cover;">',
+            patient.photo.url, patient.name, width, height, css_class,
+        )
+    return format_html(
+        '<picture><source srcset="{}" type="image/webp">'
+        '<img src="{}" alt="{}" width="{}" height="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        thumbnails.derivative_url(patient.photo_hash, size, 'webp'),
+        thumbnails.derivative_url(patient.photo_hash, size, 'jpeg'),
+        patient.name, width, height, css_class,
+    )
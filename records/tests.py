@@ -1,3 +1,802 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Appointment, AppointmentSeries, ArchivedAppointment, ArchivedMessage, Department, Doctor, Invoice, MedicalRecord,
+    Message, Patient, Prescription, WaitlistEntry,
+)
+from .services import archive, billing, caching, ics, metrics, pagination, patient_import, prescription_pdf, recurrence, waitlist
+
+
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        caching.get_cache().clear()
+        self.builds = 0
+
+    def _cached(self):
+        def build():
+            self.builds += 1
+            return self.builds
+        return caching.cached('test_value', [Doctor], build)
+
+    def test_hit_until_invalidated(self):
+        self.assertEqual(self._cached(), 1)
+        self.assertEqual(self._cached(), 1)
+        caching.invalidate(Doctor)
+        self.assertEqual(self._cached(), 2)
+
+    def test_evicted_version_does_not_revive_old_entries(self):
+        self.assertEqual(self._cached(), 1)
+        caching.invalidate(Doctor)
+        self.assertEqual(self._cached(), 2)
+
+        # the version key is evicted while both entries are still cached
+        caching.get_cache().delete(caching._version_key(Doctor))
+        self.assertEqual(self._cached(), 3)
+        caching.get_cache().delete(caching._version_key(Doctor))
+        caching.invalidate(Doctor)
+        self.assertEqual(self._cached(), 4)
+
+    def test_saving_invalidates_on_commit(self):
+        self.assertEqual(self._cached(), 1)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Doctor.objects.create(name='Dr. Lee', specialization='GP')
+            # still inside the transaction: the old entry stays valid
+            self.assertEqual(self._cached(), 1)
+        self.assertTrue(callbacks)
+        self.assertEqual(self._cached(), 2)
+
+
+class BillingLedgerTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+
+    def test_create_invoice_totals_line_items(self):
+        invoice = billing.create_invoice(self.patient, [('Consultation', 1, '50.00'), ('Lab test', 2, '12.50')])
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.amount, Decimal('75.00'))
+        self.assertEqual(sorted(item.amount for item in invoice.items.all()), [Decimal('25.00'), Decimal('50.00')])
+        self.assertEqual((invoice.amount_paid, invoice.status), (Decimal('0.00'), 'pending'))
+
+    def test_record_payment_partial_then_paid(self):
+        invoice = billing.create_invoice(self.patient, [('Consultation', 1, '50.00')])
+        billing.record_payment(invoice.pk, '20.00')
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.status), (Decimal('20.00'), 'partial'))
+
+        billing.record_payment(invoice.pk, '30.00', method='card')
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.amount_paid, invoice.status), (Decimal('50.00'), 'paid'))
+        self.assertEqual(invoice.payments.count(), 2)
+
+    def test_record_payment_rejects_closed_invoices_and_non_positive_amounts(self):
+        invoice = billing.create_invoice(self.patient, [('Consultation', 1, '50.00')])
+        with self.assertRaises(ValueError):
+            billing.record_payment(invoice.pk, '0')
+        billing.record_payment(invoice.pk, '50.00')
+        with self.assertRaises(ValueError):
+            billing.record_payment(invoice.pk, '1.00')
+        self.assertEqual(invoice.payments.count(), 1)
+
+    def test_recalculate_totals_after_rows_change(self):
+        invoice = billing.create_invoice(self.patient, [('Consultation', 1, '50.00'), ('Lab test', 1, '30.00')])
+        billing.record_payment(invoice.pk, '50.00')
+        invoice.items.filter(description='Lab test').delete()
+
+        invoice = billing.recalculate_totals(invoice.pk, payments=False)
+        self.assertEqual((invoice.amount, invoice.amount_paid, invoice.status), (Decimal('50.00'), Decimal('50.00'), 'paid'))
+
+        invoice.payments.all().delete()
+        invoice = billing.recalculate_totals(invoice.pk, items=False)
+        self.assertEqual((invoice.amount_paid, invoice.status), (Decimal('0.00'), 'pending'))
+
+    def test_ledger_summary(self):
+        today = date(2026, 6, 30)
+        overdue = billing.create_invoice(self.patient, [('Old', 1, '100.00')], date=today - timedelta(days=75), due_days=30)
+        billing.record_payment(overdue.pk, '40.00')
+        billing.create_invoice(self.patient, [('New', 1, '20.00')], date=today)
+        void = billing.create_invoice(self.patient, [('Void', 1, '5.00')], date=today)
+        Invoice.objects.filter(pk=void.pk).update(status='void', updated_at=timezone.now())
+
+        summary = billing.ledger_summary(as_of=today)
+        self.assertEqual(summary['total_revenue'], Decimal('120.00'))
+        self.assertEqual(summary['paid_amount'], Decimal('40.00'))
+        self.assertEqual(summary['outstanding_amount'], Decimal('80.00'))
+        self.assertEqual(summary['overdue_amount'], Decimal('60.00'))
+        self.assertEqual(summary['open_invoices'], 2)
+        self.assertEqual(dict(summary['aging']), {
+            'current': Decimal('20.00'), '0-30': Decimal('0.00'), '31-60': Decimal('60.00'),
+            '61-90': Decimal('0.00'), '90+': Decimal('0.00'),
+        })
+
+
+class BillingViewTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        self.invoice = billing.create_invoice(self.patient, [('Consultation', 1, '50.00')])
+        self.clerk = User.objects.create_user('clerk')
+        self.clerk.user_permissions.add(*Permission.objects.filter(codename__in=['add_invoice', 'change_invoice']))
+
+    def _new_invoice(self):
+        return self.client.post(reverse('create_invoice'), {
+            'patient': self.patient.pk, 'item_description[]': ['Lab test'], 'item_amount[]': ['30.00'],
+        })
+
+    def test_writes_need_invoice_permissions(self):
+        self.client.force_login(User.objects.create_user('nurse'))
+        self.assertEqual(self._new_invoice().status_code, 403)
+        response = self.client.post(reverse('record_invoice_payment', args=[self.invoice.pk]), {'amount': '50.00'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Invoice.objects.count(), 1)
+        self.assertFalse(self.invoice.payments.exists())
+
+    def test_billing_list_no_longer_creates_invoices(self):
+        self.client.force_login(self.clerk)
+        self.client.post(reverse('billing_list'), {
+            'patient': self.patient.pk, 'item_description[]': ['Lab test'], 'item_amount[]': ['30.00'],
+        })
+        self.assertEqual(Invoice.objects.count(), 1)
+
+    def test_create_invoice_and_pay(self):
+        self.client.force_login(self.clerk)
+        self.assertContains(self.client.get(reverse('billing_list')), reverse('create_invoice'))
+        self.assertRedirects(self._new_invoice(), reverse('billing_list'), fetch_redirect_response=False)
+        self.assertEqual(Invoice.objects.filter(patient=self.patient, amount=Decimal('30.00')).count(), 1)
+
+        url = reverse('record_invoice_payment', args=[self.invoice.pk])
+        back = reverse('billing_list') + '?status=unpaid'
+        response = self.client.post(url, {'amount': '20.00'}, HTTP_REFERER=f'http://testserver{back}')
+        self.assertRedirects(response, f'http://testserver{back}', fetch_redirect_response=False)
+        response = self.client.post(url, {'amount': '30.00'}, HTTP_REFERER='https://evil.example/')
+        self.assertRedirects(response, reverse('billing_list'), fetch_redirect_response=False)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.status, 'paid')
+
+
+class KeysetPaginationTests(TestCase):
+    ordering = ['-date', '-id']
+
+    def setUp(self):
+        patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        # several invoices share a date, so the id tie-breaker matters
+        for offset in range(11):
+            billing.create_invoice(patient, [('Item', 1, '10.00')], date=date(2026, 1, 1) + timedelta(days=offset // 3))
+        self.expected = list(Invoice.objects.order_by(*self.ordering).values_list('pk', flat=True))
+
+    def test_walks_forward_and_back_without_gaps_or_repeats(self):
+        pages, cursor = [], None
+        while True:
+            page = pagination.paginate(Invoice.objects.all(), self.ordering, after=cursor, page_size=4)
+            pages.append(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual([invoice.pk for page in pages for invoice in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 3])
+        self.assertFalse(pages[0].has_previous)
+
+        back = pagination.paginate(Invoice.objects.all(), self.ordering, before=pages[2].previous_cursor, page_size=4)
+        self.assertEqual([invoice.pk for invoice in back], [invoice.pk for invoice in pages[1]])
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+
+    def test_malformed_cursor(self):
+        for cursor in ('not-a-cursor', 'WzFd'):
+            with self.assertRaises(pagination.InvalidCursor):
+                pagination.paginate(Invoice.objects.all(), self.ordering, after=cursor)
+
+    def test_api_list_links(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        for index in range(4):
+            Patient.objects.create(name=f'Patient {index}', dob=date(1990, 1, 1), address='x')
+        expected = list(Patient.objects.order_by('id').values_list('pk', flat=True))
+
+        seen, url = [], '/api/v1/patients/?limit=2'
+        while url:
+            body = self.client.get(url).json()
+            seen.extend(row['id'] for row in body['data'])
+            url = body['links']['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/api/v1/patients/?after=bogus').status_code, 400)
+
+
+class BillingToInvoicesMigrationTests(TransactionTestCase):
+    migrate_from = [('records', '0015_dashboard')]
+    migrate_to = [('records', '0016_billing_to_invoices')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_bills_become_invoices(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        Patient = apps.get_model('records', 'Patient')
+        Billing = apps.get_model('records', 'Billing')
+        patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        paid = Billing.objects.create(patient=patient, amount=Decimal('40.00'), description='X-ray', paid=True)
+        Billing.objects.create(patient=patient, amount=Decimal('25.50'), description='Consultation')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+        Invoice = apps.get_model('records', 'Invoice')
+        invoices = {invoice.description: invoice for invoice in Invoice.objects.all()}
+
+        self.assertEqual(len(invoices), 2)
+        xray = invoices['X-ray']
+        self.assertEqual((xray.amount, xray.amount_paid, xray.status), (Decimal('40.00'), Decimal('40.00'), 'paid'))
+        self.assertEqual([p.amount for p in xray.payments.all()], [Decimal('40.00')])
+        self.assertEqual(xray.payments.get().reference, f'bill #{paid.pk}')
+        consultation = invoices['Consultation']
+        self.assertEqual((consultation.amount_paid, consultation.status), (Decimal('0.00'), 'pending'))
+        self.assertFalse(consultation.payments.exists())
+        for invoice in invoices.values():
+            self.assertEqual([item.amount for item in invoice.items.all()], [invoice.amount])
+
+
+class ConnectDoctorTests(TestCase):
+    def test_patient_message_is_saved_and_counted(self):
+        user = User.objects.create_user('ann')
+        patient = Patient.objects.create(user=user, name='Ann', dob=date(1980, 1, 1), address='x')
+        doctor = Doctor.objects.create(name='Bob')
+        self.client.force_login(user)
+        sent = sum(value for _, value in metrics.MESSAGES.snapshot())
+
+        response = self.client.post(reverse('connect_doctor', args=[doctor.pk]), {'message': 'Hello doctor'})
+
+        self.assertRedirects(response, reverse('connect_doctor', args=[doctor.pk]), fetch_redirect_response=False)
+        self.assertTrue(Message.objects.filter(sender_patient=patient, doctor=doctor, content='Hello doctor').exists())
+        self.assertEqual(sum(value for _, value in metrics.MESSAGES.snapshot()), sent + 1)
+
+
+class ProtectedMediaTests(TestCase):
+    content = b'0123456789' * 10
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PROTECTED_MEDIA_SERVER=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.owner = User.objects.create_user('ann')
+        patient = Patient.objects.create(user=self.owner, name='Ann', dob=date(1980, 1, 1), address='x')
+        self.record = MedicalRecord.objects.create(
+            patient=patient, diagnosis='Flu', treatment='Rest',
+            report=SimpleUploadedFile('report.txt', self.content),
+        )
+        self.url = reverse('medical_record_report', args=[self.record.pk])
+
+    def test_owner_and_permitted_staff_only(self):
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        staff = User.objects.create_user('nurse')
+        staff.user_permissions.add(Permission.objects.get(codename='view_medicalrecord'))
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_ranges(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_validators(self):
+        self.client.force_login(self.owner)
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # a stale If-Range gets the whole file instead of the range
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+
+class SearchAccessTests(TestCase):
+    def setUp(self):
+        self.ann_user = User.objects.create_user('ann')
+        self.ann = Patient.objects.create(user=self.ann_user, name='Ann', dob=date(1980, 1, 1), address='x')
+        bob = Patient.objects.create(name='Bob', dob=date(1981, 1, 1), address='x')
+        self.ann_record = MedicalRecord.objects.create(patient=self.ann, diagnosis='Asthma', treatment='Inhaler')
+        self.bob_record = MedicalRecord.objects.create(patient=bob, diagnosis='Asthma', treatment='Inhaler')
+        self.url = reverse('search_records')
+
+    def _hits(self, **params):
+        response = self.client.get(self.url, {'q': 'asthma', **params})
+        self.assertEqual(response.status_code, 200)
+        return {result['object'].pk for result in response.context['results']}
+
+    def test_staff_with_permission_search_every_chart(self):
+        staff = User.objects.create_user('doc')
+        staff.user_permissions.add(Permission.objects.get(codename='view_medicalrecord'))
+        self.client.force_login(staff)
+        self.assertEqual(self._hits(), {self.ann_record.pk, self.bob_record.pk})
+
+    def test_patient_searches_only_their_own_chart(self):
+        self.client.force_login(self.ann_user)
+        self.assertEqual(self._hits(), {self.ann_record.pk})
+        self.assertEqual(self._hits(patient=self.bob_record.patient_id), {self.ann_record.pk})
+        response = self.client.get(self.url, {'q': 'asthma', 'mode': 'patients'})
+        self.assertEqual(response.context['patients'], [])
+
+    def test_other_accounts_are_refused(self):
+        self.client.force_login(User.objects.create_user('nobody'))
+        self.assertEqual(self.client.get(self.url, {'q': 'asthma'}).status_code, 403)
+
+
+class PatientLookupTests(TestCase):
+    def test_limit_is_clamped(self):
+        for index in range(3):
+            Patient.objects.create(name=f'John Smith {index}', dob=date(1980, 1, 1), address='x')
+        self.client.force_login(User.objects.create_user('desk'))
+        url = reverse('patient_lookup')
+        self.assertEqual(len(self.client.get(url, {'q': 'john smith', 'limit': '0'}).json()['results']), 1)
+        self.assertEqual(len(self.client.get(url, {'q': 'john smith', 'limit': '-4'}).json()['results']), 1)
+        self.assertEqual(len(self.client.get(url, {'q': 'john smith', 'limit': '2'}).json()['results']), 2)
+
+
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        self.url = reverse('patient_detail', args=[self.patient.pk])
+        self.client.force_login(User.objects.create_user('doc'))
+
+    def test_unchanged_page_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_changes_and_a_new_day_refresh_the_page(self):
+        etag = self.client.get(self.url)['ETag']
+        record = MedicalRecord.objects.create(patient=self.patient, diagnosis='Asthma', treatment='Inhaler')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        # a deletion doesn't move the newest updated_at, the counts catch it
+        MedicalRecord.objects.filter(pk=record.pk).delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.localdate', return_value=tomorrow):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PatientImportTests(TestCase):
+    CSV = (
+        'Full Name,Date of Birth,Phone,Address\n'
+        'Ann Lee,1980-01-01,5551234567,1 Main St\n'
+        'Bob Stone,1970-02-02,5550000001,2 Main St\n'
+        'Robert Stone,1970-02-02,5550000001,2 Main St\n'
+        'Cara,not a date,,3 Main St\n'
+        'Dan Moss,1990-03-03,,4 Main St\n'
+    )
+
+    def setUp(self):
+        # stored with different spacing and case; same date of birth
+        Patient.objects.create(name='ann  LEE', dob=date(1980, 1, 1), address='x')
+
+    def _import(self, **kwargs):
+        return patient_import.import_patients(io.BytesIO(self.CSV.encode()), 'patients.csv', batch_size=2, **kwargs)
+
+    def test_duplicates_in_database_and_across_batches_are_skipped(self):
+        errors = []
+        result = self._import(on_error=lambda number, message: errors.append(number))
+        self.assertEqual((result.rows, result.created, result.duplicates, result.invalid), (5, 2, 2, 1))
+        self.assertEqual(errors, [5])
+        self.assertEqual(
+            sorted(Patient.objects.values_list('name', flat=True)), ['Bob Stone', 'Dan Moss', 'ann  LEE'],
+        )
+        # the imported rows are indexed for matching like saved ones
+        self.assertTrue(Patient.objects.get(name='Dan Moss').match_keys.exists())
+
+    def test_dry_run_writes_nothing(self):
+        result = self._import(dry_run=True)
+        # nothing reaches the database, so only the stored patient and
+        # duplicates within one batch are caught
+        self.assertEqual((result.created, result.duplicates, result.invalid), (3, 1, 1))
+        self.assertEqual(Patient.objects.count(), 1)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        self.doctor = Doctor.objects.create(
+            name='Dr. Lee', specialization='GP', department=Department.objects.create(name='General'),
+        )
+        self.appointments = [
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=timezone.now() + timedelta(days=day))
+            for day in range(1, 4)
+        ]
+        self.user = User.objects.create_user('api')
+        self.user.user_permissions.add(*Permission.objects.filter(codename__in=['view_appointment', 'view_doctor']))
+        self.client.force_login(self.user)
+
+    def _patch(self, pk, data):
+        return self.client.patch(f'/api/v1/appointments/{pk}/', data, content_type='application/json')
+
+    def test_sparse_fields(self):
+        body = self.client.get('/api/v1/doctors/', {'fields': 'name'}).json()
+        self.assertEqual(body['data'], [{'id': self.doctor.pk, 'name': 'Dr. Lee'}])
+        response = self.client.get('/api/v1/doctors/', {'fields': 'name,salary'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('salary', response.json()['error']['message'])
+
+    def test_include_does_not_add_queries_per_row(self):
+        def fetch():
+            with CaptureQueriesContext(connection) as queries:
+                body = self.client.get('/api/v1/appointments/', {'include': 'patient,doctor'}).json()
+            return body, len(queries)
+
+        body, queries = fetch()
+        self.assertEqual(body['data'][0]['doctor']['name'], 'Dr. Lee')
+        self.assertEqual(body['data'][0]['patient']['id'], self.patient.pk)
+        for day in range(4, 8):
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=timezone.now() + timedelta(days=day))
+        self.assertEqual(fetch()[1], queries)
+
+        data = self.client.get(f'/api/v1/doctors/{self.doctor.pk}/', {'include': 'department,availabilities'}).json()['data']
+        self.assertEqual((data['department']['name'], data['availabilities']), ('General', []))
+
+    def test_cursor_links_go_back(self):
+        body = self.client.get('/api/v1/appointments/', {'limit': 2, 'fields': 'status'}).json()
+        self.assertIsNone(body['links']['prev'])
+        second = self.client.get(body['links']['next']).json()
+        self.assertEqual([row['id'] for row in second['data']], [self.appointments[2].pk])
+        first = self.client.get(second['links']['prev']).json()
+        self.assertEqual(first['data'], body['data'])
+        self.assertEqual(self.client.get('/api/v1/appointments/', {'after': 'garbage'}).status_code, 400)
+
+    def test_patch_needs_change_permission_and_a_valid_status(self):
+        pk = self.appointments[0].pk
+        self.assertEqual(self._patch(pk, {'status': 'completed'}).status_code, 403)
+        self.user.user_permissions.add(Permission.objects.get(codename='change_appointment'))
+
+        self.assertEqual(self._patch(pk, {'status': 'done'}).status_code, 400)
+        self.assertEqual(self._patch(pk, {'status': 'completed', 'notes': 'x'}).status_code, 400)
+        self.assertEqual(self._patch(0, {'status': 'completed'}).status_code, 404)
+        response = self._patch(pk, {'status': 'completed'})
+        self.assertEqual(response.json()['data']['status'], 'completed')
+        self.assertEqual(Appointment.objects.get(pk=pk).status, 'completed')
+
+    def test_batch_status_update(self):
+        self.user.user_permissions.add(Permission.objects.get(codename='change_appointment'))
+        ids = [appointment.pk for appointment in self.appointments[:2]]
+        response = self.client.post(
+            '/api/v1/appointments/batch/', {'ids': ids + [0, ids[0]], 'status': 'cancelled'}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['data'], {'requested': 3, 'updated': 2})
+        self.assertEqual(
+            list(Appointment.objects.order_by('pk').values_list('status', flat=True)), ['cancelled', 'cancelled', 'scheduled'],
+        )
+        response = self.client.post('/api/v1/appointments/batch/', {'ids': [], 'status': 'cancelled'}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('ann')
+        self.patient = Patient.objects.create(user=self.owner, name='Ann', dob=date(1980, 1, 1), address='x')
+        self.doctor = Doctor.objects.create(name='Dr. Lee', specialization='GP')
+        old = timezone.now() - timedelta(days=1000)
+        series = AppointmentSeries.objects.create(patient=self.patient, doctor=self.doctor, start=old, count=2)
+        self.completed = Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, date=old, status='completed', series=series, notes='Check-up',
+        )
+        self.invoice = billing.create_invoice(self.patient, [('Visit', 1, '40.00')], appointment=self.completed)
+        self.unbilled = Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=old, status='completed')
+        self.message = Message.objects.create(sender_patient=self.patient, doctor=self.doctor, content='Thanks')
+        Message.objects.filter(pk=self.message.pk).update(timestamp=old, read_at=old + timedelta(hours=1))
+
+    def test_round_trip(self):
+        self.assertEqual(archive.archive_appointments(days=365, dry_run=True), 1)
+        self.assertEqual(archive.archive_appointments(days=365, batch_size=1), 1)
+        self.assertEqual(archive.archive_messages(days=365), 1)
+
+        # completed appointments without an invoice stay for generate_invoices
+        self.assertEqual(list(Appointment.objects.values_list('pk', flat=True)), [self.unbilled.pk])
+        self.assertFalse(Message.objects.exists())
+        archived = ArchivedAppointment.objects.get(pk=self.completed.pk)
+        for field in ('patient_id', 'doctor_id', 'series_id', 'date', 'notes', 'status', 'created_at'):
+            self.assertEqual(getattr(archived, field), getattr(self.completed, field), field)
+        self.assertEqual(archived.invoice_id, self.invoice.pk)
+        self.invoice.refresh_from_db()
+        self.assertIsNone(self.invoice.appointment_id)
+        message = ArchivedMessage.objects.get(pk=self.message.pk)
+        self.assertEqual((message.sender_patient_id, message.doctor_id, message.content), (self.patient.pk, self.doctor.pk, 'Thanks'))
+        self.assertIsNotNone(message.read_at)
+
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('patient_archive', args=[self.patient.pk]))
+        self.assertEqual(list(response.context['appointments']), [archived])
+        self.assertEqual(list(response.context['archived_messages']), [message])
+
+    def test_archive_page_needs_permission(self):
+        url = reverse('patient_archive', args=[self.patient.pk])
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        staff = User.objects.create_user('nurse')
+        staff.user_permissions.add(Permission.objects.get(codename='view_archivedappointment'))
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(TIME_ZONE='Europe/Berlin')
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        self.doctor = Doctor.objects.create(name='Dr. Lee', specialization='GP')
+
+    def _at(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def _book(self, start, minutes=30, status='scheduled'):
+        return Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, date=start, duration_minutes=minutes, status=status,
+        )
+
+    def test_weekly_keeps_the_local_time_across_dst(self):
+        dates = recurrence.occurrence_dates(self._at(2026, 3, 22, 10, 0), count=3)
+        self.assertEqual([timezone.localtime(d).strftime('%m-%d %H:%M') for d in dates], ['03-22 10:00', '03-29 10:00', '04-05 10:00'])
+        # the UTC offset changes, the wall clock doesn't
+        self.assertEqual([d.utcoffset() for d in dates], [timedelta(hours=1), timedelta(hours=2), timedelta(hours=2)])
+
+    def test_monthly_clamps_to_the_month_end_and_until_is_inclusive(self):
+        dates = recurrence.occurrence_dates(self._at(2026, 1, 31, 9, 0), 'monthly', until=date(2026, 3, 31))
+        self.assertEqual([timezone.localtime(d).date() for d in dates], [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)])
+        dates = recurrence.occurrence_dates(self._at(2026, 1, 1, 9, 0), 'monthly', interval=2, count=3)
+        self.assertEqual([d.month for d in dates], [1, 3, 5])
+
+    def test_invalid_series(self):
+        start = self._at(2026, 1, 5, 9, 0)
+        for kwargs in ({'count': 2, 'frequency': 'daily'}, {'count': 2, 'interval': 0}, {}, {'count': 500}):
+            with self.assertRaises(ValueError):
+                recurrence.occurrence_dates(start, **kwargs)
+        with override_settings(APPOINTMENT_SERIES_MAX_OCCURRENCES=3):
+            with self.assertRaises(ValueError):
+                recurrence.occurrence_dates(start, until=date(2026, 12, 31))
+
+    def test_find_conflicts(self):
+        self._book(self._at(2026, 1, 5, 10, 0))
+        # a long appointment still running after later, shorter ones have ended
+        long_one = self._book(self._at(2026, 1, 5, 8, 0), minutes=180)
+        self._book(self._at(2026, 1, 5, 12, 0), status='cancelled')
+        starts = [self._at(2026, 1, 5, 12, 0), self._at(2026, 1, 5, 9, 45), self._at(2026, 1, 5, 10, 30), self._at(2026, 1, 5, 11, 0)]
+
+        conflicts = recurrence.find_conflicts(self.doctor.pk, starts, 30)
+        self.assertEqual(conflicts, [self._at(2026, 1, 5, 9, 45), self._at(2026, 1, 5, 10, 30)])
+        conflicts = recurrence.find_conflicts(self.doctor.pk, starts, 30, exclude_ids=[long_one.pk])
+        self.assertEqual(conflicts, [self._at(2026, 1, 5, 9, 45)])
+
+    def test_update_following_splits_the_series(self):
+        series, booked, _ = recurrence.create_series(self.patient, self.doctor, self._at(2026, 1, 5, 10, 0), count=4)
+        self.assertEqual(booked, 4)
+        first, second, third, fourth = series.appointments.order_by('date')
+
+        self.assertEqual(recurrence.update_following(third, start=third.date + timedelta(hours=2), notes='Later'), 2)
+        series.refresh_from_db()
+        self.assertEqual((series.until, series.count), (date(2026, 1, 18), None))
+        self.assertEqual(list(series.appointments.order_by('date')), [first, second])
+
+        third.refresh_from_db()
+        fourth.refresh_from_db()
+        self.assertNotEqual(third.series_id, series.pk)
+        self.assertEqual(fourth.series_id, third.series_id)
+        self.assertEqual(third.series.count, 2)
+        self.assertEqual([timezone.localtime(a.date).hour for a in (third, fourth)], [12, 12])
+        self.assertEqual((third.notes, fourth.notes), ('Later', 'Later'))
+
+    def test_update_following_refuses_conflicts(self):
+        series, _, _ = recurrence.create_series(self.patient, self.doctor, self._at(2026, 1, 5, 10, 0), count=3)
+        self._book(self._at(2026, 1, 19, 11, 0))
+        second = series.appointments.order_by('date')[1]
+        with self.assertRaises(recurrence.SeriesConflict):
+            recurrence.update_following(second, start=second.date + timedelta(hours=1))
+        series.refresh_from_db()
+        self.assertEqual(series.count, 3)
+        self.assertEqual(series.appointments.filter(date__hour=10).count(), 3)
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class WaitlistBackfillTests(TestCase):
+    def setUp(self):
+        self.doctor = Doctor.objects.create(name='Dr. Lee', specialization='Cardiology')
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        self.cancelling = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        self.appointment = Appointment.objects.create(patient=self.cancelling, doctor=self.doctor, date=self.start)
+        self.window = {'earliest': self.start - timedelta(days=1), 'latest': self.start + timedelta(days=1)}
+
+    def _wait(self, name, **kwargs):
+        patient = Patient.objects.create(name=name, dob=date(1990, 1, 1), address='x', phone='5550000000')
+        return WaitlistEntry.objects.create(patient=patient, **{'doctor': self.doctor, **self.window, **kwargs})
+
+    def _cancel(self):
+        with mock.patch('records.services.sms_service.send_sms') as send_sms:
+            with self.captureOnCommitCallbacks(execute=True):
+                Appointment.objects.filter(pk=self.appointment.pk).update(status='cancelled', updated_at=timezone.now())
+                waitlist.slot_freed([self.appointment.pk])
+        return send_sms
+
+    def test_best_fitting_entry_gets_the_slot(self):
+        self._wait('Too late', earliest=self.start + timedelta(hours=1))
+        self._wait('Too long', duration_minutes=60)
+        first = self._wait('First come')
+        any_cardiologist = self._wait('Any cardiologist', doctor=None, specialization='Cardiology', priority=1)
+        WaitlistEntry.objects.create(patient=self.cancelling, doctor=self.doctor, priority=5, **self.window)
+
+        send_sms = self._cancel()
+
+        any_cardiologist.refresh_from_db()
+        self.assertEqual(any_cardiologist.status, 'booked')
+        self.assertEqual(
+            (any_cardiologist.appointment.doctor_id, any_cardiologist.appointment.date), (self.doctor.pk, self.start),
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'waiting')
+        send_sms.assert_called_once()
+
+    def test_rebooked_or_imminent_slots_are_left_alone(self):
+        entry = self._wait('Bob', earliest=timezone.now())
+        Appointment.objects.create(patient=self.cancelling, doctor=self.doctor, date=self.start)
+        self._cancel()
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'waiting')
+
+        soon = Appointment.objects.create(
+            patient=self.cancelling, doctor=self.doctor, date=timezone.now() + timedelta(minutes=10), status='cancelled',
+        )
+        self.assertIsNone(waitlist.backfill(soon.pk))
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        self.doctor = Doctor.objects.create(name='Dr. Lee', specialization='GP', calendar_token=ics.new_token())
+        self.appointment = Appointment.objects.create(patient=patient, doctor=self.doctor, date=timezone.now() + timedelta(days=1))
+        self.url = reverse('doctor_calendar_feed', args=[self.doctor.pk, self.doctor.calendar_token])
+
+    def _body(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_fold_and_escape(self):
+        for line in ('x' * 200, 'DESCRIPTION:' + 'é' * 100):
+            folded = ics.fold(line)
+            physical = folded[:-2].split('\r\n')
+            self.assertTrue(all(len(part.encode()) <= 75 for part in physical))
+            self.assertTrue(all(part.startswith(' ') for part in physical[1:]))
+            self.assertEqual(folded[:-2].replace('\r\n ', ''), line)
+        self.assertEqual(ics.fold('short'), 'short\r\n')
+        self.assertEqual(ics.escape('a;b,c\\d\r\ne\nf'), 'a\\;b\\,c\\\\d\\ne\\nf')
+
+    def test_etag_revalidation(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'UID:appointment-{self.appointment.pk}@testserver', self._body(response))
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Appointment.objects.filter(pk=self.appointment.pk).update(status='cancelled', updated_at=timezone.now())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('STATUS:CANCELLED', self._body(response))
+        self.assertEqual(self.client.get(reverse('doctor_calendar_feed', args=[self.doctor.pk, 'wrong'])).status_code, 404)
+
+    def test_uid_domain(self):
+        # the cached body of one host is not served to another
+        self.assertIn('@a.example', self._body(self.client.get(self.url, HTTP_HOST='a.example')))
+        self.assertIn('@b.example', self._body(self.client.get(self.url, HTTP_HOST='b.example')))
+        with override_settings(ICS_FEED_UID_DOMAIN='clinic.example'):
+            self.assertIn('@clinic.example', self._body(self.client.get(self.url, HTTP_HOST='a.example')))
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class PrescriptionPdfTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PROTECTED_MEDIA_SERVER=None)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.owner = User.objects.create_user('ann')
+        patient = Patient.objects.create(user=self.owner, name='Ann', dob=date(1980, 1, 1), address='x')
+        self.doctor = Doctor.objects.create(name='Dr. Lee', specialization='GP')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.prescription = Prescription.objects.create(
+                patient=patient, doctor=self.doctor, medication='Ibuprofen', dosage='400 mg', instructions='Twice a day',
+            )
+
+    def _render_count(self, func, *args):
+        with mock.patch.object(prescription_pdf, 'render_pdf', wraps=prescription_pdf.render_pdf) as render:
+            result = func(*args)
+        return result, render.call_count
+
+    def test_unchanged_data_reuses_the_stored_file(self):
+        self.prescription.refresh_from_db()
+        first = self.prescription.pdf_hash
+        self.assertEqual(self.prescription.generated_pdf.name, prescription_pdf.pdf_name(first))
+
+        self.assertEqual(self._render_count(prescription_pdf.generate, self.prescription.pk), (first, 0))
+
+        Doctor.objects.filter(pk=self.doctor.pk).update(name='Dr. Lee-Smith')
+        second, renders = self._render_count(prescription_pdf.generate, self.prescription.pk)
+        self.assertNotEqual(second, first)
+        self.assertEqual(renders, 1)
+
+        # back to the old name: the old file is still there and is reused
+        Doctor.objects.filter(pk=self.doctor.pk).update(name='Dr. Lee')
+        self.assertEqual(self._render_count(prescription_pdf.generate, self.prescription.pk), (first, 0))
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.pdf_hash, first)
+
+    @override_settings(BACKGROUND_TASKS_ASYNC=True)
+    def test_polling_queues_one_job(self):
+        Doctor.objects.filter(pk=self.doctor.pk).update(name='Dr. Lee-Smith')
+        self.client.force_login(self.owner)
+        url = reverse('prescription_pdf', args=[self.prescription.pk])
+        with mock.patch.object(prescription_pdf.background, 'submit') as submit:
+            for _ in range(3):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.assertEqual(self.client.get(url).status_code, 202)
+            self.assertEqual(submit.call_count, 1)
+
+            # once the job has started, a new change can queue another one
+            func, prescription_id = submit.call_args.args
+            func(prescription_id)
+            Doctor.objects.filter(pk=self.doctor.pk).update(name='Dr. Lee')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.client.get(url).status_code, 202)
+            self.assertEqual(submit.call_count, 2)
+            func, prescription_id = submit.call_args.args
+            func(prescription_id)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(BACKGROUND_TASKS_ASYNC=False)
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patient = Patient.objects.create(name='Ann', dob=date(1980, 1, 1), address='x')
+        billing.create_invoice(patient, [('Visit', 1, '40.00')])
+        self.url = reverse('dashboard')
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.create_user('ann'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.force_login(User.objects.create_user('nurse', is_staff=True))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['pending_bills_count'], response.context['pending_bills_total']), (1, Decimal('40.00')))
@@ -1,7 +1,7 @@
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import login_required
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Authentication URLs
@@ -11,17 +11,49 @@ urlpatterns = [
     # Application URLs
     path('', views.patient_list, name='patient_list'),
     path('patients/', views.patient_list, name='patient_list'),
+    path('dashboard/', views.dashboard_view, name='dashboard'),
     path('patients/add/', views.add_patient, name='add_patient'),
+    path('patients/lookup/', views.patient_lookup, name='patient_lookup'),
+    path('patients/import/', views.import_patients, name='import_patients'),
     path('patients/<int:pk>/', views.patient_detail, name='patient_detail'),
+    path('patients/<int:pk>/archive/', views.patient_archive, name='patient_archive'),
     path('patients/<int:pk>/book/', views.book_appointment, name='book_appointment'),
+    path('patients/<int:pk>/book-series/', views.book_series, name='book_series'),
     path('doctors/', views.doctor_list, name='doctor_list'),
     path('doctors/<int:pk>/schedule/', views.doctor_schedule, name='doctor_schedule'),
     path('doctors/<int:pk>/connect/', views.connect_doctor, name='connect_doctor'),
+    path('doctors/<int:pk>/calendar/<str:token>.ics', views.doctor_calendar_feed, name='doctor_calendar_feed'),
     # Appointments
     path('appointments/', views.appointment_list, name='appointment_list'),
+    path('appointments/calendar/', views.appointment_calendar, name='appointment_calendar'),
     path('appointments/<int:pk>/status/', views.update_appointment_status, name='update_appointment_status'),
     path('appointments/<int:pk>/edit/', views.edit_appointment, name='edit_appointment'),
+    path('appointments/<int:pk>/following/', views.edit_following, name='edit_following'),
+
+    # Protected media (permission checked, then handed off to the web server)
+    path('records/<int:pk>/report/', views.medical_record_report, name='medical_record_report'),
+    path('prescriptions/<int:pk>/file/', views.prescription_file, name='prescription_file'),
+    path('prescriptions/<int:pk>/pdf/', views.prescription_pdf_file, name='prescription_pdf'),
+
+    # Billing
+    path('billing/', views.billing_list, name='billing_list'),
+    path('billing/new/', views.create_invoice, name='create_invoice'),
+    path('billing/<int:pk>/pay/', views.record_invoice_payment, name='record_invoice_payment'),
+
+    # Search
+    path('search/', views.search_records, name='search_records'),
+
+    # JSON API
+    path('api/v1/appointments/batch/', api.appointment_batch, {'resource': 'appointments'}, name='api_appointment_batch'),
+    path('api/v1/<str:resource>/', api.resource_list, name='api_list'),
+    path('api/v1/<str:resource>/<int:pk>/', api.resource_item, name='api_detail'),
+
+    # Bulk export
+    path('export/fhir/<str:resource_type>.ndjson', views.fhir_export_resource, name='fhir_export_resource'),
     
+    # Prometheus scrape target
+    path('metrics', views.metrics_view, name='metrics'),
+
     # Reports and Settings
     path('reports/', login_required(views.reports), name='reports'),
     path('settings/', login_required(views.settings_page), name='settings'),
@@ -0,0 +1,16 @@
+"""
+Views of the records app, split by area.
+
+Nothing imported at module level here may pull in heavy optional libraries
+(pandas, openpyxl, Pillow): every WSGI worker and management command imports
+this package through the URLconf. Import them inside the code path that needs
+them; `manage.py benchmark_startup` checks this.
+"""
+from .appointments import appointment_calendar, appointment_list, book_appointment, book_series, edit_appointment, edit_following, update_appointment_status
+from .billing import billing_list, create_invoice, record_invoice_payment
+from .doctors import connect_doctor, doctor_calendar_feed, doctor_list, doctor_schedule
+from .files import fhir_export_resource, medical_record_report, prescription_file, prescription_pdf_file
+from .metrics import metrics_view
+from .patients import add_patient, import_patients, patient_archive, patient_detail, patient_list, patient_lookup
+from .reports import dashboard_view, reports, settings_page
+from .search import search_records
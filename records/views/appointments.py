@@ -0,0 +1,300 @@
+import json
+import logging
+from datetime import date, timedelta
+
+from django import forms
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render, reverse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .. import routers
+from ..models import Appointment, AppointmentSeries, Patient
+from ..services import caching, calendar_grid, conditional, metrics, recurrence, waitlist
+
+logger = logging.getLogger(__name__)
+
+
+class AppointmentForm(forms.ModelForm):
+    class Meta:
+        model = Appointment
+        fields = ['doctor', 'date', 'notes']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['doctor'].choices = caching.doctor_choices()
+
+    def clean(self):
+        cleaned = super().clean()
+        doctor = cleaned.get('doctor')
+        date = cleaned.get('date')
+        if not doctor or not date:
+            return cleaned
+        duration = getattr(self.instance, 'duration_minutes', 30)
+        new_start = date
+        new_end = date + timedelta(minutes=duration)
+        # check overlapping appointments for the doctor
+        overlapping = Appointment.objects.filter(doctor=doctor, status='scheduled').exclude(pk=self.instance.pk)
+        for appt in overlapping:
+            appt_start = appt.date
+            appt_end = appt.date + timedelta(minutes=appt.duration_minutes)
+            if appt_start < new_end and appt_end > new_start:
+                metrics.APPOINTMENT_CONFLICTS.inc()
+                raise forms.ValidationError('This time overlaps with another appointment for the selected doctor.')
+        return cleaned
+
+
+@routers.read_only_view
+@conditional.conditional_page(conditional.appointment_list_state)
+def appointment_list(request):
+    try:
+        # Get all appointments with related patient and doctor data
+        appointments = Appointment.objects.select_related('patient', 'doctor').order_by('-date').all()
+
+        # Add pagination
+        paginator = Paginator(appointments, 10)  # Show 10 appointments per page
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+
+        # Get page range for pagination
+        index = page_obj.number - 1
+        max_index = len(paginator.page_range)
+        start_index = index - 3 if index >= 3 else 0
+        end_index = index + 3 if index <= max_index - 3 else max_index
+        page_range = list(paginator.page_range)[start_index:end_index]
+
+        return render(request, 'records/appointment_list.html', {
+            'appointments': page_obj,
+            'page_range': page_range,
+        })
+
+    except Exception as e:
+        logger.error(f"Error in appointment_list: {str(e)}", exc_info=True)
+        return render(request, 'records/appointment_list.html', {
+            'appointments': [],
+            'error': 'Failed to load appointments. Please try again later.'
+        })
+
+
+def book_appointment(request, pk):
+    patient = get_object_or_404(Patient, pk=pk)
+    if request.method == 'POST':
+        form = AppointmentForm(request.POST)
+        if form.is_valid():
+            try:
+                appt = form.save(commit=False)
+                appt.patient = patient
+                appt.save()
+                metrics.BOOKINGS.inc(result='created')
+
+                # For AJAX requests, return success with redirect URL
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({
+                        'success': True,
+                        'redirect_url': reverse('appointment_list')
+                    })
+                return redirect('appointment_list')
+
+            except Exception as e:
+                metrics.BOOKINGS.inc(result='error')
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({
+                        'success': False,
+                        'error': str(e)
+                    }, status=400)
+                messages.error(request, f'An error occurred: {str(e)}')
+        else:
+            metrics.BOOKINGS.inc(result='rejected')
+
+        # Handle form errors for AJAX requests
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({
+                'success': False,
+                'errors': form.errors.get_json_data()
+            }, status=400)
+
+        messages.error(request, 'Please correct the errors below.')
+    else:
+        form = AppointmentForm()
+    return render(request, 'records/book_appointment.html', {'form': form, 'patient': patient})
+
+
+@require_http_methods(["POST"])
+@csrf_exempt  # For simplicity, in production use proper CSRF handling
+@login_required
+def update_appointment_status(request, pk):
+    try:
+        data = json.loads(request.body)
+        new_status = data.get('status')
+
+        if new_status not in dict(Appointment.STATUS_CHOICES).keys():
+            return JsonResponse({'success': False, 'message': 'Invalid status'}, status=400)
+        # single-column UPDATE instead of loading and re-saving the whole row
+        updated = Appointment.objects.filter(pk=pk).update(status=new_status, updated_at=timezone.now())
+        if not updated:
+            return JsonResponse({'success': False, 'message': 'Appointment not found'}, status=404)
+        metrics.APPOINTMENT_STATUS_UPDATES.inc(status=new_status, source='web')
+        if new_status == 'cancelled':
+            waitlist.slot_freed([pk])
+        return JsonResponse({'success': True, 'message': 'Appointment status updated successfully'})
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=500)
+
+
+@login_required
+def edit_appointment(request, pk):
+    appointment = get_object_or_404(Appointment, pk=pk)
+
+    if request.method == 'POST':
+        form = AppointmentForm(request.POST, instance=appointment)
+        if form.is_valid():
+            form.save()
+            messages.success(request, 'Appointment updated successfully.')
+            return redirect('appointment_list')
+    else:
+        form = AppointmentForm(instance=appointment)
+
+    return render(request, 'records/book_appointment.html', {
+        'form': form,
+        'title': 'Edit Appointment',
+        'patient': appointment.patient,
+        'is_edit': True
+    })
+
+
+class AppointmentSeriesForm(forms.ModelForm):
+    skip_conflicts = forms.BooleanField(required=False, label='Skip dates when the doctor is busy')
+
+    class Meta:
+        model = AppointmentSeries
+        fields = ['doctor', 'start', 'frequency', 'interval', 'count', 'until', 'duration_minutes', 'notes']
+        widgets = {
+            'start': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'until': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['doctor'].choices = caching.doctor_choices()
+
+    def clean(self):
+        cleaned = super().clean()
+        if self.errors:
+            return cleaned
+        try:
+            recurrence.occurrence_dates(
+                cleaned['start'], cleaned['frequency'], cleaned['interval'], cleaned.get('count'), cleaned.get('until'),
+            )
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        return cleaned
+
+
+class FollowingAppointmentsForm(forms.ModelForm):
+    """New values for an occurrence and the ones after it."""
+
+    class Meta:
+        model = Appointment
+        fields = ['doctor', 'date', 'duration_minutes', 'notes']
+        widgets = {'date': forms.DateTimeInput(attrs={'type': 'datetime-local'})}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['doctor'].choices = caching.doctor_choices()
+
+
+@login_required
+def book_series(request, pk):
+    patient = get_object_or_404(Patient, pk=pk)
+    form = AppointmentSeriesForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        try:
+            series, booked, skipped = recurrence.create_series(
+                patient, data['doctor'], data['start'],
+                frequency=data['frequency'], interval=data['interval'], count=data['count'], until=data['until'],
+                duration_minutes=data['duration_minutes'], notes=data['notes'], skip_conflicts=data['skip_conflicts'],
+            )
+        except recurrence.SeriesConflict as e:
+            form.add_error(None, str(e))
+        else:
+            messages.success(request, f'{booked} appointments booked.' + (f' {len(skipped)} dates skipped.' if skipped else ''))
+            return redirect('appointment_list')
+    return render(request, 'records/book_series.html', {'form': form, 'patient': patient})
+
+
+@login_required
+def edit_following(request, pk):
+    """Change or cancel an occurrence of a series and the ones after it."""
+    appointment = get_object_or_404(Appointment.objects.select_related('patient', 'series'), pk=pk)
+    if appointment.series is None:
+        return redirect('edit_appointment', pk=pk)
+    remaining = recurrence.following(appointment).count()
+    form = FollowingAppointmentsForm(request.POST or None, initial={
+        'doctor': appointment.doctor_id, 'date': timezone.localtime(appointment.date).strftime('%Y-%m-%dT%H:%M'),
+        'duration_minutes': appointment.duration_minutes, 'notes': appointment.notes,
+    })
+    if request.method == 'POST' and 'cancel' in request.POST:
+        cancelled = recurrence.cancel_following(appointment)
+        messages.success(request, f'{cancelled} appointments cancelled.')
+        return redirect('appointment_list')
+    if request.method == 'POST' and form.is_valid():
+        data = form.cleaned_data
+        try:
+            updated = recurrence.update_following(
+                appointment, start=data['date'], doctor=data['doctor'],
+                duration_minutes=data['duration_minutes'], notes=data['notes'],
+            )
+        except recurrence.SeriesConflict as e:
+            form.add_error(None, str(e))
+        else:
+            messages.success(request, f'{updated} appointments updated.')
+            return redirect('appointment_list')
+    return render(request, 'records/edit_following.html', {
+        'form': form, 'appointment': appointment, 'patient': appointment.patient, 'remaining': remaining,
+    })
+
+
+def _int_param(request, name):
+    value = request.GET.get(name, '')
+    return int(value) if value.isdigit() else None
+
+
+@login_required
+@routers.read_only_view
+def appointment_calendar(request):
+    """Day, week or month calendar of one doctor, one department or everyone."""
+    view = request.GET.get('view')
+    if view not in calendar_grid.VIEWS:
+        view = 'week'
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        day = timezone.localdate()
+    doctor_id = _int_param(request, 'doctor')
+    department_id = None if doctor_id else _int_param(request, 'department')
+
+    first, last = calendar_grid.period(view, day)
+    appointments, slots = calendar_grid.load(first, last, doctor_id, department_id, using=routers.read_alias())
+    scope = f'd{doctor_id}' if doctor_id else f'g{department_id}' if department_id else 'all'
+
+    doctors = caching.all_doctors()
+    departments = sorted({d.department for d in doctors if d.department}, key=lambda department: department.name)
+    return render(request, 'records/appointment_calendar.html', {
+        'view': view,
+        'day': day,
+        'first': first,
+        'last': last - timedelta(days=1),
+        'previous': calendar_grid.step(view, day, -1),
+        'next': calendar_grid.step(view, day, 1),
+        'weeks': calendar_grid.build(view, day, appointments, slots, scope),
+        'doctors': doctors,
+        'departments': departments,
+        'doctor_id': doctor_id,
+        'department_id': department_id,
+        'views': calendar_grid.VIEWS,
+    })
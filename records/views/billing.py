@@ -0,0 +1,136 @@
+from datetime import date as date_cls
+from decimal import Decimal, InvalidOperation
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import redirect, render, reverse
+from django.utils import timezone
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_http_methods
+
+from .. import routers
+from ..models import Invoice, Patient, Payment
+from ..services import billing, pagination
+
+BILLING_PAGE_SIZE = 25
+BILLING_ORDERING = ['-date', '-id']
+
+
+def _parse_date(value):
+    try:
+        return date_cls.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _create_invoice_from_post(request):
+    patient = Patient.objects.filter(pk=request.POST.get('patient') or 0).first()
+    descriptions = request.POST.getlist('item_description[]')
+    amounts = request.POST.getlist('item_amount[]')
+    try:
+        items = [(desc.strip(), 1, Decimal(amount)) for desc, amount in zip(descriptions, amounts) if desc.strip()]
+    except InvalidOperation:
+        items = []
+    if patient is None or not items:
+        messages.error(request, 'Please choose a patient and add at least one item.')
+        return None
+    return billing.create_invoice(
+        patient,
+        items,
+        date=_parse_date(request.POST.get('date')),
+        due_date=_parse_date(request.POST.get('due_date')),
+        notes=request.POST.get('notes', ''),
+    )
+
+
+@login_required
+@routers.read_only_view
+def billing_list(request):
+    """Invoices with keyset pagination; totals are aggregated by the database."""
+    invoices = Invoice.objects.all()
+    status = request.GET.get('status', '')
+    today = timezone.localdate()
+    if status == 'paid':
+        invoices = invoices.filter(status='paid')
+    elif status == 'unpaid':
+        invoices = invoices.filter(status__in=Invoice.OPEN_STATUSES)
+    elif status == 'overdue':
+        invoices = invoices.filter(status__in=Invoice.OPEN_STATUSES, due_date__lt=today)
+    date_from = _parse_date(request.GET.get('from'))
+    date_to = _parse_date(request.GET.get('to'))
+    if date_from:
+        invoices = invoices.filter(date__gte=date_from)
+    if date_to:
+        invoices = invoices.filter(date__lte=date_to)
+    patient_id = request.GET.get('patient', '')
+    if patient_id.isdigit():
+        invoices = invoices.filter(patient_id=int(patient_id))
+
+    summary = billing.ledger_summary(as_of=today, queryset=invoices)
+    try:
+        page = pagination.paginate(
+            invoices.select_related('patient').prefetch_related('items'),
+            BILLING_ORDERING,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            page_size=BILLING_PAGE_SIZE,
+        )
+    except pagination.InvalidCursor:
+        return redirect('billing_list')
+
+    # keep the filters when following the pagination links
+    filters = request.GET.copy()
+    for key in ('after', 'before'):
+        filters.pop(key, None)
+
+    return render(request, 'records/billing_list.html', {
+        'title': 'Billing',
+        'bills': page,
+        'page': page,
+        'filters': filters.urlencode(),
+        'status': status,
+        'date_from': date_from,
+        'date_to': date_to,
+        'patient_filter': patient_id,
+        'today': today,
+        'total_revenue': summary['total_revenue'],
+        'paid_amount': summary['paid_amount'],
+        'pending_amount': summary['outstanding_amount'],
+        'overdue_amount': summary['overdue_amount'],
+        'payment_methods': Payment.METHOD_CHOICES,
+        'open_statuses': Invoice.OPEN_STATUSES,
+    })
+
+
+@login_required
+@require_http_methods(["POST"])
+def create_invoice(request):
+    if not request.user.has_perm('records.add_invoice'):
+        raise PermissionDenied
+    invoice = _create_invoice_from_post(request)
+    if invoice is not None:
+        messages.success(request, f'Invoice {invoice.invoice_number} created.')
+    return redirect('billing_list')
+
+
+@login_required
+@require_http_methods(["POST"])
+def record_invoice_payment(request, pk):
+    if not request.user.has_perm('records.change_invoice'):
+        raise PermissionDenied
+    try:
+        billing.record_payment(
+            pk,
+            request.POST.get('amount', '0'),
+            method=request.POST.get('method', 'cash'),
+            reference=request.POST.get('reference', ''),
+        )
+        messages.success(request, 'Payment recorded.')
+    except (ValueError, InvalidOperation) as e:
+        messages.error(request, f'Payment not recorded: {str(e)}')
+    # back to the filtered list the form was posted from, never off-site
+    referer = request.META.get('HTTP_REFERER')
+    if referer and url_has_allowed_host_and_scheme(referer, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(referer)
+    return redirect(reverse('billing_list'))
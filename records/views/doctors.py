@@ -0,0 +1,118 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_http_methods
+
+from .. import routers
+from ..models import Doctor, Message, TimeSlot
+from ..services import caching, conditional, ics, metrics
+
+
+def doctor_list(request):
+    doctors = caching.all_doctors()
+    return render(request, 'records/doctor_list.html', {'doctors': doctors})
+
+
+@conditional.conditional_page(conditional.doctor_state)
+def doctor_schedule(request, pk):
+    try:
+        doctor = caching.get_doctor(pk)
+        if doctor is None:
+            raise Http404('Doctor not found')
+
+        # Get available time slots for the next 7 days
+        today = timezone.localdate()
+        end_date = today + timedelta(days=7)
+
+        # Get available time slots, excluding those that are already booked.
+        # A plain range on start (not start__date) so the (doctor, start) index is used.
+        time_slots = TimeSlot.objects.filter(
+            doctor=doctor,
+            start__gt=timezone.now(),  # Only show future time slots
+            start__lt=timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+            available=True,
+        ).order_by('start')
+
+        context = {
+            'doctor': doctor,
+            'availabilities': caching.doctor_availabilities(doctor.pk),
+            'time_slots': time_slots,
+            'today': today,
+            'end_date': end_date
+        }
+
+        return render(request, 'records/doctor_schedule.html', context)
+
+    except Exception as e:
+        messages.error(request, f"An error occurred while loading the schedule: {str(e)}")
+        return redirect('doctor_list')
+
+
+@require_http_methods(["GET", "POST"])
+def connect_doctor(request, pk):
+    doctor = get_object_or_404(Doctor, pk=pk)
+    patient = getattr(request.user, 'patient', None)
+
+    if request.method == 'POST':
+        # Handle message sending
+        content = request.POST.get('message', '').strip()
+        if content and patient:
+            Message.objects.create(
+                sender_patient=patient,
+                doctor=doctor,
+                content=content,
+            )
+            metrics.MESSAGES.inc()
+
+            return redirect('connect_doctor', pk=pk)
+        return redirect('doctor_list')
+
+    # If user is not authenticated, redirect to login with a message
+    if not request.user.is_authenticated:
+        messages.warning(
+            request,
+            'Please log in to connect with a doctor. Your message will be saved after login.'
+        )
+        from django.contrib.auth.views import redirect_to_login
+        return redirect_to_login(
+            next=request.path,
+            login_url='/admin/login/'
+        )
+
+    return render(request, 'records/connect_doctor.html', {
+        'doctor': doctor,
+        'form': {
+            'message': request.GET.get('message', '')
+        }
+    })
+
+
+def _feed_state(request, pk, token):
+    if not hasattr(request, '_feed_state'):
+        request._feed_state = ics.feed_state(pk, token, using=routers.read_alias())
+        if request._feed_state is None:
+            raise Http404('Unknown calendar feed')
+    return request._feed_state
+
+
+@require_http_methods(['GET', 'HEAD'])
+@routers.read_only_view
+@condition(
+    etag_func=lambda request, pk, token: _feed_state(request, pk, token)['etag'],
+    last_modified_func=lambda request, pk, token: _feed_state(request, pk, token)['last_modified'],
+)
+def doctor_calendar_feed(request, pk, token):
+    """A doctor's appointments as an iCalendar feed; the token in the URL is the credential."""
+    state = _feed_state(request, pk, token)
+    response = StreamingHttpResponse(
+        ics.cached_feed(pk, state, ics.uid_domain(request.get_host()), using=routers.read_alias()),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'inline; filename="doctor-{pk}.ics"'
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'ICS_FEED_MAX_AGE', 300))
+    return response
@@ -0,0 +1,67 @@
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+
+from .. import routers
+from ..models import MedicalRecord, Prescription
+from ..services import fhir_export, prescription_pdf, protected_media
+
+
+def _can_view_patient_file(user, patient, perm):
+    """Staff with the model permission, or the patient the file belongs to."""
+    if user.has_perm(perm):
+        return True
+    return patient.user_id is not None and patient.user_id == user.id
+
+
+@login_required
+def medical_record_report(request, pk):
+    record = get_object_or_404(MedicalRecord.objects.select_related('patient'), pk=pk)
+    if not _can_view_patient_file(request.user, record.patient, 'records.view_medicalrecord'):
+        raise PermissionDenied
+    return protected_media.serve_file(request, record.report)
+
+
+@login_required
+def prescription_file(request, pk):
+    prescription = get_object_or_404(Prescription.objects.select_related('patient'), pk=pk)
+    if not _can_view_patient_file(request.user, prescription.patient, 'records.view_prescription'):
+        raise PermissionDenied
+    return protected_media.serve_file(request, prescription.prescription_file)
+
+
+@login_required
+def prescription_pdf_file(request, pk):
+    """The generated PDF of a prescription; 202 while it is still being rendered."""
+    prescription = get_object_or_404(Prescription.objects.select_related('patient', 'doctor'), pk=pk)
+    if not _can_view_patient_file(request.user, prescription.patient, 'records.view_prescription'):
+        raise PermissionDenied
+    digest = prescription_pdf.content_hash(prescription_pdf.prescription_data(prescription))
+    if prescription.pdf_hash != digest or not prescription.generated_pdf:
+        # the doctor or patient changed since it was rendered, or it never was
+        prescription_pdf.schedule(prescription)
+        response = HttpResponse('The prescription PDF is being prepared, please try again in a moment.', status=202, content_type='text/plain')
+        response['Retry-After'] = '2'
+        return response
+    return protected_media.serve_file(request, prescription.generated_pdf)
+
+
+@login_required
+@routers.read_only_view
+def fhir_export_resource(request, resource_type):
+    """Stream every resource of one FHIR type as NDJSON, gzipped when the client accepts it."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    if resource_type not in fhir_export.RESOURCES:
+        raise Http404('Unknown resource type')
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = StreamingHttpResponse(
+        fhir_export.stream_resource(resource_type, compress=compress, using=routers.read_alias()),
+        content_type='application/fhir+ndjson',
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    response['Content-Disposition'] = f'attachment; filename="{resource_type}.ndjson"'
+    return response
@@ -0,0 +1,25 @@
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from ..services import metrics
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _can_scrape(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    if request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', []):
+        return True
+    return request.user.is_staff
+
+
+def metrics_view(request):
+    """Prometheus text exposition of the app's counters, gauges and histograms."""
+    if not _can_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(metrics.registry.exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,156 @@
+from django import forms
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render, reverse
+from django.views.decorators.http import require_http_methods
+
+from .. import routers
+from ..models import Invoice, MedicalRecord, Medication, Patient, Vaccination
+from ..services import archive, billing, conditional, pagination, patient_import, patient_matching
+from .billing import BILLING_ORDERING
+from .files import _can_view_patient_file
+
+PATIENT_DETAIL_BILLS = 10
+
+
+class PatientForm(forms.ModelForm):
+    class Meta:
+        model = Patient
+        fields = ['name', 'dob', 'phone', 'address']
+
+
+class MedicalRecordForm(forms.ModelForm):
+    class Meta:
+        model = MedicalRecord
+        fields = ['diagnosis', 'treatment', 'report']
+
+
+@routers.read_only_view
+def patient_list(request):
+    patients = Patient.objects.all()
+    return render(request, 'records/patient_list.html', {'patients': patients})
+
+
+def add_patient(request):
+    duplicates = []
+    if request.method == 'POST':
+        form = PatientForm(request.POST)
+        if form.is_valid():
+            # warn about look-alike patients unless the user already confirmed
+            if not request.POST.get('confirm_new'):
+                duplicates = patient_matching.likely_duplicates(
+                    form.cleaned_data['name'],
+                    dob=form.cleaned_data.get('dob'),
+                    phone=form.cleaned_data['phone'],
+                )
+            if not duplicates:
+                form.save()
+                return redirect('patient_list')
+    else:
+        form = PatientForm()
+    return render(request, 'records/add_patient.html', {'form': form, 'duplicates': duplicates})
+
+
+@login_required
+def patient_lookup(request):
+    """Typeahead JSON: existing patients resembling ?q=<name>&dob=<date|year>&phone=."""
+    name = request.GET.get('q', '').strip()
+    if len(name) < 2:
+        return JsonResponse({'results': []})
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 25))
+    except ValueError:
+        limit = 10
+    candidates = patient_matching.find_candidates(
+        name,
+        dob=request.GET.get('dob', ''),
+        phone=request.GET.get('phone', ''),
+        limit=limit,
+    )
+    return JsonResponse({'results': [
+        {
+            'id': patient.pk,
+            'name': patient.name,
+            'dob': patient.dob.isoformat() if patient.dob else None,
+            'phone': patient.phone,
+            'score': score,
+            'url': reverse('patient_detail', args=[patient.pk]),
+        }
+        for patient, score in candidates
+    ]})
+
+
+@conditional.conditional_page(conditional.patient_state)
+def patient_detail(request, pk):
+    patient = get_object_or_404(Patient, pk=pk)
+    records = MedicalRecord.objects.filter(patient=patient).order_by('-date_recorded')
+    vaccinations = Vaccination.objects.filter(patient=patient).order_by('-date_given')
+    medications = Medication.objects.filter(patient=patient)
+    # the first page of the patient's invoices, ordered and totalled like the
+    # billing page; its next cursor continues there
+    invoices = Invoice.objects.filter(patient=patient)
+    bills = pagination.paginate(invoices, BILLING_ORDERING, page_size=PATIENT_DETAIL_BILLS)
+    bill_summary = billing.ledger_summary(queryset=invoices)
+
+    # handle medical record upload
+    if request.method == 'POST' and 'add_record' in request.POST:
+        form = MedicalRecordForm(request.POST, request.FILES)
+        if form.is_valid():
+            rec = form.save(commit=False)
+            rec.patient = patient
+            rec.save()
+            return redirect('appointment_list')
+    else:
+        form = MedicalRecordForm()
+
+    return render(request, 'records/patient_detail.html', {
+        'patient': patient,
+        'records': records,
+        'vaccinations': vaccinations,
+        'medications': medications,
+        'bills': bills,
+        'bill_summary': bill_summary,
+        'form': form,
+    })
+
+
+@login_required
+def patient_archive(request, pk):
+    """Archived appointments and messages of a patient, loaded only when asked for."""
+    patient = get_object_or_404(Patient, pk=pk)
+    if not _can_view_patient_file(request.user, patient, 'records.view_archivedappointment'):
+        raise PermissionDenied
+    history = archive.patient_history(patient.pk)
+    return render(request, 'records/patient_archive.html', {
+        'title': f'{patient.name} - Archive',
+        'patient': patient,
+        'appointments': history['appointments'],
+        # not 'messages', base.html shows the flash messages under that name
+        'archived_messages': history['messages'],
+    })
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def import_patients(request):
+    """Upload a CSV/XLSX file of patients; rows are validated and inserted in batches."""
+    if not request.user.has_perm('records.add_patient'):
+        raise PermissionDenied
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, 'Please choose a CSV or XLSX file.')
+        else:
+            try:
+                result = patient_import.import_patients(upload, upload.name, dry_run=bool(request.POST.get('dry_run')))
+            except patient_import.InvalidImportFile as e:
+                messages.error(request, str(e))
+    return render(request, 'records/import_patients.html', {
+        'title': 'Import Patients',
+        'result': result,
+        'dry_run': bool(request.POST.get('dry_run')),
+        'max_errors': patient_import.MAX_REPORTED_ERRORS,
+    })
@@ -0,0 +1,38 @@
+from django.contrib import admin
+from django.http import Http404
+from django.shortcuts import render
+
+from ..services import profiling
+
+FUNCTION_SORTS = {'own_ms': 'Own time', 'cumulative_ms': 'Cumulative time', 'ncalls': 'Calls'}
+QUERY_SORTS = {'total_ms': 'Total time', 'count': 'Executions', 'max_ms': 'Slowest'}
+
+
+def profile_list(request):
+    """Recent staff request profiles, newest first (wrapped in admin_view in the URLconf)."""
+    return render(request, 'admin/records/request_profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiling.recent(),
+        'profile_param': profiling.PROFILE_PARAM,
+    })
+
+
+def profile_detail(request, profile_id):
+    """Hot functions and hot queries of one profile, sortable by column."""
+    profile = profiling.get(profile_id)
+    if profile is None:
+        raise Http404('Profile not found or expired')
+    sort = request.GET.get('sort') if request.GET.get('sort') in FUNCTION_SORTS else 'own_ms'
+    query_sort = request.GET.get('qsort') if request.GET.get('qsort') in QUERY_SORTS else 'total_ms'
+    return render(request, 'admin/records/request_profile.html', {
+        **admin.site.each_context(request),
+        'title': f"{profile['method']} {profile['path']}",
+        'profile': profile,
+        'functions': sorted(profile['functions'], key=lambda row: -row[sort])[:100],
+        'queries': sorted(profile['queries'], key=lambda row: -row[query_sort]),
+        'sort': sort,
+        'query_sort': query_sort,
+        'function_sorts': FUNCTION_SORTS,
+        'query_sorts': QUERY_SORTS,
+    })
@@ -0,0 +1,112 @@
+from io import BytesIO
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import render
+
+from .. import routers
+from ..models import Appointment, Invoice
+from ..services import billing, dashboard
+
+
+@login_required
+@routers.read_only_view
+def reports(request):
+    """View for displaying and exporting reports."""
+    export_format = request.GET.get('export')
+
+    # Get appointment statistics
+    total_appointments = Appointment.objects.count()
+    completed_appointments = Appointment.objects.filter(status='completed').count()
+    pending_appointments = Appointment.objects.filter(status='pending').count()
+    cancelled_appointments = Appointment.objects.filter(status='cancelled').count()
+
+    # Prepare appointment summary data
+    appointments_summary = {
+        'total': total_appointments,
+        'completed': completed_appointments,
+        'pending': pending_appointments,
+        'cancelled': cancelled_appointments
+    }
+
+    # Sample data - replace with your actual data
+    reports_data = [
+        {'patient': 'John Doe', 'appointment_date': '2025-11-15', 'status': 'Scheduled'},
+        {'patient': 'Jane Smith', 'appointment_date': '2025-11-16', 'status': 'Completed'},
+        # Add more sample data or fetch from your models
+    ]
+
+    if export_format in ['csv', 'excel']:
+        # pandas takes a few hundred ms to import; only pay for it on export
+        import pandas as pd
+
+        df = pd.DataFrame(reports_data)
+
+        if export_format == 'csv':
+            response = HttpResponse(content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename=reports.csv'
+            df.to_csv(response, index=False)
+            return response
+
+        elif export_format == 'excel':
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                df.to_excel(writer, index=False, sheet_name='Reports')
+
+            response = HttpResponse(
+                output.getvalue(),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response['Content-Disposition'] = 'attachment; filename=reports.xlsx'
+            return response
+
+    ledger = billing.ledger_summary()
+    transactions = Invoice.objects.select_related('patient').order_by('-date', '-id')[:20]
+
+    context = {
+        'title': 'Reports',
+        'reports': reports_data,
+        'total_revenue': ledger['total_revenue'],
+        'paid_amount': ledger['paid_amount'],
+        'outstanding_amount': ledger['outstanding_amount'],
+        'overdue_amount': ledger['overdue_amount'],
+        'aging': ledger['aging'],
+        'transactions': transactions,
+        'appointments_summary': appointments_summary,
+        'total_appointments': total_appointments,
+        'completed_appointments': completed_appointments,
+        'pending_appointments': pending_appointments,
+        'cancelled_appointments': cancelled_appointments
+    }
+
+    return render(request, 'records/reports.html', context)
+
+
+@login_required
+@routers.read_only_view
+def dashboard_view(request):
+    """Clinic dashboard, for staff; every widget comes from records/services/dashboard.py."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    widgets = dashboard.collect(using=routers.read_alias())
+    today = widgets['today_appointments']
+    bills = widgets['unpaid_bills']
+    context = {
+        'title': 'Dashboard',
+        'patient_count': widgets['patient_count'],
+        'doctor_count': widgets['doctor_count'],
+        'today_appointments_count': today['total'] if today else None,
+        'today_by_doctor': today['doctors'] if today else None,
+        'pending_bills_count': bills['count'] if bills else None,
+        'pending_bills_total': (bills['total'] or 0) if bills else None,
+        'upcoming_appointments': widgets['upcoming_appointments'],
+        'vaccinations': widgets['upcoming_vaccinations'],
+        'messages_widget': widgets['unread_messages'],
+    }
+    return render(request, 'records/dashboard.html', context)
+
+
+def settings_page(request):
+    # Add settings view logic here
+    return render(request, 'records/settings.html', {'title': 'Settings'})
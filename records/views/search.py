@@ -0,0 +1,70 @@
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import render
+
+from .. import routers
+from ..models import MedicalRecord, Patient, Prescription, SearchDocument, TreatmentPlan
+from ..services import search as search_service
+
+SEARCH_MODELS = {
+    'record': MedicalRecord,
+    'prescription': Prescription,
+    'treatment_plan': TreatmentPlan,
+}
+
+
+@login_required
+@routers.read_only_view
+def search_records(request):
+    """Full-text search across medical records, prescriptions and treatment plans.
+
+    Staff need the medical record view permission; a patient searches only
+    their own chart, the same rule as for their files.
+    """
+    query = request.GET.get('q', '').strip()
+    patient_id = request.GET.get('patient') or None
+    kind = request.GET.get('kind') or None
+    mode = request.GET.get('mode', 'documents')
+    if not request.user.has_perm('records.view_medicalrecord'):
+        patient = getattr(request.user, 'patient', None)
+        if patient is None:
+            raise PermissionDenied
+        patient_id, mode = str(patient.pk), 'documents'
+    results = []
+    patients = []
+    # the search SQL runs on a raw cursor, so resolve the replica here
+    using = routers.read_alias()
+
+    if query and mode == 'patients':
+        ranked = search_service.search_patients(query, using=using)
+        found = Patient.objects.using(using).in_bulk([pid for pid, _ in ranked])
+        patients = [(found[pid], score) for pid, score in ranked if pid in found]
+    elif query:
+        hits = search_service.search(
+            query,
+            patient_id=int(patient_id) if patient_id and patient_id.isdigit() else None,
+            kinds=[kind] if kind in SEARCH_MODELS else None,
+            using=using,
+        )
+        # one query per kind to turn the hits back into model instances
+        ids_by_kind = {}
+        for _, hit_kind, object_id, _, _ in hits:
+            ids_by_kind.setdefault(hit_kind, []).append(object_id)
+        objects = {
+            hit_kind: SEARCH_MODELS[hit_kind].objects.using(using).select_related('patient').in_bulk(ids)
+            for hit_kind, ids in ids_by_kind.items()
+        }
+        for _, hit_kind, object_id, _, score in hits:
+            obj = objects[hit_kind].get(object_id)
+            if obj is not None:
+                results.append({'kind': hit_kind, 'object': obj, 'score': score})
+
+    return render(request, 'records/search.html', {
+        'title': 'Search',
+        'query': query,
+        'kind': kind,
+        'mode': mode,
+        'kind_choices': SearchDocument.KIND_CHOICES,
+        'results': results,
+        'patients': patients,
+    })